@@ -3,7 +3,7 @@ Configuration management for the backend application.
 Loads environment variables and provides application settings.
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -20,11 +20,29 @@ class Settings(BaseSettings):
     # Application Settings
     max_session_duration: int = 3600  # seconds
     frame_processing_fps: int = 10
+    snapshot_executor_workers: int = 4  # Threads for decoding/comparison of snapshots (keeps the event loop free)
+    batch_max_concurrent_jobs: int = 1  # Uploaded videos having poses extracted at the same time
+    batch_max_upload_mb: int = 500  # Larger practice videos are rejected with 413
+    reference_cache_max_mb: int = 512  # Memory budget for cached reference features (LRU)
 
     # Pose Detection Settings
     mediapipe_model_complexity: int = 1  # 0, 1, or 2 (higher = more accurate but slower)
     mediapipe_min_detection_confidence: float = 0.5
     mediapipe_min_tracking_confidence: float = 0.5
+    pose_pool_workers: Optional[int] = None  # MediaPipe worker processes (None = one per CPU core, 0 = in-process)
+    pose_pool_max_frame_pixels: int = 1280 * 720  # Larger frames are downscaled before inference
+    pose_pool_max_streams_per_worker: int = 16  # Streams (user/reference/hand) with tracking detectors kept per worker
+    image_decode_max_pixels: int = 640 * 480  # Uploads above this are decoded at reduced scale (1/2, 1/4, 1/8)
+    roi_tracking_enabled: bool = True  # Infer only a crop around the dancer (from the previous frame)
+    roi_crop_size: int = 256  # Longest side of the pose crop sent to MediaPipe
+    roi_padding: float = 0.35  # Margin around the dancer's box, as a fraction of its size per side
+    roi_hand_crop_size: int = 192  # Longest side of each wrist crop sent to the hand model
+    frame_change_gate_enabled: bool = True  # Reuse the last result for snapshots that did not change
+    frame_change_threshold: float = 2.0  # Mean grayscale difference (0-255, 32x24 thumbnail) counted as a change
+    frame_change_max_reuse: float = 1.0  # seconds a result may be reused before the frame is inferred anyway
+    hand_detection_interval: int = 3  # Run the hand model every n-th snapshot; wrist motion carries hands between
+    adaptive_quality_enabled: bool = True  # Lower model complexity/resolution when inference falls behind
+    snapshot_latency_budget: float = 0.5  # seconds of inference per snapshot (the client's snapshot interval)
 
     # Comparison Thresholds
     angle_error_threshold_high: float = 30.0  # degrees - major error
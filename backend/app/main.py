@@ -2,33 +2,43 @@
 FastAPI main application entry point.
 Unified API for K-Pop Dance Trainer with real-time pose detection and feedback.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
 import base64
+import functools
 import time
 import os
+import tempfile
 import numpy as np
 import cv2
-from PIL import Image
-from io import BytesIO
 
 # Import configuration
 from app.data.config import settings
 
 # Import services
-from app.services.pose_comparison_service import PoseComparisonService
 from app.services.pose_comparison_config import PoseComparisonConfig, DEFAULT_CONFIG, DANCE_CONFIG
 from app.services.live_feedback_service import LiveFeedbackService, SnapshotData
 from app.services.angle_calculator import AngleCalculator
-from app.services.scoring import ScoringService
 from app.services.feedback_generation import FeedbackGenerationService
 from app.services.dual_snapshot_service import dual_snapshot_service, DualSnapshotData
 from app.services.mediapipe_service import mediapipe_service, MediaPipeResult
-
-# Import MediaPipe for pose detection
-import mediapipe as mp
+from app.services.batch_scoring_service import batch_scoring_service
+from app.services.session_registry import SessionRegistry, DanceSession, MAX_SEQUENCE_LENGTH
+from app.services.reference_cache import reference_cache
+from app.services.pose_store import PROCESSED_POSES_DIR
+from app.services.shared_reference import ReferencePointer
+from app.services.pose_detector_pool import pose_detector_pool
+from app.services.quality_controller import quality_controller
+from app.utils.image_decoding import decode_frame
+from app.utils.landmark_encoding import encode_landmarks, requested_encoding
+from app.utils.landmark_payload import parse_hand_landmarks, parse_landmark_bytes, parse_pose_landmarks
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -64,6 +74,13 @@ async def startup_event():
     
     print("Server startup complete!")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the pose detector worker processes and the snapshot threads."""
+    pose_detector_pool.close()
+    snapshot_executor.shutdown(wait=False, cancel_futures=True)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -78,8 +95,14 @@ app.add_middleware(
 # PYDANTIC MODELS FOR REQUEST/RESPONSE
 # ============================================================================
 
+class SessionRequest(BaseModel):
+    """Request model for endpoints acting on one session."""
+    session_id: str
+
+
 class ImageSnapshotRequest(BaseModel):
     """Request model for processing image snapshots."""
+    session_id: str
     image: str  # base64 encoded image
 
 
@@ -94,6 +117,23 @@ class ProcessSnapshotResponse(BaseModel):
     live_feedback: Optional[str] = None
     success: bool
     error: Optional[str] = None
+    frame_unchanged: bool = False  # Previous result reused (frame did not change)
+    packed_landmarks: Optional[Dict[str, Any]] = None  # {"pose", "hands"} when a landmark encoding was requested
+
+
+class LandmarksSnapshotRequest(BaseModel):
+    """Request model for snapshots whose pose was estimated on the client."""
+    session_id: str
+    pose_landmarks: List[List[float]]  # 33 x (x, y, z, visibility), normalized to the frame
+    hand_landmarks: List[List[List[float]]] = []  # up to 2 hands of 21 x (x, y, z)
+    hand_classifications: List[Dict[str, Any]] = []
+
+
+class StreamResultMessage(ProcessSnapshotResponse):
+    """Result pushed over the session WebSocket for one streamed frame."""
+    type: str = "result"
+    sequence: int  # Sequence number the client sent with the frame
+    frames_dropped: int = 0  # Frames replaced by a newer one before they were processed (this connection)
 
 
 class StartSessionResponse(BaseModel):
@@ -109,6 +149,7 @@ class SessionStatusResponse(BaseModel):
     pose_count: int
     reference_video: Optional[str]
     session_duration: float
+    frames_skipped: int = 0  # Snapshots answered from the previous result
 
 
 class SessionFeedbackResponse(BaseModel):
@@ -170,11 +211,19 @@ class DualSnapshotResponse(BaseModel):
 
 
 class MediaPipeRequest(BaseModel):
-    """Request model for MediaPipe pose detection."""
+    """
+    Request model for MediaPipe pose detection.
+
+    Send either reference_image, or reference_id + reference_timestamp to use the
+    precomputed landmarks of a processed reference video instead of a frame upload.
+    """
     user_image: str  # base64 encoded user webcam image
-    reference_image: str  # base64 encoded reference video frame
+    reference_image: Optional[str] = None  # base64 encoded reference video frame
+    reference_id: Optional[str] = None  # processed reference video name
+    reference_timestamp: Optional[float] = None  # seconds into the reference video
     timestamp: Optional[float] = None
     draw_landmarks: Optional[bool] = False
+    session_id: Optional[str] = None  # keeps a tracking detector per stream across calls
 
 
 class MediaPipeResponse(BaseModel):
@@ -194,94 +243,79 @@ class MediaPipeResponse(BaseModel):
     error: Optional[str] = None
 
 
+class BatchJobResponse(BaseModel):
+    """Response model for offline video scoring jobs."""
+    job_id: str
+    status: str  # "queued", "extracting", "scoring", "completed", "failed"
+    progress: float  # 0.0-1.0
+    created_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None  # timeline, problem_areas, statistics (when completed)
+
+
 # ============================================================================
 # GLOBAL STATE MANAGEMENT
 # ============================================================================
 
-# Initialize MediaPipe
-mp_pose = mp.solutions.pose
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-
-# Initialize pose and hand detection
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=settings.mediapipe_model_complexity,
-    enable_segmentation=False,
-    min_detection_confidence=settings.mediapipe_min_detection_confidence,
-    min_tracking_confidence=settings.mediapipe_min_tracking_confidence
-)
-
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-
 # Global services (INTERNAL - Never exposed to API)
-comparison_service: Optional[PoseComparisonService] = None
-live_feedback_service = LiveFeedbackService()  # Internal LLM service
-scoring_service = ScoringService()
+live_feedback_service = LiveFeedbackService()  # Internal LLM service (its client is shared by all sessions)
 feedback_generation_service = FeedbackGenerationService()  # Internal LLM service
 angle_calculator = AngleCalculator()
 current_config = DEFAULT_CONFIG
 
-# Session management
-current_session = {
-    'session_id': None,
-    'start_time': None,
-    'pose_data': [],
-    'feedback_history': [],
-    'reference_video': None
-}
+# Session management: one entry per dancer, all sharing the loaded reference
+session_registry = SessionRegistry(
+    max_session_duration=settings.max_session_duration,
+    config=current_config,
+    feedback_client=live_feedback_service.client,
+    feedback_async_client=live_feedback_service.async_client
+)
+
+# CPU-bound snapshot stages (decode, comparison) run here instead of on the event loop
+snapshot_executor = ThreadPoolExecutor(max_workers=settings.snapshot_executor_workers,
+                                       thread_name_prefix="snapshot")
 
-# Pose sequence storage
-pose_sequence = []
-MAX_SEQUENCE_LENGTH = 100  # Keep last 100 poses
+# Reference served by every worker process (see sync_shared_reference)
+reference_pointer = ReferencePointer(os.path.join(PROCESSED_POSES_DIR, "current_reference.json"))
 
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def load_reference_video(video_name: str) -> bool:
+def load_reference_video(video_name: str, publish: bool = True) -> bool:
     """
     Load reference video for pose comparison.
 
     Args:
         video_name: Name of the reference video (without extension)
+        publish: Make the reference current in every worker process
 
     Returns:
         bool: True if loaded successfully, False otherwise
     """
-    global comparison_service
     try:
-        # Get the correct path relative to app directory
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        data_path = os.path.join(current_dir, "data", "processed_poses", f"{video_name}_poses.npy")
+        # Processed poses live in app/data/processed_poses
+        data_path = os.path.join(PROCESSED_POSES_DIR, f"{video_name}_poses")
 
-        if not os.path.exists(data_path):
+        try:
+            # Reuses the features (and indexes) if this file was loaded before
+            reference_features = reference_cache.get(data_path)
+        except FileNotFoundError:
             print(f"Reference video file not found: {data_path}")
             return False
 
-        # Load the numpy array
-        reference_data = np.load(data_path, allow_pickle=True)
+        reference_poses_list = reference_features.reference_poses
 
-        # Convert to format expected by PoseComparisonService
-        reference_poses_list = []
-        for frame_data in reference_data:
-            if frame_data.get('has_pose', False):
-                pose_dict = {
-                    'landmarks': frame_data['landmarks'],
-                    'timestamp': frame_data['timestamp'],
-                    'frame_number': frame_data['frame_number']
-                }
-                reference_poses_list.append(pose_dict)
+        # Share the reference with every session
+        session_registry.set_reference(video_name, reference_poses_list, reference_features)
 
-        # Initialize comparison service with reference poses
-        comparison_service = PoseComparisonService(reference_poses_list, current_config)
-        current_session['reference_video'] = video_name
+        if publish:
+            try:
+                reference_pointer.publish(video_name)
+            except OSError as e:
+                print(f"WARNING: Could not share reference with other workers: {e}")
 
         print(f"✅ Loaded {len(reference_poses_list)} reference poses from {video_name}")
         return True
@@ -293,7 +327,136 @@ def load_reference_video(video_name: str) -> bool:
         return False
 
 
-def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def sync_shared_reference():
+    """Load the reference another worker process published, if it changed (off the event loop)."""
+    video_name = reference_pointer.poll()
+    if video_name and video_name != session_registry.reference_video:
+        await run_blocking(load_reference_video, video_name, publish=False)
+
+
+async def get_session_or_404(session_id: str) -> DanceSession:
+    """Look up an active session, raising 404 if it is unknown or was evicted."""
+    await sync_shared_reference()
+    session = session_registry.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+    return session
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound call on the bounded snapshot executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(snapshot_executor, functools.partial(func, *args, **kwargs))
+
+
+@asynccontextmanager
+async def frame_slot(session: DanceSession):
+    """
+    Hold the session's single in-flight frame slot.
+
+    A frame that arrives while the session's previous frame is still being
+    processed is rejected with 429 (the client simply sends its next snapshot),
+    so one slow session cannot queue up work that delays every other client.
+    """
+    if session.frame_lock.locked():
+        raise HTTPException(status_code=429, detail="Previous frame of this session is still being processed")
+    async with session.frame_lock:
+        yield
+
+
+def landmark_encoding_of(connection: Union[Request, WebSocket]) -> Optional[str]:
+    """Landmark encoding a request asked for (?landmark_encoding=... or Accept: ...; landmarks=...)."""
+    try:
+        return requested_encoding(connection.query_params.get("landmark_encoding"),
+                                  connection.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def snapshot_response(result: Dict[str, Any], encoding: Optional[str] = None,
+                      model: type = ProcessSnapshotResponse, **fields) -> ProcessSnapshotResponse:
+    """
+    Response model for a snapshot result, with landmarks as JSON lists or packed.
+
+    Args:
+        result: process_image_snapshot / process_pose_landmarks output (landmarks as arrays)
+        encoding: Landmark encoding ('f16', 'i16'), None for JSON lists
+        model: Response model (ProcessSnapshotResponse or a subclass)
+        **fields: Extra fields for the model
+    """
+    fields = {**result, **fields}
+    pose_landmarks = fields.get('pose_landmarks')
+    hand_landmarks = fields.get('hand_landmarks') or []
+    if encoding:
+        fields['packed_landmarks'] = {
+            'pose': encode_landmarks(pose_landmarks, encoding) if pose_landmarks is not None else None,
+            'hands': encode_landmarks(np.stack(hand_landmarks), encoding) if hand_landmarks else None
+        }
+        fields['pose_landmarks'] = None
+        fields['hand_landmarks'] = []
+    else:
+        fields['pose_landmarks'] = np.asarray(pose_landmarks).tolist() if pose_landmarks is not None else None
+        fields['hand_landmarks'] = [np.asarray(hand).tolist() for hand in hand_landmarks]
+    return model(**fields)
+
+
+async def read_frame_upload(request: Request, field: str = "image",
+                            required: bool = True) -> Tuple[Optional[bytes], str]:
+    """
+    Encoded image of a binary upload: the raw request body, or one file part of a multipart form.
+
+    Args:
+        request: Incoming request
+        field: Multipart part holding the image
+        required: Raise 400 if the image is missing
+
+    Returns:
+        (image bytes or None, content type)
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get(field)
+        if upload is None or isinstance(upload, str):
+            data, content_type = None, ""
+        else:
+            data, content_type = await upload.read(), upload.content_type or ""
+    else:
+        data = await request.body()
+
+    if not data:
+        if required:
+            raise HTTPException(status_code=400, detail=f"No {field} data provided")
+        data = None
+    return data, content_type.split(";")[0].strip() or "image/jpeg"
+
+
+def frame_parameter(request: Request, name: str, required: bool = False) -> Optional[str]:
+    """
+    Parameter of a binary upload: query string first, then the X- header
+    (session_id -> ?session_id=... or X-Session-Id).
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        value = request.headers.get("x-" + name.replace("_", "-"))
+    if value is None and required:
+        raise HTTPException(status_code=400, detail=f"{name} is required (query parameter or header)")
+    return value
+
+
+def float_frame_parameter(request: Request, name: str, required: bool = False) -> Optional[float]:
+    """Numeric frame_parameter, 400 if it is not a number."""
+    value = frame_parameter(request, name, required)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a number")
+
+
+async def generate_llm_feedback(image_data: Optional[Union[str, bytes]], comparison_result: Dict[str, Any],
+                          session: DanceSession) -> Optional[Dict[str, Any]]:
     """
     Generate LLM-powered feedback using LiveFeedbackService (INTERNAL).
 
@@ -301,8 +464,11 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
     The OpenAI client and all LLM details are NEVER exposed to the API layer.
 
     Args:
-        image_data: Base64 encoded image
+        image_data: Base64 encoded image, raw JPEG bytes from a binary upload (encoded
+            only if the feedback model is called),
+            or None (client-side landmarks; feedback from the scores alone)
         comparison_result: Pose comparison results
+        session: Session whose feedback context is used
 
     Returns:
         Optional[Dict]: Feedback dictionary with:
@@ -317,18 +483,19 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
         # Convert comparison data to SnapshotData format
         snapshot_data = SnapshotData(
             timestamp=time.time(),
-            frame_base64=image_data,
+            frame_base64=image_data if isinstance(image_data, str) else "",
+            frame_bytes=None if isinstance(image_data, str) else image_data,
             pose_similarity=comparison_result.get('pose_score', 0.0),
             motion_similarity=comparison_result.get('motion_score', 0.0),
             combined_score=comparison_result.get('combined_score', 0.0),
             errors=[],  # TODO: Convert angle/position differences to error format
             best_match_idx=comparison_result.get('best_match_idx', 0),
-            reference_timestamp=0.0,
-            timing_offset=0.0
+            reference_timestamp=comparison_result.get('reference_timestamp', 0.0),
+            timing_offset=comparison_result.get('timing_offset', 0.0)
         )
 
         # Call INTERNAL service (OpenAI interaction happens here, internally)
-        feedback_result = live_feedback_service.process_snapshot(snapshot_data)
+        feedback_result = await session.live_feedback_service.process_snapshot_async(snapshot_data)
 
         if feedback_result:
             # Return complete feedback object (NO OpenAI metadata, just processed results)
@@ -356,148 +523,156 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
         }
 
 
-def process_image_snapshot(image_data: str) -> Dict[str, Any]:
+async def process_pose_landmarks(pose_landmarks: Optional[np.ndarray], hand_landmarks: List[np.ndarray],
+                                 hand_classifications: List[Dict[str, Any]], session: DanceSession,
+                                 image_data: Optional[Union[str, bytes]] = None) -> Dict[str, Any]:
     """
-    Process a single image snapshot for pose detection and comparison.
+    Angles, comparison, scoring and feedback for one frame's landmarks.
+
+    Shared by the image snapshot path (server-side inference) and the landmarks
+    path (pose estimated by the client). Angles and comparison run on the
+    snapshot executor, the feedback LLM call on the async client.
 
     Args:
-        image_data: Base64 encoded image
+        pose_landmarks: (33, 4) pose landmarks, None if no pose was detected
+        hand_landmarks: (21, 3) landmarks per detected hand
+        hand_classifications: Handedness of each hand
+        session: Session the frame belongs to
+        image_data: Frame for the feedback model, None when only landmarks were sent
 
     Returns:
         dict: Processing results including landmarks, comparison, and feedback
     """
-    try:
-        # Convert base64 to image
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-        # Convert BGR to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Process pose
-        pose_results = pose.process(rgb_frame)
-
-        # Process hands
-        hand_results = hands.process(rgb_frame)
-
-        # Extract landmarks
-        pose_landmarks = None
-        hand_landmarks = []
-        hand_classifications = []
-        preprocessed_angles = {}
-
-        if pose_results.pose_landmarks:
-            # Convert pose landmarks to numpy array
-            pose_landmarks = np.array([
-                [lm.x, lm.y, lm.z, lm.visibility]
-                for lm in pose_results.pose_landmarks.landmark
-            ])
-
-        if hand_results.multi_hand_landmarks:
-            for idx, hand_landmark in enumerate(hand_results.multi_hand_landmarks):
-                # Convert hand landmarks to numpy array
-                hand_array = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmark.landmark])
-                hand_landmarks.append(hand_array)
-
-                # Get hand classification
-                if hand_results.multi_handedness and idx < len(hand_results.multi_handedness):
-                    handedness = hand_results.multi_handedness[idx]
-                    hand_classifications.append({
-                        'label': handedness.classification[0].label,
-                        'confidence': handedness.classification[0].score
-                    })
-
-        # Calculate preprocessed angles if we have pose landmarks
-        if pose_landmarks is not None:
-            try:
-                # Flatten pose landmarks for angle calculation (x, y, z coordinates only)
-                pose_flat = pose_landmarks[:, :3].flatten()
+    preprocessed_angles = {}
+
+    # Calculate preprocessed angles if we have pose landmarks
+    if pose_landmarks is not None:
+        try:
+            # Flatten pose landmarks for angle calculation (x, y, z coordinates only)
+            pose_flat = pose_landmarks[:, :3].flatten()
+
+            # Calculate angles
+            if hand_landmarks:
+                hand_flat = hand_landmarks[0].flatten()
+                preprocessed_angles = await run_blocking(angle_calculator.calculate_all_angles, pose_flat, hand_flat)
+            else:
+                preprocessed_angles = await run_blocking(angle_calculator.calculate_all_angles, pose_flat)
+
+        except Exception as e:
+            print(f"Error calculating angles: {e}")
+            preprocessed_angles = {}
+
+    # Perform real-time comparison if service is available
+    comparison_result = None
+    live_feedback = None
+
+    if pose_landmarks is not None and session.has_reference:
+        try:
+            # Compare with reference (applies a newly loaded reference or config first)
+            comparison_result = await run_blocking(session.compare_pose, pose_landmarks)
+
+            # Generate detailed feedback using LiveFeedbackService (internal LLM call)
+            # Returns processed feedback dict (NO OpenAI metadata)
+            feedback_data = await generate_llm_feedback(image_data, comparison_result, session)
+
+            # Store in session data
+            session.pose_data.append({
+                'timestamp': time.time(),
+                'pose_landmarks': pose_landmarks,
+                'comparison_result': comparison_result
+            })
 
-                # Calculate angles
-                if hand_landmarks:
-                    hand_flat = hand_landmarks[0].flatten()
-                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat, hand_flat)
-                else:
-                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat)
+            # Store complete feedback record for session summary (if feedback was generated)
+            # This data structure is used by FeedbackGenerationService.generate_session_summary()
+            if feedback_data:
+                session_timestamp = session.elapsed
+
+                session.feedback_history.append({
+                    # Required fields for session summary
+                    'timestamp': session_timestamp,  # Seconds from session start
+                    'feedback_text': feedback_data.get('feedback_text', ''),
+                    'severity': feedback_data.get('severity', 'medium'),
+                    'focus_areas': feedback_data.get('focus_areas', []),
+                    'similarity_score': comparison_result.get('combined_score', 0.0),
+                    'is_positive': feedback_data.get('is_positive', False),
+
+                    # Additional context for analysis
+                    'context': feedback_data.get('context', {})
+                })
 
-            except Exception as e:
-                print(f"Error calculating angles: {e}")
-                preprocessed_angles = {}
+            # Extract feedback text for immediate response
+            live_feedback = feedback_data.get('feedback_text', None) if feedback_data else None
 
-        # Perform real-time comparison if service is available
-        comparison_result = None
-        live_feedback = None
+            # Add to scoring service
+            session.scoring_service.add_score(
+                timestamp=session.elapsed,
+                combined_score=comparison_result.get('combined_score', 0.0),
+                pose_score=comparison_result.get('pose_score', 0.0),
+                motion_score=comparison_result.get('motion_score', 0.0),
+                errors=[]
+            )
 
-        if pose_landmarks is not None and comparison_service is not None:
-            try:
-                # Compare with reference
-                comparison_result = comparison_service.update_user_pose(pose_landmarks)
-
-                # Generate detailed feedback using LiveFeedbackService (internal LLM call)
-                # Returns processed feedback dict (NO OpenAI metadata)
-                feedback_data = generate_llm_feedback(image_data, comparison_result)
-
-                # Store in session data
-                current_session['pose_data'].append({
-                    'timestamp': time.time(),
-                    'pose_landmarks': pose_landmarks,
-                    'comparison_result': comparison_result
-                })
+        except Exception as e:
+            print(f"Error in pose comparison: {e}")
+            comparison_result = None
+            live_feedback = "Comparison unavailable"
+
+    # Create result (landmark arrays are serialized by snapshot_response)
+    result = {
+        'timestamp': time.time(),
+        'pose_landmarks': pose_landmarks,
+        'hand_landmarks': hand_landmarks,
+        'hand_classifications': hand_classifications,
+        'preprocessed_angles': preprocessed_angles,
+        'comparison_result': comparison_result,
+        'live_feedback': live_feedback,
+        'success': True
+    }
 
-                # Store complete feedback record for session summary (if feedback was generated)
-                # This data structure is used by FeedbackGenerationService.generate_session_summary()
-                if feedback_data:
-                    session_timestamp = time.time() - current_session['start_time'] if current_session['start_time'] else 0
-
-                    current_session['feedback_history'].append({
-                        # Required fields for session summary
-                        'timestamp': session_timestamp,  # Seconds from session start
-                        'feedback_text': feedback_data.get('feedback_text', ''),
-                        'severity': feedback_data.get('severity', 'medium'),
-                        'focus_areas': feedback_data.get('focus_areas', []),
-                        'similarity_score': comparison_result.get('combined_score', 0.0),
-                        'is_positive': feedback_data.get('is_positive', False),
-
-                        # Additional context for analysis
-                        'context': feedback_data.get('context', {})
-                    })
-
-                # Extract feedback text for immediate response
-                live_feedback = feedback_data.get('feedback_text', None) if feedback_data else None
-
-                # Add to scoring service
-                scoring_service.add_score(
-                    timestamp=time.time() - current_session['start_time'] if current_session['start_time'] else 0,
-                    combined_score=comparison_result.get('combined_score', 0.0),
-                    pose_score=comparison_result.get('pose_score', 0.0),
-                    motion_score=comparison_result.get('motion_score', 0.0),
-                    errors=[]
-                )
+    # Add to sequence for comparison
+    if pose_landmarks is not None:
+        session.pose_sequence.append(pose_landmarks)
 
-            except Exception as e:
-                print(f"Error in pose comparison: {e}")
-                comparison_result = None
-                live_feedback = "Comparison unavailable"
+    return result
 
-        # Create result
-        result = {
-            'timestamp': time.time(),
-            'pose_landmarks': pose_landmarks.tolist() if pose_landmarks is not None else None,
-            'hand_landmarks': [hand.tolist() for hand in hand_landmarks],
-            'hand_classifications': hand_classifications,
-            'preprocessed_angles': preprocessed_angles,
-            'comparison_result': comparison_result,
-            'live_feedback': live_feedback,
-            'success': True
-        }
 
-        # Add to sequence for comparison
-        if pose_landmarks is not None:
-            pose_sequence.append(pose_landmarks)
-            if len(pose_sequence) > MAX_SEQUENCE_LENGTH:
-                pose_sequence.pop(0)
+def decode_snapshot(image_data: Union[str, bytes], session: DanceSession) -> Tuple[np.ndarray, np.ndarray]:
+    """Decoded RGB frame and its change-gate thumbnail."""
+    rgb_frame = decode_frame(image_data, settings.image_decode_max_pixels)
+    return rgb_frame, session.frame_gate.thumbnail(rgb_frame)
 
+
+async def process_image_snapshot(image_data: Union[str, bytes], session: DanceSession) -> Dict[str, Any]:
+    """
+    Process a single image snapshot for pose detection and comparison.
+
+    Args:
+        image_data: Base64 encoded image, or raw encoded bytes (binary upload)
+        session: Session the snapshot belongs to
+
+    Returns:
+        dict: Processing results including landmarks, comparison, and feedback
+    """
+    try:
+        # Decode straight to RGB for MediaPipe (reduced scale for large uploads), off the event loop
+        rgb_frame, thumbnail = await run_blocking(decode_snapshot, image_data, session)
+
+        # Nothing moved since the last inferred frame: answer with its result
+        if session.frame_gate.unchanged(thumbnail):
+            return session.frame_gate.reuse()
+
+        # Pose on a crop around the dancer, hands on crops around the wrists (detector pool),
+        # at the quality level the server can currently sustain
+        inference_start = time.perf_counter()
+        detection = await session.roi_tracker.detect(
+            pose_detector_pool, rgb_frame, stream_id=session.session_id, level=quality_controller.level
+        )
+        if not detection.warmup:
+            quality_controller.record(time.perf_counter() - inference_start, pose_detector_pool.queue_depth)
+
+        result = await process_pose_landmarks(detection.pose_landmarks, detection.hand_landmarks,
+                                              detection.hand_classifications, session, image_data)
+        session.frame_gate.store(thumbnail, result)
         return result
 
     except Exception as e:
@@ -537,14 +712,17 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint with system status."""
+    await sync_shared_reference()
     return {
         "status": "healthy",
         "version": "1.0.0",
         "timestamp": time.time(),
-        "reference_loaded": comparison_service is not None,
-        "active_session": current_session['session_id'] is not None,
+        "reference_loaded": session_registry.reference_loaded,
+        "active_session": len(session_registry) > 0,
+        "active_sessions": len(session_registry),
+        "inference_quality": quality_controller.get_statistics(),
         "services": {
-            "pose_comparison": comparison_service is not None,
+            "pose_comparison": session_registry.reference_loaded,
             "live_feedback": True,
             "scoring": True
         }
@@ -560,32 +738,23 @@ async def start_session():
     """
     Start a new dance session.
 
+    Every session gets its own comparison, scoring and feedback state; pass the
+    returned session ID to the other /api/sessions endpoints.
+
     Returns:
         StartSessionResponse: Session ID and confirmation message
     """
-    global current_session
-
-    session_id = f"session_{int(time.time())}"
-    current_session = {
-        'session_id': session_id,
-        'start_time': time.time(),
-        'pose_data': [],
-        'feedback_history': [],
-        'reference_video': current_session.get('reference_video')
-    }
-
-    # Reset services for new session
-    live_feedback_service.reset()
-    scoring_service.reset()
+    await sync_shared_reference()
+    session = session_registry.create_session()
 
     return StartSessionResponse(
-        session_id=session_id,
+        session_id=session.session_id,
         message="Session started successfully"
     )
 
 
 @app.post("/api/sessions/end", response_model=SessionFeedbackResponse)
-async def end_session():
+async def end_session(request: SessionRequest):
     """
     End the current session and get comprehensive AI-generated summary.
 
@@ -598,21 +767,21 @@ async def end_session():
     SECURITY NOTE: Calls internal LLM service (OpenAI) automatically but
     returns ONLY processed feedback text. No OpenAI metadata is exposed.
 
+    Args:
+        request: SessionRequest with the session to end
+
     Returns:
         SessionFeedbackResponse: Complete session summary with AI-generated insights
     """
-    global current_session
-
-    if not current_session['session_id']:
-        raise HTTPException(status_code=400, detail="No active session to end")
+    session = await get_session_or_404(request.session_id)
 
     # Calculate basic session metrics
-    total_poses = len(current_session['pose_data'])
+    total_poses = len(session.pose_data)
 
     if total_poses > 0:
         similarity_scores = [
             data['comparison_result'].get('combined_score', 0.0)
-            for data in current_session['pose_data']
+            for data in session.pose_data
             if data['comparison_result']
         ]
         average_similarity = np.mean(similarity_scores) if similarity_scores else 0.0
@@ -620,13 +789,13 @@ async def end_session():
         average_similarity = 0.0
 
     # Get session statistics from scoring service
-    session_stats = scoring_service.get_session_statistics()
+    session_stats = session.scoring_service.get_session_statistics()
 
     # SERVER-SIDE EVENT: Automatically generate comprehensive AI summary
     # This is triggered internally when session ends (not a separate API call)
     # FeedbackGenerationService calls OpenAI internally but returns ONLY processed text
     ai_summary = feedback_generation_service.generate_session_summary(
-        live_feedback_history=current_session['feedback_history'],
+        live_feedback_history=session.feedback_history,
         session_statistics=session_stats
     )
 
@@ -634,11 +803,11 @@ async def end_session():
     # All AI-generated content (overall_summary, key_insights, etc.) comes from
     # the internal FeedbackGenerationService - NO OpenAI metadata is included
     response = SessionFeedbackResponse(
-        session_id=current_session['session_id'],
+        session_id=session.session_id,
         total_poses=total_poses,
         average_similarity=float(average_similarity),
         session_summary=ai_summary.get('overall_summary', 'Session completed!'),
-        detailed_feedback=current_session['feedback_history'],
+        detailed_feedback=session.feedback_history,
 
         # AI-generated insights (processed text only, no OpenAI metadata)
         key_insights=ai_summary.get('key_insights', []),
@@ -647,33 +816,32 @@ async def end_session():
         severity_distribution=ai_summary.get('severity_distribution', {})
     )
 
-    # Keep reference video loaded but reset session
-    reference_video = current_session.get('reference_video')
-    current_session = {
-        'session_id': None,
-        'start_time': None,
-        'pose_data': [],
-        'feedback_history': [],
-        'reference_video': reference_video
-    }
+    # Reference stays loaded for the other sessions
+    session_registry.end_session(session.session_id)
+    mediapipe_service.release_session(session.session_id)
 
     return response
 
 
 @app.get("/api/sessions/status", response_model=SessionStatusResponse)
-async def get_session_status():
+async def get_session_status(session_id: str):
     """
-    Get current session status.
+    Get session status.
+
+    Args:
+        session_id: Session to report on
 
     Returns:
-        SessionStatusResponse: Current session information
+        SessionStatusResponse: Session information
     """
+    session = await get_session_or_404(session_id)
     return SessionStatusResponse(
-        session_id=current_session['session_id'],
-        start_time=current_session['start_time'],
-        pose_count=len(current_session['pose_data']),
-        reference_video=current_session['reference_video'],
-        session_duration=time.time() - current_session['start_time'] if current_session['start_time'] else 0
+        session_id=session.session_id,
+        start_time=session.start_time,
+        pose_count=len(session.pose_data),
+        reference_video=session.reference_video,
+        session_duration=session.elapsed,
+        frames_skipped=session.frame_gate.frames_skipped
     )
 
 
@@ -682,28 +850,218 @@ async def get_session_status():
 # ============================================================================
 
 @app.post("/api/sessions/snapshot", response_model=ProcessSnapshotResponse)
-async def process_snapshot(request: ImageSnapshotRequest):
+async def process_snapshot(request: ImageSnapshotRequest, http_request: Request):
     """
     Process a single image snapshot for pose detection and comparison.
     This endpoint is called every 0.5 seconds by the frontend.
 
+    Landmarks can be returned packed (see app/utils/landmark_encoding.py) with
+    ?landmark_encoding=f16|i16 or Accept: application/json; landmarks=f16|i16.
+
     Args:
-        request: ImageSnapshotRequest with base64 encoded image
+        request: ImageSnapshotRequest with session ID and base64 encoded image
+        http_request: Raw request (landmark encoding negotiation)
 
     Returns:
         ProcessSnapshotResponse: Detected poses, comparison results, and live feedback
     """
+    session = await get_session_or_404(request.session_id)
+    encoding = landmark_encoding_of(http_request)
+
     try:
         if not request.image:
             raise HTTPException(status_code=400, detail='No image data provided')
 
-        result = process_image_snapshot(request.image)
-        return ProcessSnapshotResponse(**result)
+        async with frame_slot(session):
+            result = await process_image_snapshot(request.image, session)
+        return snapshot_response(result, encoding)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/sessions/snapshot/binary", response_model=ProcessSnapshotResponse)
+async def process_snapshot_binary(request: Request):
+    """
+    Binary variant of /api/sessions/snapshot.
+
+    The body is the encoded frame itself (Content-Type image/jpeg, image/webp, ...)
+    or a multipart form with an "image" file part; it is decoded without a base64 step.
+    The session travels as ?session_id=... or the X-Session-Id header.
+
+    Returns:
+        ProcessSnapshotResponse: Detected poses, comparison results, and live feedback
+    """
+    session = await get_session_or_404(frame_parameter(request, "session_id", required=True))
+    encoding = landmark_encoding_of(request)
+    image, _ = await read_frame_upload(request)
+
+    try:
+        async with frame_slot(session):
+            result = await process_image_snapshot(image, session)
+        return snapshot_response(result, encoding)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/sessions/landmarks", response_model=ProcessSnapshotResponse)
+async def process_landmarks_snapshot(request: LandmarksSnapshotRequest, http_request: Request):
+    """
+    Snapshot variant for clients that run pose estimation themselves.
+
+    The landmarks go straight to angle calculation, comparison and scoring;
+    no image is decoded or inferred on the server. Live feedback is generated
+    from the scores alone (no frame is sent to the feedback model).
+
+    Args:
+        request: LandmarksSnapshotRequest with session ID and landmarks
+        http_request: Raw request (landmark encoding negotiation)
+
+    Returns:
+        ProcessSnapshotResponse: Comparison results and live feedback
+    """
+    session = await get_session_or_404(request.session_id)
+    try:
+        pose_landmarks = parse_pose_landmarks(request.pose_landmarks)
+        hand_landmarks = parse_hand_landmarks(request.hand_landmarks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with frame_slot(session):
+        result = await process_pose_landmarks(pose_landmarks, hand_landmarks, request.hand_classifications, session)
+    return snapshot_response(result, landmark_encoding_of(http_request))
+
+
+@app.post("/api/sessions/landmarks/binary", response_model=ProcessSnapshotResponse)
+async def process_landmarks_snapshot_binary(request: Request):
+    """
+    Binary variant of /api/sessions/landmarks.
+
+    The body is packed little-endian float32: 33 x (x, y, z, visibility) pose
+    landmarks followed by 21 x (x, y, z) per hand (0-2 hands). The session
+    travels as ?session_id=... or the X-Session-Id header.
+
+    Returns:
+        ProcessSnapshotResponse: Comparison results and live feedback
+    """
+    session = await get_session_or_404(frame_parameter(request, "session_id", required=True))
+    try:
+        pose_landmarks, hand_landmarks = parse_landmark_bytes(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with frame_slot(session):
+        result = await process_pose_landmarks(pose_landmarks, hand_landmarks, [], session)
+    return snapshot_response(result, landmark_encoding_of(request))
+
+
+@app.websocket("/ws/sessions/{session_id}")
+async def stream_session(websocket: WebSocket, session_id: str):
+    """
+    Live practice over one WebSocket instead of a POST per snapshot.
+
+    The client sends binary messages: a 4-byte little-endian sequence number
+    followed by the encoded frame (JPEG/WebP). The server pushes a
+    StreamResultMessage (JSON) for each processed frame as soon as it is ready.
+    Frames are processed one at a time; a frame that arrives while another is
+    being processed replaces any frame still waiting, so results always
+    describe the newest frame and the stream never builds a backlog.
+
+    A frame that cannot be used (e.g. an undecodable image) gets an error
+    message and the stream continues; the socket is closed with 4404 when the
+    session is gone and with 1011 on unexpected server errors.
+
+    Connect with ?landmark_encoding=f16|i16 to receive packed landmarks.
+    """
+    await sync_shared_reference()
+    if session_registry.get_session(session_id) is None:
+        await websocket.close(code=4404, reason="Unknown or expired session")
+        return
+    try:
+        encoding = landmark_encoding_of(websocket)
+    except HTTPException as e:
+        await websocket.close(code=4400, reason=e.detail)
+        return
+    await websocket.accept()
+    print(f"[Stream] Session {session_id} connected")
+
+    latest: asyncio.Queue = asyncio.Queue(maxsize=1)
+    frames_dropped = 0
+
+    async def process_frames():
+        while True:
+            item = await latest.get()
+            if item is None:
+                return
+            sequence, image = item
+
+            # Marks the session active; it may have ended or expired meanwhile
+            session = session_registry.get_session(session_id)
+            if session is None:
+                await websocket.send_json({"type": "error", "sequence": sequence,
+                                           "error": "Unknown or expired session"})
+                await websocket.close(code=4404)
+                return
+
+            try:
+                # Waits if an HTTP request of the same session holds the frame slot
+                async with session.frame_lock:
+                    result = await process_image_snapshot(image, session)
+                message = snapshot_response(result, encoding, StreamResultMessage,
+                                            sequence=sequence, frames_dropped=frames_dropped)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "sequence": sequence, "error": str(e.detail)})
+                if e.status_code < 500 and e.status_code != 404:
+                    continue  # A bad frame (decode or validation error); the stream goes on
+                await websocket.close(code=4404 if e.status_code == 404 else 1011)
+                return
+            except Exception as e:
+                print(f"[Stream] Session {session_id} failed on frame {sequence}: {e}")
+                await websocket.send_json({"type": "error", "sequence": sequence, "error": str(e)})
+                await websocket.close(code=1011, reason="Frame processing failed")
+                return
+            await websocket.send_text(message.model_dump_json())
+
+    processor = asyncio.create_task(process_frames())
+    receiver: Optional[asyncio.Task] = None
+    try:
+        while True:
+            # Stop reading as soon as the processor ends (session gone or failure)
+            receiver = asyncio.create_task(websocket.receive())
+            await asyncio.wait({receiver, processor}, return_when=asyncio.FIRST_COMPLETED)
+            if not receiver.done():
+                break
+            message = receiver.result()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            data = message.get("bytes")
+            if not data or len(data) <= 4:
+                await websocket.send_json({"type": "error",
+                                           "error": "Expected a binary message: 4-byte sequence number + frame"})
+                continue
+
+            if latest.full():
+                latest.get_nowait()
+                frames_dropped += 1
+            latest.put_nowait((int.from_bytes(data[:4], "little"), memoryview(data)[4:]))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        for task in (receiver, processor):
+            if task is not None:
+                task.cancel()
+        if processor.done() and not processor.cancelled() and processor.exception() is not None:
+            # Sending the error itself failed (client already gone)
+            print(f"[Stream] Session {session_id} processing error: {processor.exception()}")
+        print(f"[Stream] Session {session_id} disconnected ({frames_dropped} frames dropped)")
+
+
 @app.post("/api/sessions/dual-snapshot", response_model=DualSnapshotResponse)
 async def process_dual_snapshot(request: DualSnapshotRequest):
     """
@@ -718,19 +1076,59 @@ async def process_dual_snapshot(request: DualSnapshotRequest):
     Returns:
         DualSnapshotResponse: Detailed dance feedback comparing user pose to reference
     """
+    return await run_dual_snapshot(request.webcam_image, request.reference_video_path,
+                                   request.video_timestamp, request.session_id)
+
+
+@app.post("/api/sessions/dual-snapshot/binary", response_model=DualSnapshotResponse)
+async def process_dual_snapshot_binary(request: Request):
+    """
+    Binary variant of /api/sessions/dual-snapshot.
+
+    The body is the encoded webcam frame (or a multipart form with an "image" part).
+    session_id, reference_video_path and video_timestamp travel as query parameters
+    or X-Session-Id / X-Reference-Video-Path / X-Video-Timestamp headers.
+
+    Returns:
+        DualSnapshotResponse: Detailed dance feedback comparing user pose to reference
+    """
+    session_id = frame_parameter(request, "session_id", required=True)
+    reference_video_path = frame_parameter(request, "reference_video_path", required=True)
+    video_timestamp = float_frame_parameter(request, "video_timestamp", required=True)
+    image, content_type = await read_frame_upload(request)
+
+    # The feedback model takes the webcam frame as a data URL
+    webcam_image = f"data:{content_type};base64,{base64.b64encode(image).decode()}"
+    return await run_dual_snapshot(webcam_image, reference_video_path, video_timestamp, session_id)
+
+
+async def run_dual_snapshot(webcam_image: str, reference_video_path: str, video_timestamp: float,
+                            session_id: str) -> DualSnapshotResponse:
+    """
+    Tier 1 (and, when available, Tier 2) feedback for one webcam frame.
+
+    Args:
+        webcam_image: Webcam frame as a base64 data URL
+        reference_video_path: Reference video file
+        video_timestamp: Current timestamp in the reference video
+        session_id: Session the frame belongs to
+
+    Returns:
+        DualSnapshotResponse: Feedback, or a fallback response with success=False
+    """
     try:
-        if not request.webcam_image:
+        if not webcam_image:
             raise HTTPException(status_code=400, detail='No webcam image data provided')
         
-        if not request.reference_video_path:
+        if not reference_video_path:
             raise HTTPException(status_code=400, detail='No reference video path provided')
 
         # Process the dual snapshot using the enhanced Tier 2 system
         tier1_result, tier2_result = await dual_snapshot_service.process_dual_snapshot_with_tier2(
-            webcam_snapshot=request.webcam_image,
-            reference_video_path=request.reference_video_path,
-            video_timestamp=request.video_timestamp,
-            session_id=request.session_id
+            webcam_snapshot=webcam_image,
+            reference_video_path=reference_video_path,
+            video_timestamp=video_timestamp,
+            session_id=session_id
         )
         
         # Build response with Tier 2 data if available
@@ -779,7 +1177,7 @@ async def process_dual_snapshot(request: DualSnapshotRequest):
     except Exception as e:
         print(f"[API] Error in dual snapshot processing: {e}")
         return DualSnapshotResponse(
-            timestamp=request.video_timestamp,
+            timestamp=video_timestamp,
             feedback_text="Keep practicing! Focus on matching the reference pose.",
             severity="medium",
             focus_areas=["general"],
@@ -797,28 +1195,115 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
     """
     Analyze poses using MediaPipe on both user and reference images.
     This endpoint provides detailed pose detection and comparison.
+
+    With reference_id + reference_timestamp only the user image is inferred; the
+    reference pose is interpolated from the processed reference video.
     
     Args:
-        request: MediaPipeRequest with user and reference images
+        request: MediaPipeRequest with a user image and a reference image or reference ID
         
     Returns:
         MediaPipeResponse: Detailed pose analysis results
     """
+    return await run_mediapipe_analysis(
+        user_image=request.user_image,
+        reference_image=request.reference_image,
+        reference_id=request.reference_id,
+        reference_timestamp=request.reference_timestamp,
+        timestamp=request.timestamp,
+        draw_landmarks=bool(request.draw_landmarks),
+        session_id=request.session_id
+    )
+
+
+@app.post("/api/mediapipe/analyze/binary", response_model=MediaPipeResponse)
+async def analyze_mediapipe_poses_binary(request: Request):
+    """
+    Binary variant of /api/mediapipe/analyze.
+
+    Either a multipart form with "user_image" and (optionally) "reference_image"
+    file parts, or the encoded user frame as the raw body together with
+    reference_id + reference_timestamp. The remaining fields (reference_id,
+    reference_timestamp, timestamp, draw_landmarks, session_id) travel as query
+    parameters or X- headers (X-Reference-Id, X-Session-Id, ...).
+
+    Returns:
+        MediaPipeResponse: Detailed pose analysis results
+    """
+    user_image, _ = await read_frame_upload(request, "user_image")
+    reference_image = None
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        reference_image, _ = await read_frame_upload(request, "reference_image", required=False)
+
+    return await run_mediapipe_analysis(
+        user_image=user_image,
+        reference_image=reference_image,
+        reference_id=frame_parameter(request, "reference_id"),
+        reference_timestamp=float_frame_parameter(request, "reference_timestamp"),
+        timestamp=float_frame_parameter(request, "timestamp"),
+        draw_landmarks=(frame_parameter(request, "draw_landmarks") or "").lower() in ("1", "true", "yes"),
+        session_id=frame_parameter(request, "session_id")
+    )
+
+
+async def run_mediapipe_analysis(user_image: Union[str, bytes], reference_image: Optional[Union[str, bytes]],
+                                 reference_id: Optional[str], reference_timestamp: Optional[float],
+                                 timestamp: Optional[float], draw_landmarks: bool,
+                                 session_id: Optional[str]) -> MediaPipeResponse:
+    """
+    Detect and compare the user's and the reference pose.
+
+    Images are base64 strings (JSON endpoint) or raw encoded bytes (binary endpoint).
+    With reference_id + reference_timestamp only the user image is inferred.
+
+    Returns:
+        MediaPipeResponse: Detailed pose analysis results
+
+    Raises:
+        HTTPException: 400 for invalid input, 404 for an unknown reference
+    """
     try:
-        if not request.user_image:
+        if not user_image:
             raise HTTPException(status_code=400, detail='No user image data provided')
         
-        if not request.reference_image:
-            raise HTTPException(status_code=400, detail='No reference image data provided')
+        if reference_id:
+            if os.path.basename(reference_id) != reference_id:
+                raise HTTPException(status_code=400, detail='Invalid reference_id')
+            if reference_timestamp is None:
+                raise HTTPException(status_code=400, detail='reference_timestamp is required with reference_id')
 
-        print(f"[MediaPipe API] Processing dual frames with timestamp: {request.timestamp}")
-        
-        # Process both images with MediaPipe
-        result = mediapipe_service.process_dual_frames(
-            user_image_b64=request.user_image,
-            reference_image_b64=request.reference_image,
-            timestamp=request.timestamp or time.time()
-        )
+            try:
+                reference_features = reference_cache.get(
+                    os.path.join(PROCESSED_POSES_DIR, f"{reference_id}_poses")
+                )
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail=f'Reference {reference_id} not found')
+
+            print(f"[MediaPipe API] Processing user frame against {reference_id} "
+                  f"at {reference_timestamp:.2f}s")
+
+            # Only the user image needs inference (off the event loop)
+            result = await run_blocking(
+                mediapipe_service.process_frame_with_reference,
+                user_image_b64=user_image,
+                reference_landmarks=reference_features.landmarks_at(reference_timestamp),
+                timestamp=timestamp or time.time(),
+                session_id=session_id
+            )
+        else:
+            if not reference_image:
+                raise HTTPException(status_code=400, detail='No reference image data provided')
+
+            print(f"[MediaPipe API] Processing dual frames with timestamp: {timestamp}")
+
+            # Process both images with MediaPipe (off the event loop; both inferences overlap)
+            result = await run_blocking(
+                mediapipe_service.process_dual_frames,
+                user_image_b64=user_image,
+                reference_image_b64=reference_image,
+                timestamp=timestamp or time.time(),
+                session_id=session_id
+            )
         
         if not result.success:
             raise HTTPException(status_code=500, detail=result.error or "MediaPipe processing failed")
@@ -839,9 +1324,9 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
             response_data["user_analysis"] = mediapipe_service.get_pose_analysis(result.user_pose.landmarks)
             
             # Draw landmarks on user image if requested
-            if request.draw_landmarks:
-                response_data["user_image_with_landmarks"] = mediapipe_service.draw_pose_landmarks(
-                    request.user_image, result.user_pose.landmarks
+            if draw_landmarks:
+                response_data["user_image_with_landmarks"] = await run_blocking(
+                    mediapipe_service.draw_pose_landmarks, user_image, result.user_pose.landmarks
                 )
         
         if result.reference_pose and result.reference_pose.has_pose:
@@ -849,9 +1334,9 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
             response_data["reference_analysis"] = mediapipe_service.get_pose_analysis(result.reference_pose.landmarks)
             
             # Draw landmarks on reference image if requested
-            if request.draw_landmarks:
-                response_data["reference_image_with_landmarks"] = mediapipe_service.draw_pose_landmarks(
-                    request.reference_image, result.reference_pose.landmarks
+            if draw_landmarks and reference_image:
+                response_data["reference_image_with_landmarks"] = await run_blocking(
+                    mediapipe_service.draw_pose_landmarks, reference_image, result.reference_pose.landmarks
                 )
         
         print(f"[MediaPipe API] Analysis complete: user_pose={response_data['user_pose_detected']}, "
@@ -876,30 +1361,50 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
 
 
 @app.get("/api/sessions/pose-sequence")
-async def get_pose_sequence():
+async def get_pose_sequence(session_id: str, request: Request):
     """
-    Get the current pose sequence for analysis.
+    Get a session's pose sequence for analysis.
+
+    With ?landmark_encoding=f16|i16 (or Accept: application/json; landmarks=...)
+    the sequence is returned as one packed (N, 33, 4) array in packed_sequence.
+
+    Args:
+        session_id: Session whose sequence is returned
+        request: Raw request (landmark encoding negotiation)
 
     Returns:
         dict: Current pose sequence and metadata
     """
+    session = await get_session_or_404(session_id)
+    encoding = landmark_encoding_of(request)
+    if encoding:
+        return {
+            'sequence': [],
+            'packed_sequence': encode_landmarks(np.stack(session.pose_sequence), encoding)
+            if session.pose_sequence else None,
+            'length': len(session.pose_sequence),
+            'max_length': MAX_SEQUENCE_LENGTH
+        }
     return {
-        'sequence': [pose.tolist() for pose in pose_sequence],
-        'length': len(pose_sequence),
+        'sequence': [pose.tolist() for pose in session.pose_sequence],
+        'length': len(session.pose_sequence),
         'max_length': MAX_SEQUENCE_LENGTH
     }
 
 
 @app.post("/api/sessions/clear-sequence")
-async def clear_sequence():
+async def clear_sequence(request: SessionRequest):
     """
-    Clear the pose sequence buffer.
+    Clear a session's pose sequence buffer.
+
+    Args:
+        request: SessionRequest with the session to clear
 
     Returns:
         dict: Success confirmation
     """
-    global pose_sequence
-    pose_sequence = []
+    session = await get_session_or_404(request.session_id)
+    session.pose_sequence.clear()
     return {'success': True, 'message': 'Pose sequence cleared'}
 
 
@@ -919,7 +1424,7 @@ async def load_reference(request: LoadReferenceRequest):
         dict: Success message
     """
     try:
-        success = load_reference_video(request.video_name)
+        success = await run_blocking(load_reference_video, request.video_name)
         if success:
             return {
                 "success": True,
@@ -943,20 +1448,87 @@ async def get_current_reference():
     Returns:
         dict: Current reference video information
     """
-    if comparison_service is None:
+    await sync_shared_reference()
+    if not session_registry.reference_loaded:
         return {
             "loaded": False,
             "video_name": None
         }
 
-    stats = comparison_service.get_statistics()
+    stats = session_registry.get_statistics()
     return {
         "loaded": True,
-        "video_name": current_session.get('reference_video'),
-        "reference_frames": stats.get('reference_frames', 0)
+        "video_name": stats['reference_video'],
+        "reference_frames": stats['reference_frames']
     }
 
 
+# ============================================================================
+# API ENDPOINTS - BATCH SCORING
+# ============================================================================
+
+@app.post("/api/batch/score", response_model=BatchJobResponse)
+async def submit_batch_scoring(video: UploadFile = File(...)):
+    """
+    Score a recorded practice video against the loaded reference.
+
+    The video is scored in a background job; poll /api/batch/{job_id} for
+    progress and the result. Videos over settings.batch_max_upload_mb are
+    rejected with 413.
+
+    Args:
+        video: Uploaded video file
+
+    Returns:
+        BatchJobResponse: The queued job
+    """
+    await sync_shared_reference()
+    comparison_service = session_registry.create_comparison_service()
+    if comparison_service is None:
+        raise HTTPException(status_code=400, detail="No reference video loaded")
+
+    # Copy the upload in chunks, without blocking the event loop on one large read
+    max_bytes = settings.batch_max_upload_mb * 1024 * 1024
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    video_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        size = 0
+        while True:
+            chunk = await video.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413,
+                                    detail=f"Video exceeds the {settings.batch_max_upload_mb} MB upload limit")
+            await run_blocking(video_file.write, chunk)
+        video_file.close()
+    except BaseException:
+        video_file.close()
+        os.remove(video_file.name)
+        raise
+
+    job_id = batch_scoring_service.submit(video_file.name, comparison_service)
+    return BatchJobResponse(**batch_scoring_service.get_job(job_id))
+
+
+@app.get("/api/batch/{job_id}", response_model=BatchJobResponse)
+async def get_batch_scoring_job(job_id: str):
+    """
+    Get the status, progress and result of a batch scoring job.
+
+    Args:
+        job_id: ID returned by /api/batch/score
+
+    Returns:
+        BatchJobResponse: Job status, with the timeline and problem areas once completed
+    """
+    job = batch_scoring_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job: {job_id}")
+    return BatchJobResponse(**job)
+
+
 # ============================================================================
 # API ENDPOINTS - CONFIGURATION
 # ============================================================================
@@ -972,7 +1544,7 @@ async def update_config(request: UpdateConfigRequest):
     Returns:
         dict: Updated configuration
     """
-    global current_config, comparison_service
+    global current_config
 
     try:
         # Handle preset configurations
@@ -1005,9 +1577,8 @@ async def update_config(request: UpdateConfigRequest):
         # Update global config
         current_config = new_config
 
-        # Update comparison service if it exists
-        if comparison_service:
-            comparison_service.update_config(current_config)
+        # Update every session's comparison service
+        session_registry.update_config(current_config)
 
         return {
             "success": True,
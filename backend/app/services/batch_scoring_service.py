@@ -0,0 +1,208 @@
+"""
+Batch Scoring Service
+
+Scores a recorded practice video against the loaded reference in the
+background. Poses are extracted from the video first, then every frame is
+scored in one pass with PoseComparisonService.score_sequence, and the scores
+are summarised with ScoringService like a live session.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.data.config import settings
+from .pose_comparison_service import PoseComparisonService
+from .process_video_pose import VideoPoseProcessor
+from .scoring import ScoringService
+
+
+class BatchScoringService:
+    """
+    Background job registry for offline video scoring.
+
+    Job lifecycle: queued -> extracting -> scoring -> completed (or failed).
+    Progress runs from 0.0 to 1.0; pose extraction is by far the slowest stage
+    and covers the first 90%.
+    """
+
+    EXTRACTION_SHARE = 0.9
+
+    def __init__(self, max_concurrent_jobs: int = 1, max_jobs: int = 20,
+                 model_complexity: int = 1):
+        """
+        Initialize batch scoring service.
+
+        Args:
+            max_concurrent_jobs: Jobs processed at the same time (later jobs wait as queued)
+            max_jobs: Finished jobs kept for polling (oldest are dropped first)
+            model_complexity: MediaPipe pose model used for extraction
+        """
+        self.max_jobs = max_jobs
+        self.model_complexity = model_complexity
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Queued jobs wait in the executor's queue instead of each holding a thread
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_jobs),
+                                            thread_name_prefix="batch-scoring")
+        self._processor: Optional[VideoPoseProcessor] = None
+
+    def submit(self, video_path: str, comparison_service: PoseComparisonService,
+               delete_video: bool = True) -> str:
+        """
+        Queue a video for scoring.
+
+        Args:
+            video_path: Path to the uploaded video
+            comparison_service: Service holding the reference to score against
+            delete_video: Remove the video file when the job finishes
+
+        Returns:
+            Job ID for get_job
+        """
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'progress': 0.0,
+                'created_at': time.time(),
+                'finished_at': None,
+                'error': None,
+                'result': None
+            }
+            self._prune_jobs()
+
+        self._executor.submit(self._run_job, job_id, video_path, comparison_service, delete_video)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a job's status, progress and (when completed) result."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def score_poses(self, poses: List[Dict[str, Any]],
+                    comparison_service: PoseComparisonService) -> Dict[str, Any]:
+        """
+        Score extracted poses against the reference.
+
+        Args:
+            poses: Frames from VideoPoseProcessor.extract_poses
+            comparison_service: Service holding the reference to score against
+
+        Returns:
+            Dictionary with the per-frame timeline, problem areas, session
+            statistics and frame counts
+        """
+        start_time = time.perf_counter()
+        frames = [pose for pose in poses if pose.get('landmarks') is not None]
+        timestamps = [pose['timestamp'] for pose in frames]
+        scores = comparison_service.score_sequence([pose['landmarks'] for pose in frames], timestamps)
+
+        # Summarise like a live session (timestamps relative to the first scored frame)
+        scoring_service = ScoringService()
+        first_timestamp = timestamps[0] if timestamps else 0.0
+        for i, timestamp in enumerate(timestamps):
+            scoring_service.add_score(
+                timestamp=timestamp - first_timestamp,
+                combined_score=float(scores['combined_score'][i]),
+                pose_score=float(scores['pose_score'][i]),
+                motion_score=float(scores['motion_score'][i])
+            )
+
+        timeline = []
+        for i, point in enumerate(scoring_service.get_timeline()):
+            timeline.append({
+                **point,
+                'video_timestamp': float(timestamps[i]),
+                'pose_score': float(scores['pose_score'][i]),
+                'motion_score': float(scores['motion_score'][i]),
+                'dtw_score': float(scores['dtw_score'][i]),
+                'best_match_idx': int(scores['best_match_idx'][i]),
+                'reference_timestamp': float(scores['reference_timestamp'][i]),
+                'timing_offset': float(scores['timing_offset'][i])
+            })
+
+        return {
+            'timeline': timeline,
+            'problem_areas': _to_builtin(scoring_service.identify_problem_areas()),
+            'statistics': _to_builtin(scoring_service.get_session_statistics()),
+            'frames_sampled': len(poses),
+            'frames_scored': len(frames),
+            'scoring_time': time.perf_counter() - start_time
+        }
+
+    def _run_job(self, job_id: str, video_path: str,
+                 comparison_service: PoseComparisonService, delete_video: bool):
+        """Executor thread: extract poses, score them and store the result."""
+        try:
+            self._update_job(job_id, status='extracting')
+            extraction_start = time.perf_counter()
+            poses = self._get_processor().extract_poses(
+                video_path,
+                target_fps=comparison_service.reference_fps,
+                model_complexity=self.model_complexity,
+                progress_callback=lambda fraction: self._update_job(
+                    job_id, progress=self.EXTRACTION_SHARE * fraction
+                )
+            )
+            extraction_time = time.perf_counter() - extraction_start
+
+            self._update_job(job_id, status='scoring', progress=self.EXTRACTION_SHARE)
+            result = self.score_poses(poses, comparison_service)
+            result['extraction_time'] = extraction_time
+            self._update_job(job_id, status='completed', progress=1.0,
+                             result=result, finished_at=time.time())
+            print(f"[BatchScoring] Job {job_id}: scored {result['frames_scored']} frames "
+                  f"(extraction {extraction_time:.1f}s, scoring {result['scoring_time']:.2f}s)")
+
+        except Exception as e:
+            print(f"[BatchScoring] Job {job_id} failed: {e}")
+            self._update_job(job_id, status='failed', error=str(e), finished_at=time.time())
+
+        finally:
+            if delete_video and os.path.exists(video_path):
+                os.remove(video_path)
+
+    def _get_processor(self) -> VideoPoseProcessor:
+        """Create the video processor on first use."""
+        if self._processor is None:
+            self._processor = VideoPoseProcessor()
+        return self._processor
+
+    def _update_job(self, job_id: str, **fields):
+        """Update a job's fields under the lock."""
+        with self._lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _prune_jobs(self):
+        """Drop the oldest finished jobs beyond max_jobs (caller holds the lock)."""
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job['status'] in ('completed', 'failed')]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+
+def _to_builtin(value: Any) -> Any:
+    """Convert numpy scalars in nested results to plain Python values."""
+    if isinstance(value, dict):
+        return {key: _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# Global batch scoring service instance
+batch_scoring_service = BatchScoringService(
+    max_concurrent_jobs=settings.batch_max_concurrent_jobs,
+    model_complexity=settings.mediapipe_model_complexity
+)
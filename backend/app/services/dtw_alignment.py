@@ -0,0 +1,353 @@
+"""
+Dynamic Time Warping alignment between user and reference pose sequences.
+
+Poses are compared as unit-length vectors in the reference layout used by
+PoseComparisonService, so the local cost of matching two frames is their
+squared Euclidean distance (2 - 2 * cosine similarity, in [0, 4]).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+class OnlineDTW:
+    """
+    Streaming, open-end DTW against a fixed reference sequence.
+
+    Keeps only the cost-matrix column of the latest user frame (the frontier),
+    restricted to a band of reference frames around the current alignment.
+    Each new user frame extends the alignment in O(band width), in the style of
+    online time warping: the path may start anywhere in the first band
+    (open-begin) and the current alignment is the cheapest end point of the
+    newest column (open-end).
+
+    Allowed steps are the classic symmetric ones (both advance, only the user
+    advances, only the reference advances), plus reference skips of up to
+    twice the expected advance per user frame. Skips let a dancer captured at a
+    lower frame rate than the reference (e.g. 2 snapshots/s against a 15 FPS
+    reference) follow it without paying for every skipped reference frame.
+    """
+
+    def __init__(self, reference: np.ndarray, band_width: int = 30):
+        """
+        Initialize the aligner.
+
+        Args:
+            reference: (N, D) matrix of unit-length reference pose vectors
+            band_width: Reference frames kept on each side of the expected position
+        """
+        self.reference = reference
+        self.band_width = max(1, int(band_width))
+        self.reset()
+
+    def reset(self):
+        """Forget the current alignment; the next step starts a new path."""
+        self.column_start = 0
+        self.column_costs: Optional[np.ndarray] = None
+        self.column_lengths: Optional[np.ndarray] = None
+        self.position: Optional[int] = None
+        self.cumulative_cost = 0.0
+        self.path_length = 0
+        self.steps = 0
+
+    @property
+    def normalized_cost(self) -> float:
+        """Average local cost along the current best path."""
+        return self.cumulative_cost / self.path_length if self.path_length > 0 else 0.0
+
+    def _local_costs(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Squared distance between a unit query vector and reference rows [start, end)."""
+        return np.maximum(2.0 - 2.0 * (self.reference[start:end] @ query), 0.0)
+
+    def _previous_column(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Previous column costs/lengths at the given reference indices (inf outside its band)."""
+        costs = np.full(len(indices), np.inf)
+        lengths = np.zeros(len(indices), dtype=np.int64)
+        offsets = indices - self.column_start
+        inside = (offsets >= 0) & (offsets < len(self.column_costs))
+        costs[inside] = self.column_costs[offsets[inside]]
+        lengths[inside] = self.column_lengths[offsets[inside]]
+        return costs, lengths
+
+    def step(self, query: np.ndarray, expected_advance: float = 0.0,
+             anchor: Optional[int] = None) -> Tuple[int, float]:
+        """
+        Extend the alignment by one user frame.
+
+        Args:
+            query: Unit-length user pose vector in reference layout
+            expected_advance: Reference frames the dancer is expected to have moved
+                since the previous step (e.g. elapsed time * reference FPS)
+            anchor: Reference index to center the band on when a new path starts
+                (defaults to the start of the reference)
+
+        Returns:
+            Tuple of (aligned reference index, cumulative path cost)
+        """
+        num_frames = len(self.reference)
+        if num_frames == 0:
+            return 0, 0.0
+
+        if self.column_costs is None:
+            center = anchor if anchor is not None else 0
+        else:
+            center = self.position + int(round(expected_advance))
+
+        start = max(0, center - self.band_width)
+        end = min(num_frames, center + self.band_width + 1)
+        if self.column_costs is not None:
+            # Keep the band connected to the previous alignment
+            start = min(start, self.position)
+            end = max(end, self.position + 1)
+
+        indices = np.arange(start, end)
+        local_costs = self._local_costs(query, start, end)
+
+        if self.column_costs is None:
+            # Open-begin: a path may start at any reference frame in the band
+            entry_costs = np.zeros(len(indices))
+            entry_lengths = np.zeros(len(indices), dtype=np.int64)
+        else:
+            # Enter from any previous-column cell j - max_step .. j
+            max_step = max(1, int(np.ceil(2.0 * expected_advance)))
+            window_costs, window_lengths = self._previous_column(np.arange(start - max_step, end))
+            windows = np.lib.stride_tricks.sliding_window_view(window_costs, max_step + 1)
+            choice = np.argmin(windows, axis=1)
+            entry_costs = windows[np.arange(len(indices)), choice]
+            entry_lengths = window_lengths[np.arange(len(indices)) + choice]
+
+        # Horizontal steps within the column: D[j] = min_k(entry[k] + sum(cost[k..j]))
+        prefix = np.cumsum(local_costs)
+        candidates = entry_costs - (prefix - local_costs)
+        running_min = np.minimum.accumulate(candidates)
+        positions = np.arange(len(indices))
+        sources = np.maximum.accumulate(np.where(candidates == running_min, positions, -1))
+        costs = prefix + running_min
+
+        if not np.isfinite(costs).any():
+            # The band lost contact with the previous path; start a new one here
+            self.reset()
+            return self.step(query, anchor=center)
+
+        lengths = entry_lengths[np.maximum(sources, 0)] + (positions - sources) + 1
+
+        self.column_start = start
+        self.column_costs = costs
+        self.column_lengths = lengths
+        self.steps += 1
+
+        # Open-end: the alignment ends at the cheapest average-cost path in the column
+        best = int(np.argmin(costs / lengths))
+        self.position = start + best
+        self.cumulative_cost = float(costs[best])
+        self.path_length = int(lengths[best])
+
+        return self.position, self.cumulative_cost
+
+
+def sakoe_chiba_dtw(user: np.ndarray, reference: np.ndarray,
+                    band: int) -> Tuple[float, List[Tuple[int, int]]]:
+    """
+    Multivariate DTW between two pose sequences inside a Sakoe-Chiba band.
+
+    Each frame is a whole pose vector, so joints are never mixed with time.
+    Cells are only evaluated within `band` reference frames of the (scaled)
+    diagonal, and each row is computed in one vectorized pass.
+
+    Args:
+        user: (n, D) matrix of unit-length user pose vectors
+        reference: (m, D) matrix of unit-length reference pose vectors
+        band: Half-width of the band in reference frames
+
+    Returns:
+        Tuple of (total path cost, warping path as (user_idx, reference_idx) pairs
+        from (0, 0) to (n - 1, m - 1)). Returns (inf, []) for empty input.
+    """
+    num_user, num_reference = len(user), len(reference)
+    if num_user == 0 or num_reference == 0:
+        return float('inf'), []
+
+    slope = (num_reference - 1) / (num_user - 1) if num_user > 1 else 0.0
+    # Rows must overlap for the path to stay connected
+    band = max(1, int(band), int(np.ceil(slope)))
+
+    row_starts: List[int] = []
+    row_sources: List[np.ndarray] = []
+    row_diagonals: List[np.ndarray] = []
+    previous_start, previous_costs = 0, None
+
+    for i in range(num_user):
+        center = i * slope if num_user > 1 else num_reference - 1
+        start = max(0, int(np.floor(center - band)))
+        end = min(num_reference, int(np.ceil(center + band)) + 1)
+        if i == 0:
+            start = 0
+        if i == num_user - 1:
+            end = num_reference
+
+        indices = np.arange(start, end)
+        local_costs = np.maximum(2.0 - 2.0 * (reference[start:end] @ user[i]), 0.0)
+
+        if previous_costs is None:
+            # The path starts at (0, 0)
+            entry_costs = np.full(len(indices), np.inf)
+            entry_costs[0] = 0.0
+            use_diagonal = np.zeros(len(indices), dtype=bool)
+        else:
+            up_costs = _gather(previous_costs, previous_start, indices)
+            diagonal_costs = _gather(previous_costs, previous_start, indices - 1)
+            use_diagonal = diagonal_costs <= up_costs
+            entry_costs = np.where(use_diagonal, diagonal_costs, up_costs)
+
+        # Horizontal steps within the row (see OnlineDTW.step)
+        prefix = np.cumsum(local_costs)
+        candidates = entry_costs - (prefix - local_costs)
+        running_min = np.minimum.accumulate(candidates)
+        positions = np.arange(len(indices))
+        sources = np.maximum.accumulate(np.where(candidates == running_min, positions, -1))
+
+        row_starts.append(start)
+        row_sources.append(sources)
+        row_diagonals.append(use_diagonal)
+        previous_start, previous_costs = start, prefix + running_min
+
+    total_cost = float(previous_costs[-1])
+
+    # Backtrack from the last cell
+    path: List[Tuple[int, int]] = []
+    i, j = num_user - 1, num_reference - 1
+    while True:
+        start = row_starts[i]
+        run_start = start + int(row_sources[i][j - start])
+        path.extend((i, column) for column in range(j, run_start - 1, -1))
+        if i == 0:
+            break
+        j = run_start - 1 if row_diagonals[i][run_start - start] else run_start
+        i -= 1
+    path.reverse()
+
+    return total_cost, path
+
+
+def _gather(values: np.ndarray, start: int, indices: np.ndarray) -> np.ndarray:
+    """Values at absolute indices of a row stored from `start` (inf outside it)."""
+    result = np.full(len(indices), np.inf)
+    offsets = indices - start
+    inside = (offsets >= 0) & (offsets < len(values))
+    result[inside] = values[offsets[inside]]
+    return result
+
+
+def timing_offsets(path: List[Tuple[int, int]], user_timestamps: np.ndarray,
+                   reference_timestamps: np.ndarray) -> np.ndarray:
+    """
+    Per-user-frame timing offsets derived from a warping path.
+
+    The offset of user frame i is how much further the dancer has moved through
+    the reference than the wall-clock time that has passed since the first frame
+    of the path. Positive values mean the dancer is ahead (rushing), negative
+    values mean behind (dragging).
+
+    Args:
+        path: Warping path of (user_idx, reference_idx) pairs
+        user_timestamps: Timestamp of every user frame in seconds
+        reference_timestamps: Timestamp of every reference frame in seconds
+
+    Returns:
+        (n,) array of offsets in seconds
+    """
+    user_timestamps = np.asarray(user_timestamps, dtype=np.float64)
+    if not path:
+        return np.zeros(len(user_timestamps))
+
+    pairs = np.asarray(path)
+    matched_time = np.zeros(len(user_timestamps))
+    matched_count = np.zeros(len(user_timestamps))
+    np.add.at(matched_time, pairs[:, 0], np.asarray(reference_timestamps)[pairs[:, 1]])
+    np.add.at(matched_count, pairs[:, 0], 1)
+    matched_time /= np.maximum(matched_count, 1)
+
+    return (matched_time - matched_time[0]) - (user_timestamps - user_timestamps[0])
+
+
+def keogh_envelope(reference: np.ndarray, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Upper/lower LB_Keogh envelopes of a reference sequence.
+
+    Row j of each envelope is the per-coordinate max/min of the reference frames
+    within `radius` of j. Computed once when a reference is loaded.
+
+    Args:
+        reference: (N, D) reference matrix
+        radius: Envelope half-width in frames
+
+    Returns:
+        Tuple of (upper, lower) envelopes, both (N, D)
+    """
+    if len(reference) == 0:
+        return reference.copy(), reference.copy()
+
+    radius = max(0, int(radius))
+    padded = np.pad(reference, ((radius, radius), (0, 0)), mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=0)
+    return (np.ascontiguousarray(windows.max(axis=-1)),
+            np.ascontiguousarray(windows.min(axis=-1)))
+
+
+def locate_subsequence(query: np.ndarray, span: int, reference: np.ndarray,
+                       upper: np.ndarray, lower: np.ndarray,
+                       band: int) -> Optional[Dict[str, Any]]:
+    """
+    Find where a short user sequence belongs in a long reference.
+
+    Every reference offset s is a candidate for aligning the query with
+    reference[s : s + span] using sakoe_chiba_dtw. A cheap LB_Keogh lower bound
+    is computed for all candidates at once, and full banded DTW is only run on
+    candidates (in increasing bound order) whose bound is below the best cost
+    found so far, so the result is the same as an exhaustive search.
+
+    Args:
+        query: (n, D) unit-length user pose vectors, oldest first
+        span: Number of reference frames the query covers (e.g. its duration * FPS + 1)
+        reference: (N, D) unit-length reference pose vectors
+        upper: Upper envelope of the reference (see keogh_envelope)
+        lower: Lower envelope of the reference
+        band: DTW band half-width; the bound is exact when the envelope radius is
+            at least max(band, (span - 1) / (n - 1)) + 1
+
+    Returns:
+        Dictionary with the best 'start_idx', 'end_idx' (where the last query
+        frame aligns), 'cost', 'candidates' and 'dtw_evaluations', or None when
+        the query is empty or longer than the reference.
+    """
+    span = max(1, int(span))
+    num_candidates = len(reference) - span + 1
+    if len(query) == 0 or num_candidates <= 0:
+        return None
+
+    # Query frame i is matched near the band diagonal i * slope of its candidate
+    slope = (span - 1) / (len(query) - 1) if len(query) > 1 else 0.0
+    offsets = np.rint(np.arange(len(query)) * slope).astype(np.int64)
+
+    # LB_Keogh for every candidate offset, one query frame at a time
+    bounds = np.zeros(num_candidates)
+    for frame, offset in zip(query, offsets):
+        above = np.maximum(frame - upper[offset:offset + num_candidates], 0.0)
+        below = np.maximum(lower[offset:offset + num_candidates] - frame, 0.0)
+        bounds += np.einsum('ij,ij->i', above, above) + np.einsum('ij,ij->i', below, below)
+
+    best_cost, best_start, evaluations = float('inf'), 0, 0
+    for start in np.argsort(bounds, kind='stable'):
+        if bounds[start] >= best_cost:
+            break
+        cost, _ = sakoe_chiba_dtw(query, reference[start:start + span], band)
+        evaluations += 1
+        if cost < best_cost:
+            best_cost, best_start = cost, int(start)
+
+    return {
+        'start_idx': best_start,
+        'end_idx': best_start + span - 1,
+        'cost': best_cost,
+        'candidates': num_candidates,
+        'dtw_evaluations': evaluations
+    }
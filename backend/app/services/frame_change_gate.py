@@ -0,0 +1,116 @@
+"""
+Frame Change Gate
+
+Skips inference on snapshots that are practically identical to the last
+inferred one (pauses, frozen webcams, held poses). Each decoded frame is
+reduced to a small grayscale thumbnail; when its mean absolute difference from
+the thumbnail of the last inferred frame is below a threshold, the previous
+result is returned instead of running pose inference, comparison and feedback
+again.
+
+Frames are compared against the last *inferred* frame, not the previous one,
+so slow drift still adds up to a refresh. A result is never reused for longer
+than max_reuse seconds.
+"""
+import time
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.data.config import settings
+
+THUMBNAIL_SIZE = (32, 24)  # (width, height)
+
+
+class FrameChangeGate:
+    """
+    Per-session change detector with the result to reuse.
+
+    Usage:
+        thumbnail = gate.thumbnail(rgb_frame)
+        if gate.unchanged(thumbnail):
+            result = gate.reuse()
+        else:
+            result = ... run inference ...
+            gate.store(thumbnail, result)
+    """
+
+    def __init__(self, enabled: bool = settings.frame_change_gate_enabled,
+                 threshold: float = settings.frame_change_threshold,
+                 max_reuse: float = settings.frame_change_max_reuse):
+        """
+        Initialize the gate.
+
+        Args:
+            enabled: Reuse results of unchanged frames (False infers every frame)
+            threshold: Mean absolute grayscale difference (0-255) below which a frame counts as unchanged
+            max_reuse: Seconds after which a frame is inferred even if unchanged
+        """
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+
+        self._thumbnail: Optional[np.ndarray] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._inferred_at = 0.0
+
+        self.frames_skipped = 0
+        self.last_difference: Optional[float] = None
+
+    def thumbnail(self, rgb_frame: np.ndarray) -> np.ndarray:
+        """Small grayscale version of a frame, as compared by the gate."""
+        small = cv2.resize(rgb_frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY).astype(np.int16)
+
+    def difference(self, thumbnail: np.ndarray) -> Optional[float]:
+        """Mean absolute difference from the last inferred frame, None if there is none."""
+        if self._thumbnail is None or self._thumbnail.shape != thumbnail.shape:
+            return None
+        return float(np.abs(thumbnail - self._thumbnail).mean())
+
+    def unchanged(self, thumbnail: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        Whether the last result can be reused for this frame.
+
+        Args:
+            thumbnail: Thumbnail of the new frame
+            now: Current time (for tests)
+        """
+        if not self.enabled or self._result is None:
+            return False
+        now = time.time() if now is None else now
+        self.last_difference = self.difference(thumbnail)
+        return (self.last_difference is not None
+                and self.last_difference < self.threshold
+                and now - self._inferred_at < self.max_reuse)
+
+    def reuse(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Last result with the current timestamp."""
+        self.frames_skipped += 1
+        result = dict(self._result)
+        result['timestamp'] = time.time() if now is None else now
+        result['frame_unchanged'] = True
+        return result
+
+    def store(self, thumbnail: np.ndarray, result: Dict[str, Any], now: Optional[float] = None):
+        """Remember an inferred frame and its result (failed results are not reused)."""
+        if not result.get('success'):
+            self.reset()
+            return
+        self._thumbnail = thumbnail
+        self._result = result
+        self._inferred_at = time.time() if now is None else now
+
+    def reset(self):
+        """Infer the next frame regardless of change."""
+        self._thumbnail = None
+        self._result = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Gate statistics."""
+        return {
+            'enabled': self.enabled,
+            'frames_skipped': self.frames_skipped,
+            'last_difference': self.last_difference
+        }
@@ -18,13 +18,13 @@ Key Differences from FeedbackGenerationService:
 - Single vs Multiple: Generates 1 feedback item per call, not 3-5
 - Visual Input: Uses video frame snapshots, not just pose data
 """
-from typing import List, Dict, Any, Optional, Deque
+from typing import List, Dict, Any, Optional, Deque, Union
 from collections import deque
 from dataclasses import dataclass, field
 import time
 import base64
 import numpy as np
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from app.data.config import settings
 
 
@@ -39,7 +39,7 @@ class SnapshotData:
     - Timing information
     """
     timestamp: float  # Seconds since dance started
-    frame_base64: str  # Base64-encoded JPEG snapshot
+    frame_base64: str  # Base64-encoded JPEG snapshot ("" if the client sent only landmarks)
 
     # Pose comparison results
     pose_similarity: float  # 0.0-1.0
@@ -55,6 +55,15 @@ class SnapshotData:
     reference_timestamp: float = 0.0  # Expected timestamp in reference video
     timing_offset: float = 0.0  # User ahead/behind reference (seconds)
 
+    # Raw encoded frame of a binary upload; base64-encoded only when a request is made
+    frame_bytes: Optional[Union[bytes, memoryview]] = None
+
+    def image_base64(self) -> str:
+        """Base64 frame for the vision API ("" if there is none)."""
+        if self.frame_bytes is not None:
+            return base64.b64encode(self.frame_bytes).decode()
+        return self.frame_base64
+
 
 @dataclass
 class FeedbackContext:
@@ -150,20 +159,30 @@ class LiveFeedbackService:
 
     Usage Flow:
     1. Initialize service at dance start
-    2. Call process_snapshot() every 0.5 seconds
+    2. Call process_snapshot() (or await process_snapshot_async() from async code) every 0.5 seconds
     3. Receive immediate feedback or None (if no significant issues)
     4. Call reset() when dance ends or new section starts
     """
 
-    def __init__(self):
-        """Initialize the live feedback service."""
-        # OpenAI client
-        if not settings.openai_api_key:
-            raise ValueError(
-                "OpenAI API key not found. Please set OPENAI_API_KEY in your .env file"
-            )
+    def __init__(self, client: Optional[OpenAI] = None, async_client: Optional[AsyncOpenAI] = None):
+        """
+        Initialize the live feedback service.
 
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        Args:
+            client: OpenAI client to share with other sessions (created if not given)
+            async_client: AsyncOpenAI client to share with other sessions
+                (created on first process_snapshot_async call if not given)
+        """
+        # OpenAI client
+        if client is None:
+            if not settings.openai_api_key:
+                raise ValueError(
+                    "OpenAI API key not found. Please set OPENAI_API_KEY in your .env file"
+                )
+            client = OpenAI(api_key=settings.openai_api_key)
+
+        self.client = client
+        self._async_client = async_client
         self.model = "gpt-4o-mini"  # Supports vision input
 
         # Feedback generation settings
@@ -208,6 +227,61 @@ class LiveFeedbackService:
                 "context": Dict[str, Any]  # Additional context
             }
         """
+        if not self._needs_feedback(snapshot, force_feedback):
+            return None
+
+        # Generate feedback
+        current_time = time.time()
+        try:
+            feedback = self._generate_live_feedback(snapshot)
+            return self._record_feedback(feedback, current_time)
+
+        except Exception as e:
+            self.total_llm_errors += 1
+            print(f"Live feedback generation failed: {e}")
+
+            # Return fallback feedback
+            return self._generate_fallback_feedback(snapshot)
+
+    async def process_snapshot_async(
+        self,
+        snapshot: SnapshotData,
+        force_feedback: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        process_snapshot() for async callers: the LLM call does not block the event loop.
+
+        Args:
+            snapshot: Current dance state snapshot
+            force_feedback: If True, generate feedback regardless of score
+
+        Returns:
+            Feedback dictionary if generated, None if no feedback needed
+        """
+        if not self._needs_feedback(snapshot, force_feedback):
+            return None
+
+        current_time = time.time()
+        try:
+            response = await self.async_client.chat.completions.create(**self._live_request(snapshot))
+            return self._record_feedback(self._parse_live_response(snapshot, response), current_time)
+
+        except Exception as e:
+            self.total_llm_errors += 1
+            print(f"Live feedback generation failed: {e}")
+            return self._generate_fallback_feedback(snapshot)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client (created with the sync client's key if none was given)."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=getattr(self.client, "api_key", None) or settings.openai_api_key
+            )
+        return self._async_client
+
+    def _needs_feedback(self, snapshot: SnapshotData, force_feedback: bool) -> bool:
+        """Add the snapshot to the context and decide whether to call the LLM."""
         self.total_snapshots_processed += 1
 
         # Add snapshot to context
@@ -221,34 +295,25 @@ class LiveFeedbackService:
         )
 
         if not should_generate:
-            return None
+            return False
 
         # Check rate limiting
         current_time = time.time()
         time_since_last_call = current_time - self.last_llm_call_time
 
-        if time_since_last_call < self.min_llm_interval:
-            # Too soon, skip this snapshot (or queue for next interval)
-            return None
+        # Too soon, skip this snapshot (or queue for next interval)
+        return time_since_last_call >= self.min_llm_interval
 
-        # Generate feedback
-        try:
-            feedback = self._generate_live_feedback(snapshot)
-            self.last_llm_call_time = current_time
-            self.total_llm_calls += 1
-            self.total_feedback_generated += 1
-
-            # Add to context
-            self.context.add_feedback(feedback)
+    def _record_feedback(self, feedback: Dict[str, Any], call_time: float) -> Dict[str, Any]:
+        """Count a successful LLM call and add its feedback to the context."""
+        self.last_llm_call_time = call_time
+        self.total_llm_calls += 1
+        self.total_feedback_generated += 1
 
-            return feedback
+        # Add to context
+        self.context.add_feedback(feedback)
 
-        except Exception as e:
-            self.total_llm_errors += 1
-            print(f"Live feedback generation failed: {e}")
-
-            # Return fallback feedback
-            return self._generate_fallback_feedback(snapshot)
+        return feedback
 
     def _generate_live_feedback(self, snapshot: SnapshotData) -> Dict[str, Any]:
         """
@@ -256,15 +321,34 @@ class LiveFeedbackService:
 
         This is the core LLM interaction for live feedback.
         """
+        response = self.client.chat.completions.create(**self._live_request(snapshot))
+        return self._parse_live_response(snapshot, response)
+
+    def _live_request(self, snapshot: SnapshotData) -> Dict[str, Any]:
+        """Chat completion arguments for a snapshot (shared by the sync and async clients)."""
         # Build prompt with context
         prompt = self._build_live_prompt(snapshot)
 
         # Prepare image for vision API
-        # The snapshot.frame_base64 is already base64 encoded
-        image_url = f"data:image/jpeg;base64,{snapshot.frame_base64}"
+        # Binary uploads are base64-encoded here, only for frames that reach the model;
+        # there is no frame when the client sent only landmarks, so the scores stand alone
+        content = [
+            {
+                "type": "text",
+                "text": prompt
+            }
+        ]
+        image_base64 = snapshot.image_base64()
+        if image_base64:
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{image_base64}",
+                    "detail": "low"  # Use low detail for faster processing
+                }
+            })
 
-        # Call OpenAI Vision API
-        response = self.client.chat.completions.create(
+        return dict(
             model=self.model,
             messages=[
                 {
@@ -277,19 +361,7 @@ class LiveFeedbackService:
                 },
                 {
                     "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url,
-                                "detail": "low"  # Use low detail for faster processing
-                            }
-                        }
-                    ]
+                    "content": content
                 }
             ],
             max_tokens=self.max_tokens,
@@ -297,6 +369,8 @@ class LiveFeedbackService:
             timeout=self.llm_timeout
         )
 
+    def _parse_live_response(self, snapshot: SnapshotData, response: Any) -> Dict[str, Any]:
+        """Feedback dictionary from a chat completion."""
         feedback_text = response.choices[0].message.content.strip()
 
         # Determine severity and focus areas
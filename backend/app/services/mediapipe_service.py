@@ -8,10 +8,13 @@ import numpy as np
 import base64
 import json
 import time
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
+from concurrent.futures import Future
 from dataclasses import dataclass
-from io import BytesIO
-from PIL import Image
+
+from app.data.config import settings
+from app.utils.image_decoding import decode_frame
+from .pose_detector_pool import PoseDetectorPool, pose_detector_pool
 
 
 @dataclass
@@ -40,21 +43,20 @@ class MediaPipeService:
     Processes both user webcam frames and reference video frames.
     """
     
-    def __init__(self):
-        """Initialize MediaPipe components."""
+    def __init__(self, detector_pool: Optional[PoseDetectorPool] = None):
+        """
+        Initialize MediaPipe components.
+        
+        Args:
+            detector_pool: Pool running pose inference (defaults to the shared pool)
+        """
         # Initialize MediaPipe solutions
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
-        # Initialize pose detection
-        self.pose_detector = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Pose detection runs in the shared detector pool
+        self.detector_pool = detector_pool if detector_pool is not None else pose_detector_pool
         
         # Initialize drawing utilities
         self.drawing_utils = mp.solutions.drawing_utils
@@ -64,17 +66,24 @@ class MediaPipeService:
     
     def process_dual_frames(
         self, 
-        user_image_b64: str, 
-        reference_image_b64: str,
-        timestamp: float = None
+        user_image_b64: Union[str, bytes], 
+        reference_image_b64: Union[str, bytes],
+        timestamp: float = None,
+        session_id: Optional[str] = None
     ) -> MediaPipeResult:
         """
         Process both user and reference images for pose detection and comparison.
         
+        Both frames are submitted to the detector pool before waiting, so the two
+        inferences overlap. With a session_id each stream keeps its own tracking
+        detector across calls; without one both frames are treated as independent
+        images.
+        
         Args:
-            user_image_b64: Base64 encoded user webcam image
-            reference_image_b64: Base64 encoded reference video frame
+            user_image_b64: Base64 encoded user webcam image (or raw encoded bytes)
+            reference_image_b64: Base64 encoded reference video frame (or raw encoded bytes)
             timestamp: Optional timestamp for the analysis
+            session_id: Session the frames belong to (enables tracking)
             
         Returns:
             MediaPipeResult: Complete analysis results
@@ -85,33 +94,78 @@ class MediaPipeService:
             if timestamp is None:
                 timestamp = time.time()
             
-            # Process user image
-            user_pose = self._process_single_image(user_image_b64, timestamp, "user")
+            user_stream, reference_stream = self.stream_ids(session_id)
             
-            # Process reference image
-            reference_pose = self._process_single_image(reference_image_b64, timestamp, "reference")
+            # Submit both frames, then wait for both
+            user_future = self._submit_image(user_image_b64, user_stream, "user")
+            reference_future = self._submit_image(reference_image_b64, reference_stream, "reference")
             
-            # Calculate similarity if both poses are detected
-            similarity_score = 0.0
-            if user_pose and user_pose.has_pose and reference_pose and reference_pose.has_pose:
-                similarity_score = self._calculate_pose_similarity(
-                    user_pose.landmarks, 
-                    reference_pose.landmarks
-                )
+            user_pose = self._collect_pose(user_future, timestamp, "user")
+            reference_pose = self._collect_pose(reference_future, timestamp, "reference")
+            
+            return self._compare(user_pose, reference_pose, start_time)
             
+        except Exception as e:
             processing_time = time.time() - start_time
+            print(f"[MediaPipe] Error processing dual frames: {e}")
             
             return MediaPipeResult(
-                user_pose=user_pose,
-                reference_pose=reference_pose,
-                similarity_score=similarity_score,
+                user_pose=None,
+                reference_pose=None,
+                similarity_score=0.0,
                 processing_time=processing_time,
-                success=True
+                success=False,
+                error=str(e)
             )
+    
+    def process_frame_with_reference(
+        self,
+        user_image_b64: Union[str, bytes],
+        reference_landmarks: Optional[np.ndarray],
+        timestamp: float = None,
+        session_id: Optional[str] = None
+    ) -> MediaPipeResult:
+        """
+        Process a user image against precomputed reference landmarks.
+        
+        Only the user frame goes through MediaPipe; the reference pose comes
+        from the processed reference video (see ReferenceFeatures.landmarks_at).
+        
+        Args:
+            user_image_b64: Base64 encoded user webcam image (or raw encoded bytes)
+            reference_landmarks: (33, 4) reference landmarks, None if the reference
+                has no pose at this point
+            timestamp: Optional timestamp for the analysis
+            session_id: Session the frames belong to (enables tracking)
+            
+        Returns:
+            MediaPipeResult: Complete analysis results
+        """
+        start_time = time.time()
+        
+        try:
+            if timestamp is None:
+                timestamp = time.time()
+            
+            user_stream, _ = self.stream_ids(session_id)
+            user_pose = self._collect_pose(self._submit_image(user_image_b64, user_stream, "user"), timestamp, "user")
+            
+            if reference_landmarks is not None:
+                landmarks = np.asarray(reference_landmarks, dtype=np.float32).tolist()
+                reference_pose = PoseLandmarks(
+                    landmarks=landmarks,
+                    confidence=float(np.mean([lm[3] for lm in landmarks])),
+                    timestamp=timestamp,
+                    has_pose=True
+                )
+            else:
+                reference_pose = PoseLandmarks(landmarks=[], confidence=0.0, timestamp=timestamp, has_pose=False)
+            
+            return self._compare(user_pose, reference_pose, start_time)
             
         except Exception as e:
             processing_time = time.time() - start_time
-            print(f"[MediaPipe] Error processing dual frames: {e}")
+            print(f"[MediaPipe] Error processing frame against reference: {e}")
             
             return MediaPipeResult(
                 user_pose=None,
@@ -122,40 +176,76 @@ class MediaPipeService:
                 error=str(e)
             )
     
-    def _process_single_image(self, image_b64: str, timestamp: float, source: str) -> Optional[PoseLandmarks]:
+    def _compare(self, user_pose: Optional[PoseLandmarks], reference_pose: Optional[PoseLandmarks],
+                 start_time: float) -> MediaPipeResult:
+        """Similarity of the two poses (0 unless both were detected)."""
+        similarity_score = 0.0
+        if user_pose and user_pose.has_pose and reference_pose and reference_pose.has_pose:
+            similarity_score = self._calculate_pose_similarity(
+                user_pose.landmarks, 
+                reference_pose.landmarks
+            )
+        
+        processing_time = time.time() - start_time
+        
+        return MediaPipeResult(
+            user_pose=user_pose,
+            reference_pose=reference_pose,
+            similarity_score=similarity_score,
+            processing_time=processing_time,
+            success=True
+        )
+    
+    @staticmethod
+    def stream_ids(session_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
         """
-        Process a single image for pose detection.
+        Detector stream IDs of a session's (user, reference) frames.
+        
+        The user stream is the session ID itself, matching the snapshot endpoint,
+        so both paths share one tracked webcam detector.
+        """
+        if session_id is None:
+            return None, None
+        return session_id, f"{session_id}:reference"
+    
+    def release_session(self, session_id: str):
+        """Drop the tracking detectors of a finished session (all of its streams)."""
+        self.detector_pool.release_stream(session_id)
+    
+    def _submit_image(self, image_b64: Union[str, bytes], stream_id: Optional[str], source: str) -> Optional[Future]:
+        """
+        Decode an image and submit it to the detector pool.
         
-        Args:
-            image_b64: Base64 encoded image
-            timestamp: Timestamp for the analysis
-            source: Source identifier ("user" or "reference")
-            
         Returns:
-            Optional[PoseLandmarks]: Detected pose landmarks or None
+            Optional[Future]: Pending PoseDetection, or None if the image could not be decoded
         """
         try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_b64)
-            image = Image.open(BytesIO(image_bytes))
+            # Decode straight to RGB (reduced scale for large uploads)
+            rgb_frame = decode_frame(image_b64, settings.image_decode_max_pixels)
             
-            # Convert PIL to OpenCV format
-            frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Process with MediaPipe (pose only)
+            return self.detector_pool.submit(rgb_frame, stream_id=stream_id, detect_hands=False)
             
-            # Process with MediaPipe
-            results = self.pose_detector.process(rgb_frame)
+        except Exception as e:
+            print(f"[MediaPipe] Error processing {source} image: {e}")
+            return None
+    
+    def _collect_pose(self, future: Optional[Future], timestamp: float, source: str) -> Optional[PoseLandmarks]:
+        """
+        Wait for a submitted image and convert its detection.
+        
+        Returns:
+            Optional[PoseLandmarks]: Detected pose landmarks or None
+        """
+        if future is None:
+            return None
+        
+        try:
+            detection = future.result(timeout=self.detector_pool.timeout)
             
-            if results.pose_landmarks:
+            if detection.pose_landmarks is not None:
                 # Extract landmarks
-                landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append([
-                        landmark.x,
-                        landmark.y, 
-                        landmark.z,
-                        landmark.visibility
-                    ])
+                landmarks = detection.pose_landmarks.tolist()
                 
                 # Calculate average confidence
                 confidence = np.mean([lm[3] for lm in landmarks])
@@ -181,6 +271,22 @@ class MediaPipeService:
             print(f"[MediaPipe] Error processing {source} image: {e}")
             return None
     
+    def _process_single_image(self, image_b64: str, timestamp: float, source: str,
+                              stream_id: Optional[str] = None) -> Optional[PoseLandmarks]:
+        """
+        Process a single image for pose detection.
+        
+        Args:
+            image_b64: Base64 encoded image
+            timestamp: Timestamp for the analysis
+            source: Source identifier ("user" or "reference")
+            stream_id: Detector stream (None = independent image)
+            
+        Returns:
+            Optional[PoseLandmarks]: Detected pose landmarks or None
+        """
+        return self._collect_pose(self._submit_image(image_b64, stream_id, source), timestamp, source)
+    
     def _calculate_pose_similarity(self, user_landmarks: List[List[float]], reference_landmarks: List[List[float]]) -> float:
         """
         Calculate similarity between user and reference pose landmarks.
@@ -230,22 +336,20 @@ class MediaPipeService:
             print(f"[MediaPipe] Error calculating pose similarity: {e}")
             return 0.0
     
-    def draw_pose_landmarks(self, image_b64: str, landmarks: List[List[float]]) -> str:
+    def draw_pose_landmarks(self, image_b64: Union[str, bytes], landmarks: List[List[float]]) -> str:
         """
         Draw pose landmarks on an image and return as base64.
         
         Args:
-            image_b64: Base64 encoded input image
+            image_b64: Base64 encoded input image (or raw encoded bytes)
             landmarks: Pose landmarks to draw
             
         Returns:
             str: Base64 encoded image with drawn landmarks
         """
         try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_b64)
-            image = Image.open(BytesIO(image_bytes))
-            frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            # Decode base64 image (full size, BGR for drawing and re-encoding)
+            frame = decode_frame(image_b64, rgb=False)
             
             # Create MediaPipe landmarks object
             if landmarks:
@@ -324,9 +428,7 @@ class MediaPipeService:
             return {"error": str(e)}
     
     def cleanup(self):
-        """Clean up MediaPipe resources."""
-        if hasattr(self, 'pose_detector'):
-            self.pose_detector.close()
+        """Clean up MediaPipe resources (the detector pool is shared and closed separately)."""
         print("[MediaPipe] Service cleaned up")
 
 
@@ -16,11 +16,28 @@ class PoseComparisonConfig:
     # DTW settings
     dtw_enabled: bool = True
     dtw_window: int = 50
-    dtw_interval: float = 2.0
+    dtw_interval: float = 2.0  # Seconds between warping-path / timing-offset refreshes
+    dtw_band: int = 30  # Reference frames kept on each side of the streaming DTW alignment
+    resync_query_seconds: float = 2.0  # Recent motion used to relocate a lost dancer in the reference
     
     # Smoothing settings
     smoothing_window: int = 5
     
+    # Temporal-locality tracking (search near the previous match)
+    tracking_enabled: bool = True
+    tracking_window: int = 15  # Reference frames searched on each side of the predicted index
+    tracking_min_score: float = 0.85  # Full scan when the best windowed pose score is below this
+    tracking_max_lost_frames: int = 3  # Full scan after this many consecutive matches on the window edge
+    
+    # Approximate nearest-neighbour index for full scans of long references
+    ann_enabled: bool = True
+    ann_min_reference_frames: int = 20000  # Below this an exhaustive scan is faster than the index
+    ann_num_trees: int = 10
+    ann_leaf_size: int = 32
+    ann_top_k: int = 10  # Candidates rescored with the motion term
+    ann_search_k: int = 1000  # Reference frames gathered per query (higher = better recall, slower)
+    ann_recall_interval: int = 50  # Check every Nth index query against an exhaustive scan (0 = never)
+    
     # Detection thresholds
     min_detection_confidence: float = 0.5
     min_tracking_confidence: float = 0.5
@@ -41,7 +58,20 @@ class PoseComparisonConfig:
             'dtw_enabled': self.dtw_enabled,
             'dtw_window': self.dtw_window,
             'dtw_interval': self.dtw_interval,
+            'dtw_band': self.dtw_band,
+            'resync_query_seconds': self.resync_query_seconds,
             'smoothing_window': self.smoothing_window,
+            'tracking_enabled': self.tracking_enabled,
+            'tracking_window': self.tracking_window,
+            'tracking_min_score': self.tracking_min_score,
+            'tracking_max_lost_frames': self.tracking_max_lost_frames,
+            'ann_enabled': self.ann_enabled,
+            'ann_min_reference_frames': self.ann_min_reference_frames,
+            'ann_num_trees': self.ann_num_trees,
+            'ann_leaf_size': self.ann_leaf_size,
+            'ann_top_k': self.ann_top_k,
+            'ann_search_k': self.ann_search_k,
+            'ann_recall_interval': self.ann_recall_interval,
             'min_detection_confidence': self.min_detection_confidence,
             'min_tracking_confidence': self.min_tracking_confidence,
             'max_sequence_length': self.max_sequence_length,
@@ -3,10 +3,18 @@ import cv2
 import mediapipe as mp
 from typing import List, Dict, Any, Tuple, Optional
 import math
-from dtaidistance import dtw
 import time
-from collections import deque
 from .pose_comparison_config import PoseComparisonConfig, DEFAULT_CONFIG
+from .dtw_alignment import (
+    OnlineDTW, sakoe_chiba_dtw, timing_offsets, locate_subsequence
+)
+from .reference_index import RandomProjectionForest
+from .ring_buffer import RingBuffer
+from .reference_features import ReferenceFeatures, ESSENTIAL_LANDMARK_INDICES, ESSENTIAL_FEATURE_COUNT
+
+# Columns of the similarity score history
+SCORE_FIELDS = ('combined_score', 'pose_score', 'motion_score', 'dtw_score')
+
 
 class PoseComparisonService:
     """
@@ -15,13 +23,16 @@ class PoseComparisonService:
     """
     
     def __init__(self, reference_poses_data: List[Dict[str, Any]], 
-                 config: PoseComparisonConfig = None):
+                 config: PoseComparisonConfig = None,
+                 reference_features: Optional[ReferenceFeatures] = None):
         """
         Initialize pose comparison service.
         
         Args:
             reference_poses_data: List of reference pose data from processed video
             config: Configuration for pose comparison
+            reference_features: Precomputed reference arrays shared with other
+                sessions (built from reference_poses_data if not given)
         """
         self.reference_poses = reference_poses_data
         self.config = config if config is not None else DEFAULT_CONFIG
@@ -30,14 +41,48 @@ class PoseComparisonService:
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         
-        # Extract and normalize reference pose landmarks
-        self.reference_landmarks = self._extract_reference_landmarks()
-        self.reference_motions = self._calculate_reference_motions()
+        # Reference pose matrix, motions and timing (read-only, shared between sessions)
+        if reference_features is None:
+            reference_features = ReferenceFeatures.from_poses(reference_poses_data)
+        self.reference_features = reference_features
+        self.reference_landmarks = reference_features.landmarks
+        self.reference_motions = reference_features.motions
+        self.reference_fps = reference_features.fps
+        self.reference_timestamps = reference_features.timestamps
+        
+        # Unit-length copies used by the vectorized matching kernel
+        self.reference_unit = reference_features.unit
+        self.reference_motion_unit = reference_features.motion_unit
+        
+        # LB_Keogh envelopes for re-synchronising a lost dancer
+        self.reference_upper, self.reference_lower = reference_features.envelopes(
+            self.config.dtw_band + 1
+        )
         
-        # Initialize user pose tracking
-        self.user_pose_history = deque(maxlen=self.config.smoothing_window * 2)
-        self.user_motion_history = deque(maxlen=self.config.smoothing_window)
-        self.similarity_scores = deque(maxlen=self.config.smoothing_window)
+        # Approximate nearest-neighbour index used instead of full scans of long references
+        self.reference_index: Optional[RandomProjectionForest] = None
+        self._index_settings = None
+        self.ann_queries = 0
+        self.ann_recall_checks = 0
+        self.ann_recall_total = 0.0
+        self._build_reference_index()
+        
+        # Initialize user pose tracking (preallocated, fixed-size history)
+        feature_count = self.reference_unit.shape[1]
+        self.user_pose_history = RingBuffer(self.config.smoothing_window * 2, {
+            'landmarks': ((feature_count,), np.float32),
+            'length': ((), np.int32),  # Values used; shorter inputs are zero-padded
+            'timestamp': ((), np.float64),
+            'reference_idx': ((), np.int32),
+        })
+        self.user_motion_history = RingBuffer(self.config.smoothing_window, {
+            'motion': ((feature_count,), np.float32),
+            'timestamp': ((), np.float64),
+        })
+        self.similarity_scores = RingBuffer(self.config.smoothing_window, {
+            'scores': ((len(SCORE_FIELDS),), np.float64),
+            'timestamp': ((), np.float64),
+        })
         
         # DTW configuration (optimized for performance)
         self.dtw_window = min(self.config.dtw_window, len(self.reference_landmarks))
@@ -45,43 +90,145 @@ class PoseComparisonService:
         self.dtw_interval = self.config.dtw_interval
         self.dtw_enabled = self.config.dtw_enabled
         
-    def _extract_reference_landmarks(self) -> List[np.ndarray]:
-        """Extract and normalize reference pose landmarks."""
-        landmarks_list = []
-        
-        for pose_data in self.reference_poses:
-            if pose_data.get("landmarks") is not None:
-                # Extract 3D coordinates (x, y, z) from landmarks
-                landmarks = pose_data["landmarks"]
-                if landmarks.shape[1] >= 3:  # Ensure we have x, y, z coordinates
-                    # Extract only x, y, z coordinates (ignore visibility)
-                    coords = landmarks[:, :3].flatten()
-                    # Filter to essential landmarks for dance
-                    filtered_coords = self._filter_essential_landmarks(coords)
-                    landmarks_list.append(filtered_coords)
-        
-        return landmarks_list
+        # Streaming DTW alignment, extended by one column per user frame
+        self.online_dtw = OnlineDTW(self.reference_unit, self.config.dtw_band)
+        self.dtw_lost_frames = 0
+        self.resync_anchor: Optional[int] = None
+        self.resyncs = 0
+        self.last_resync: Optional[Dict[str, Any]] = None
+        
+        # Warping-path refresh state (timing offsets are recomputed every dtw_interval)
+        self.last_path_time = 0.0
+        self.timing_offset = 0.0
+        
+        # Temporal-locality tracking state
+        self.last_match_idx: Optional[int] = None
+        self.last_match_time = 0.0
+        self.lost_frames = 0
+        self.windowed_searches = 0
+        self.full_scans = 0
+        self.tracking_fallbacks = 0
+        
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        """Scale every row to unit length (rows with zero length stay zero)."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        return np.ascontiguousarray(matrix * inverse)
     
-    def _calculate_reference_motions(self) -> List[np.ndarray]:
-        """Calculate motion vectors for reference poses."""
-        motions = []
-        
-        for i in range(1, len(self.reference_landmarks)):
-            # Calculate velocity: v_t = pose_t - pose_(t-1)
-            velocity = self.reference_landmarks[i] - self.reference_landmarks[i-1]
-            motions.append(velocity)
-        
-        return motions
+    @staticmethod
+    def _unit_vector(vector: np.ndarray) -> np.ndarray:
+        """Scale a vector to unit length (a zero vector stays zero)."""
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else np.zeros_like(vector)
+    
+    def _padded(self, vector: np.ndarray) -> np.ndarray:
+        """Fit a vector to the history row width (zero-padded or truncated)."""
+        width = self.reference_unit.shape[1]
+        if len(vector) == width:
+            return vector
+        row = np.zeros(width)
+        row[:min(len(vector), width)] = vector[:width]
+        return row
+    
+    def _prepare_pose_vector(self, landmarks: np.ndarray) -> np.ndarray:
+        """Convert raw user landmarks into the same 69-value layout as the reference matrix."""
+        return self._filter_essential_landmarks(np.asarray(landmarks, dtype=np.float64))
+    
+    def _score_reference_poses(self, user_vector: np.ndarray,
+                               start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        Cosine similarity between a prepared user pose and reference rows [start, end).
+
+        Uses the pre-normalized reference matrix, so a whole-reference search is a
+        single matrix-vector product. Scores are clamped to [0, 1] like
+        _calculate_pose_similarity.
+        """
+        if end is None:
+            end = len(self.reference_landmarks)
+        
+        if len(user_vector) == self.reference_unit.shape[1]:
+            scores = self.reference_unit[start:end] @ self._unit_vector(user_vector)
+        else:
+            # Mismatched input size: compare on the shared leading coordinates only
+            length = min(len(user_vector), self.reference_unit.shape[1])
+            reference = self._unit_rows(self.reference_landmarks[start:end, :length])
+            scores = reference @ self._unit_vector(user_vector[:length])
+        
+        return np.clip(scores, 0.0, 1.0)
+    
+    def _score_reference_motions(self, user_motion: np.ndarray,
+                                 start: int, end: int) -> np.ndarray:
+        """Cosine similarity between a user motion vector and reference motions [start, end)."""
+        if len(user_motion) == self.reference_motion_unit.shape[1]:
+            scores = self.reference_motion_unit[start:end] @ self._unit_vector(user_motion)
+        else:
+            length = min(len(user_motion), self.reference_motion_unit.shape[1])
+            reference = self._unit_rows(self.reference_motions[start:end, :length])
+            scores = reference @ self._unit_vector(user_motion[:length])
+        
+        return np.clip(scores, 0.0, 1.0)
+    
+    def _score_reference_rows(self, user_vector: np.ndarray, indices) -> np.ndarray:
+        """Cosine similarity between a prepared user pose and the given reference rows."""
+        indices = np.asarray(indices, dtype=np.intp)
+        if len(user_vector) == self.reference_unit.shape[1]:
+            scores = self.reference_unit[indices] @ self._unit_vector(user_vector)
+        else:
+            length = min(len(user_vector), self.reference_unit.shape[1])
+            reference = self._unit_rows(self.reference_landmarks[indices, :length])
+            scores = reference @ self._unit_vector(user_vector[:length])
+        
+        return np.clip(scores, 0.0, 1.0)
+    
+    def _build_reference_index(self):
+        """Build the nearest-neighbour index when enabled and the reference is long enough."""
+        index_settings = (self.config.ann_enabled, self.config.ann_min_reference_frames,
+                          self.config.ann_num_trees, self.config.ann_leaf_size)
+        if self._index_settings == index_settings:
+            return
+        self._index_settings = index_settings
+        
+        self.reference_index = None
+        if (self.config.ann_enabled and
+                len(self.reference_unit) >= max(1, self.config.ann_min_reference_frames)):
+            self.reference_index = self.reference_features.index(
+                self.config.ann_num_trees, self.config.ann_leaf_size
+            )
+    
+    def _query_reference_index(self, user_vector: np.ndarray) -> np.ndarray:
+        """
+        Top-k reference candidates for a prepared user pose from the index.
+
+        Every ann_recall_interval queries the result is checked against an
+        exhaustive scan, giving a running recall@k in get_statistics.
+        """
+        query = self._unit_vector(user_vector)
+        top_k = max(1, self.config.ann_top_k)
+        candidates = self.reference_index.query(query, top_k, self.config.ann_search_k)
+        self.ann_queries += 1
+        
+        interval = self.config.ann_recall_interval
+        if interval > 0 and self.ann_queries % interval == 0:
+            k = min(top_k, len(self.reference_unit))
+            exact = np.argpartition(-(self.reference_unit @ query), k - 1)[:k]
+            self.ann_recall_total += len(np.intersect1d(candidates, exact)) / k
+            self.ann_recall_checks += 1
+        
+        if len(candidates) == 0:
+            # Degenerate index: fall back to the whole reference
+            return np.arange(len(self.reference_unit))
+        return candidates
     
     def _filter_essential_landmarks(self, landmarks: np.ndarray) -> np.ndarray:
         """Filter landmarks to keep only essential points for dance (remove detailed face tracking)."""
-        # Handle both 1D (flattened) and 2D (num_landmarks, 4) input arrays
+        # Handle both 1D (flattened x, y, z) and 2D (num_landmarks, 4) input arrays
         if landmarks.ndim == 2:
-            landmarks = landmarks.flatten()
+            landmarks = landmarks[:, :3].flatten()
         
         # Essential landmarks for dance (indices):
         # 0: nose (head center), 11-32: body and limbs
-        essential_indices = [0] + list(range(11, 33))  # Keep nose + body/limbs
+        essential_indices = ESSENTIAL_LANDMARK_INDICES  # Keep nose + body/limbs
         
         # Extract only essential landmarks (3 coordinates each: x, y, z)
         essential_landmarks = []
@@ -168,48 +315,116 @@ class PoseComparisonService:
     def _find_best_reference_match(self, user_landmarks: np.ndarray, 
                                  user_motion: Optional[np.ndarray] = None) -> Tuple[int, float, float]:
         """Find the best matching reference pose using combined metrics."""
-        best_pose_score = 0.0
+        return self._match_pose_vector(self._prepare_pose_vector(user_landmarks), user_motion)
+    
+    def _match_pose_vector(self, user_vector: np.ndarray,
+                           user_motion: Optional[np.ndarray] = None,
+                           search_start: int = 0,
+                           search_end: Optional[int] = None) -> Tuple[int, float, float]:
+        """
+        Best reference match for a user pose already in reference layout.
+
+        Only reference frames in [search_start, search_end) are considered; the
+        default range is the whole reference.
+        """
+        if search_end is None:
+            search_end = len(self.reference_landmarks)
+        if search_end <= search_start:
+            return 0, 0.0, 0.0
+        
+        if (self.reference_index is not None and search_start == 0 and
+                search_end == len(self.reference_landmarks) and
+                len(user_vector) == self.reference_unit.shape[1]):
+            # Whole-reference search: only the index's top-k candidates are scored
+            candidates = self._query_reference_index(user_vector)
+            candidate_scores = self._score_reference_rows(user_vector, candidates)
+            if user_motion is not None and len(user_motion) == self.reference_motion_unit.shape[1]:
+                # Rescore candidates with the reference motion that reaches them
+                motion_scores = np.zeros(len(candidates))
+                moving = candidates > 0
+                motion_scores[moving] = np.clip(
+                    self.reference_motion_unit[candidates[moving] - 1] @ self._unit_vector(user_motion),
+                    0.0, 1.0
+                )
+                candidate_scores = (self.config.pose_weight * candidate_scores +
+                                    self.config.motion_weight * motion_scores)
+            best_match_idx = int(candidates[np.argmax(candidate_scores)])
+        else:
+            # Calculate pose similarity with every reference pose in range in one pass
+            pose_scores = self._score_reference_poses(user_vector, search_start, search_end)
+            best_match_idx = search_start + int(np.argmax(pose_scores))
+        
+        best_pose_score = float(self._score_reference_rows(user_vector, [best_match_idx])[0])
         best_motion_score = 0.0
-        best_match_idx = 0
-        
-        # Calculate pose similarity with all reference poses
-        pose_scores = []
-        for ref_landmarks in self.reference_landmarks:
-            pose_score = self._calculate_pose_similarity(user_landmarks, ref_landmarks)
-            pose_scores.append(pose_score)
-        
-        # Find best pose match
-        best_pose_idx = np.argmax(pose_scores)
-        best_pose_score = pose_scores[best_pose_idx]
         
         # Calculate motion similarity if motion data is available
         if user_motion is not None and len(self.reference_motions) > 0:
-            # Find best motion match within a window around the best pose match
+            # Find best motion match within a window around the best pose match.
+            # Frame j is reached by reference motion j - 1, so frame 0 has no motion.
             motion_window = 10  # Search within ±10 frames
-            start_idx = max(0, best_pose_idx - motion_window)
-            end_idx = min(len(self.reference_motions), best_pose_idx + motion_window)
-            
-            motion_scores = []
-            for i in range(start_idx, end_idx):
-                motion_score = self._calculate_motion_similarity(user_motion, self.reference_motions[i])
-                motion_scores.append(motion_score)
+            start_idx = max(search_start, 1, best_match_idx - motion_window)
+            end_idx = min(search_end, best_match_idx + motion_window)
             
-            if motion_scores:
-                best_motion_score = max(motion_scores)
-                # Update best match index based on combined score
-                combined_scores = []
-                for i in range(start_idx, end_idx):
-                    combined_score = (self.config.pose_weight * pose_scores[i] + 
-                                    self.config.motion_weight * motion_scores[i - start_idx])
-                    combined_scores.append(combined_score)
+            if end_idx > start_idx:
+                window_pose_scores = self._score_reference_poses(user_vector, start_idx, end_idx)
+                motion_scores = self._score_reference_motions(user_motion, start_idx - 1, end_idx - 1)
+                best_motion_score = float(motion_scores.max())
                 
-                if combined_scores:
-                    best_combined_idx = np.argmax(combined_scores)
-                    best_match_idx = start_idx + best_combined_idx
-                    best_pose_score = pose_scores[best_match_idx]
+                # Update best match index based on combined score
+                combined_scores = (self.config.pose_weight * window_pose_scores +
+                                   self.config.motion_weight * motion_scores)
+                best_offset = int(np.argmax(combined_scores))
+                best_match_idx = start_idx + best_offset
+                best_pose_score = float(window_pose_scores[best_offset])
         
         return best_match_idx, best_pose_score, best_motion_score
     
+    def _predict_reference_index(self, timestamp: float) -> int:
+        """Predict where the dancer is in the reference from the time since the last match."""
+        elapsed = max(0.0, timestamp - self.last_match_time)
+        predicted = self.last_match_idx + int(round(elapsed * self.reference_fps))
+        return min(predicted, len(self.reference_landmarks) - 1)
+    
+    def _track_reference_match(self, user_vector: np.ndarray,
+                               user_motion: Optional[np.ndarray],
+                               timestamp: float) -> Tuple[int, float, float]:
+        """
+        Find the best reference match, searching near the previous match when possible.
+
+        The window is centered on the index predicted from the elapsed time. A full
+        scan is used for the first frame, when the best windowed pose score falls
+        below tracking_min_score, or when the match has sat on the window edge for
+        tracking_max_lost_frames consecutive frames.
+        """
+        num_frames = len(self.reference_landmarks)
+        window = self.config.tracking_window
+        
+        if self.config.tracking_enabled and self.last_match_idx is not None and 2 * window + 1 < num_frames:
+            predicted_idx = self._predict_reference_index(timestamp)
+            search_start = max(0, predicted_idx - window)
+            search_end = min(num_frames, predicted_idx + window + 1)
+            
+            match = self._match_pose_vector(user_vector, user_motion, search_start, search_end)
+            self.windowed_searches += 1
+            
+            # A match on an interior edge means the dancer may be outside the window
+            on_edge = ((match[0] == search_start and search_start > 0) or
+                       (match[0] == search_end - 1 and search_end < num_frames))
+            self.lost_frames = self.lost_frames + 1 if on_edge else 0
+            
+            if (match[1] >= self.config.tracking_min_score and
+                    self.lost_frames < self.config.tracking_max_lost_frames):
+                self.last_match_idx, self.last_match_time = match[0], timestamp
+                return match
+            
+            self.tracking_fallbacks += 1
+        
+        match = self._match_pose_vector(user_vector, user_motion)
+        self.full_scans += 1
+        self.lost_frames = 0
+        self.last_match_idx, self.last_match_time = match[0], timestamp
+        return match
+    
     def _apply_dynamic_time_warping(self, user_sequence: List[np.ndarray], 
                                   reference_sequence: List[np.ndarray]) -> Tuple[float, List[Tuple[int, int]]]:
         """Apply Dynamic Time Warping to align user and reference sequences."""
@@ -241,75 +456,160 @@ class PoseComparisonService:
             return 0.0, []
         
         try:
-            # Use a simpler DTW approach that handles arrays better
-            # Flatten the arrays to 1D and ensure correct data type for distance_fast
-            user_flat = user_seq_array.flatten().astype(np.float64)
-            ref_flat = ref_seq_array.flatten().astype(np.float64)
-            
-            # Calculate DTW distance using the distance_fast method
-            distance = dtw.distance_fast(user_flat, ref_flat)
+            # Multivariate DTW over whole per-frame pose vectors
+            distance, path = sakoe_chiba_dtw(
+                self._unit_rows(user_seq_array.astype(np.float64)),
+                self._unit_rows(ref_seq_array.astype(np.float64)),
+                self.config.dtw_band
+            )
             
-            # Convert distance to similarity score (0-1)
-            # Normalize by the maximum possible distance (sum of sequence lengths)
-            max_distance = len(user_flat) + len(ref_flat)
-            similarity = max(0.0, 1.0 - (distance / max_distance)) if max_distance > 0 else 0.0
+            # Convert the mean local cost along the path (0-4, typically 0-2) to similarity (0-1)
+            similarity = max(0.0, 1.0 - (distance / len(path)) / 2.0) if path else 0.0
             
-            # Return empty path since we're using distance_fast
-            return similarity, []
+            return similarity, path
             
         except Exception as e:
             print(f"DTW calculation failed: {e}")
             return 0.0, []
     
+    def locate_in_reference(self, duration: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Work out where in the reference the dancer's recent motion belongs.
+
+        Runs an LB_Keogh-pruned subsequence DTW search of the last `duration`
+        seconds of user history (resync_query_seconds by default) over the whole
+        reference, using the envelopes computed at load time.
+
+        Returns:
+            Dictionary from locate_subsequence plus 'search_time' (seconds), or
+            None if there is not enough history.
+        """
+        if duration is None:
+            duration = self.config.resync_query_seconds
+        if len(self.user_pose_history) == 0:
+            return None
+        
+        timestamps = self.user_pose_history.last('timestamp')
+        recent = ((timestamps[-1] - timestamps <= duration) &
+                  (self.user_pose_history.last('length') == self.reference_unit.shape[1]))
+        if np.count_nonzero(recent) < 2:
+            return None
+        
+        start_time = time.perf_counter()
+        query = self._unit_rows(self.user_pose_history.last('landmarks')[recent])
+        recent_timestamps = timestamps[recent]
+        span = int(round((recent_timestamps[-1] - recent_timestamps[0]) * self.reference_fps)) + 1
+        # Sparse history would make sakoe_chiba_dtw widen its band past the
+        # envelope radius (dtw_band + 1), so keep the slope within the band
+        span = min(span, max(1, self.config.dtw_band) * (len(query) - 1) + 1)
+        location = locate_subsequence(
+            query, span, self.reference_unit,
+            self.reference_upper, self.reference_lower, self.config.dtw_band
+        )
+        if location is None:
+            return None
+        
+        location['search_time'] = time.perf_counter() - start_time
+        self.resyncs += 1
+        self.last_resync = location
+        return location
+    
+    def _align_recent_history(self) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        """
+        Warp the recent user history onto the reference segment it was aligned to.
+
+        The segment runs between the streaming DTW positions of the oldest and
+        newest history frames, so the banded DTW only covers a few seconds.
+
+        Returns:
+            Tuple of (warping path as (history_idx, reference_idx) pairs,
+            per-frame timing offsets in seconds)
+        """
+        history_length = len(self.user_pose_history)
+        if history_length < 3:
+            return [], np.zeros(history_length)
+        
+        # Zero-copy views of the whole history, oldest first
+        user_seq_array = self.user_pose_history.last('landmarks')
+        reference_indices = self.user_pose_history.last('reference_idx')
+        if np.any(self.user_pose_history.last('length') != self.reference_unit.shape[1]):
+            return [], np.zeros(history_length)
+        
+        segment_start = int(reference_indices.min())
+        segment_end = int(reference_indices.max()) + 1
+        
+        _, path = sakoe_chiba_dtw(
+            self._unit_rows(user_seq_array),
+            self.reference_unit[segment_start:segment_end],
+            self.config.dtw_band
+        )
+        path = [(user_idx, segment_start + ref_idx) for user_idx, ref_idx in path]
+        offsets = timing_offsets(
+            path,
+            self.user_pose_history.last('timestamp'),
+            self.reference_timestamps
+        )
+        return path, offsets
+    
     def update_user_pose(self, user_landmarks: np.ndarray, timestamp: float = None) -> Dict[str, Any]:
         """Update user pose and calculate similarity scores."""
         if timestamp is None:
             timestamp = time.time()
         
-        # Add to pose history
-        self.user_pose_history.append({
-            'landmarks': user_landmarks.copy(),
-            'timestamp': timestamp
-        })
+        # Add to pose history (stored in the same layout as the reference matrix)
+        user_vector = self._prepare_pose_vector(user_landmarks)
+        length = min(len(user_vector), self.reference_unit.shape[1])
         
-        # Calculate motion if we have at least 2 poses
+        # Calculate motion if the previous pose has the same layout
         user_motion = None
-        if len(self.user_pose_history) >= 2:
-            current_pose = self.user_pose_history[-1]['landmarks']
-            previous_pose = self.user_pose_history[-2]['landmarks']
-            user_motion = current_pose - previous_pose
-            self.user_motion_history.append(user_motion)
+        if len(self.user_pose_history) > 0 and self.user_pose_history.latest('length') == len(user_vector):
+            user_motion = user_vector - self.user_pose_history.latest('landmarks')[:length]
+            self.user_motion_history.append(motion=self._padded(user_motion), timestamp=timestamp)
+        
+        self.user_pose_history.append(
+            landmarks=self._padded(user_vector), length=len(user_vector), timestamp=timestamp
+        )
         
         # Find best reference match
-        best_match_idx, pose_score, motion_score = self._find_best_reference_match(
-            user_landmarks, user_motion
+        best_match_idx, pose_score, motion_score = self._track_reference_match(
+            user_vector, user_motion, timestamp
         )
         
         # Calculate combined score using config weights
         combined_score = (self.config.pose_weight * pose_score + 
                          self.config.motion_weight * motion_score)
         
-        # Apply DTW if enabled, enough data, and time has passed
+        # Extend the streaming DTW alignment by this frame
         dtw_score = 0.0
+        dtw_ref_idx = None
+        dtw_cost = 0.0
         dtw_path = []
-        if (self.dtw_enabled and 
-            len(self.user_pose_history) >= 10 and 
-            timestamp - self.last_dtw_time > self.dtw_interval):
-            
-            user_sequence = [pose['landmarks'] for pose in self.user_pose_history]
-            ref_sequence = self.reference_landmarks
-            
-            dtw_score, dtw_path = self._apply_dynamic_time_warping(user_sequence, ref_sequence)
-            self.last_dtw_time = timestamp
+        if (self.dtw_enabled and
+                len(self.reference_landmarks) > 0 and
+                len(user_vector) == self.reference_unit.shape[1]):
+            dtw_ref_idx, dtw_cost, dtw_score = self._update_online_dtw(
+                user_vector, best_match_idx, timestamp
+            )
+        
+        # Where the dancer is in the reference right now
+        reference_idx = dtw_ref_idx if dtw_ref_idx is not None else best_match_idx
+        self.user_pose_history.set_latest('reference_idx', reference_idx)
+        reference_timestamp = (
+            float(self.reference_timestamps[reference_idx])
+            if reference_idx < len(self.reference_timestamps) else 0.0
+        )
+        
+        # Periodically refresh the warping path and timing offsets over recent history
+        if self.dtw_enabled and timestamp - self.last_path_time > self.dtw_interval:
+            dtw_path, offsets = self._align_recent_history()
+            if dtw_path:
+                self.timing_offset = float(offsets[-1])
+                self.last_path_time = timestamp
         
         # Add to similarity scores for smoothing
-        self.similarity_scores.append({
-            'combined_score': combined_score,
-            'pose_score': pose_score,
-            'motion_score': motion_score,
-            'dtw_score': dtw_score,
-            'timestamp': timestamp
-        })
+        self.similarity_scores.append(
+            scores=(combined_score, pose_score, motion_score, dtw_score), timestamp=timestamp
+        )
         
         # Apply smoothing
         smoothed_scores = self._apply_smoothing()
@@ -321,29 +621,200 @@ class PoseComparisonService:
             'dtw_score': smoothed_scores['dtw_score'],
             'best_match_idx': best_match_idx,
             'dtw_path': dtw_path,
+            'dtw_ref_idx': dtw_ref_idx,
+            'dtw_cost': dtw_cost,
+            'reference_timestamp': reference_timestamp,
+            'timing_offset': self.timing_offset,
             'timestamp': timestamp
         }
     
+    def _update_online_dtw(self, user_vector: np.ndarray, best_match_idx: int,
+                           timestamp: float) -> Tuple[int, float, float]:
+        """
+        Extend the streaming DTW alignment with one user frame.
+
+        The band is moved forward by the time elapsed since the previous frame. If
+        the alignment drifts more than a band away from the pose matcher for
+        tracking_max_lost_frames frames, the dancer is relocated with
+        locate_in_reference and the path is restarted there.
+
+        Returns:
+            Tuple of (aligned reference index, cumulative cost, DTW similarity 0-1)
+        """
+        expected_advance = 0.0
+        if self.online_dtw.steps > 0:
+            expected_advance = max(0.0, timestamp - self.last_dtw_time) * self.reference_fps
+        
+        anchor = self.resync_anchor if self.resync_anchor is not None else best_match_idx
+        aligned_idx, cumulative_cost = self.online_dtw.step(
+            self._unit_vector(user_vector), expected_advance, anchor=anchor
+        )
+        self.resync_anchor = None
+        self.last_dtw_time = timestamp
+        
+        # Local costs are squared distances between unit vectors (0-4, typically 0-2)
+        dtw_score = max(0.0, 1.0 - self.online_dtw.normalized_cost / 2.0)
+        
+        if abs(aligned_idx - best_match_idx) > self.online_dtw.band_width:
+            self.dtw_lost_frames += 1
+            if self.dtw_lost_frames >= self.config.tracking_max_lost_frames:
+                # Relocate the dancer from their recent motion and restart there
+                location = self.locate_in_reference()
+                self.online_dtw.reset()
+                self.dtw_lost_frames = 0
+                if location is not None:
+                    self.resync_anchor = location['end_idx']
+                    self.last_match_idx, self.last_match_time = location['end_idx'], timestamp
+        else:
+            self.dtw_lost_frames = 0
+        
+        return aligned_idx, cumulative_cost, dtw_score
+    
     def _apply_smoothing(self) -> Dict[str, float]:
         """Apply moving average smoothing to scores."""
-        if not self.similarity_scores:
-            return {'combined_score': 0.0, 'pose_score': 0.0, 'motion_score': 0.0, 'dtw_score': 0.0}
+        if len(self.similarity_scores) == 0:
+            return {name: 0.0 for name in SCORE_FIELDS}
         
-        # Calculate moving averages
-        window_size = min(self.config.smoothing_window, len(self.similarity_scores))
-        recent_scores = list(self.similarity_scores)[-window_size:]
+        # Moving average of every score column in one reduction
+        averages = self.similarity_scores.last('scores', self.config.smoothing_window).mean(axis=0)
+        return {name: float(value) for name, value in zip(SCORE_FIELDS, averages)}
+    
+    def score_sequence(self, landmarks_sequence: List[np.ndarray],
+                       timestamps: List[float]) -> Dict[str, np.ndarray]:
+        """
+        Score a whole recorded sequence of user poses in one pass.
+
+        Produces the same per-frame scores as feeding every frame through
+        update_user_pose, except that each frame is matched against the whole
+        reference (no tracking window) and the timing offsets come from one
+        banded DTW over the full take. Pose and motion matching are batched
+        matrix operations; the streaming DTW is advanced once per frame. The
+        service's live session state is not touched.
+
+        Args:
+            landmarks_sequence: (33, 4) MediaPipe landmarks of every user frame
+            timestamps: Timestamp of every user frame in seconds
+
+        Returns:
+            Dictionary of per-frame arrays: timestamp, best_match_idx,
+            dtw_ref_idx, reference_timestamp, timing_offset, the smoothed
+            combined/pose/motion/dtw scores, and the unsmoothed ones as raw_*
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        num_user = len(landmarks_sequence)
+        num_reference = len(self.reference_unit)
+        if num_user == 0 or num_reference == 0:
+            empty = np.zeros(0)
+            result = {name: empty for name in SCORE_FIELDS}
+            result.update({'raw_' + name: empty for name in SCORE_FIELDS})
+            result.update({
+                'timestamp': timestamps[:0], 'best_match_idx': empty.astype(int),
+                'dtw_ref_idx': empty.astype(int), 'reference_timestamp': empty, 'timing_offset': empty
+            })
+            return result
+        
+        user_matrix = np.stack([
+            np.asarray(landmarks, dtype=np.float64)[ESSENTIAL_LANDMARK_INDICES, :3].ravel()
+            for landmarks in landmarks_sequence
+        ])
+        user_unit = self._unit_rows(user_matrix)
+        user_motion_unit = self._unit_rows(np.diff(user_matrix, axis=0))
+        
+        best_match_idx = np.zeros(num_user, dtype=int)
+        pose_scores = np.zeros(num_user)
+        motion_scores = np.zeros(num_user)
+        motion_offsets = np.arange(-10, 10)  # Same ±10 frame window as _match_pose_vector
+        chunk_size = max(1, 2 ** 22 // num_reference)  # Bound the (chunk, N) score matrix
+        
+        for chunk_start in range(0, num_user, chunk_size):
+            chunk = slice(chunk_start, min(num_user, chunk_start + chunk_size))
+            rows = np.arange(chunk.stop - chunk.start)
+            scores = np.clip(user_unit[chunk] @ self.reference_unit.T, 0.0, 1.0)
+            chunk_best = np.argmax(scores, axis=1)
+            chunk_pose = scores[rows, chunk_best]
+            chunk_motion = np.zeros(len(rows))
+            
+            # Frames after the first are refined with the motion term around their best pose
+            frame_idx = np.arange(chunk.start, chunk.stop)
+            moving = frame_idx > 0
+            if num_reference > 1 and np.any(moving):
+                moving_rows = rows[moving]
+                window = chunk_best[moving, None] + motion_offsets
+                valid = (window >= 1) & (window < num_reference)
+                window = np.clip(window, 1, num_reference - 1)
+                window_pose = scores[moving_rows[:, None], window]
+                window_motion = np.clip(np.einsum(
+                    'td,twd->tw', user_motion_unit[frame_idx[moving] - 1],
+                    self.reference_motion_unit[window - 1]
+                ), 0.0, 1.0)
+                combined = np.where(
+                    valid,
+                    self.config.pose_weight * window_pose + self.config.motion_weight * window_motion,
+                    -np.inf
+                )
+                choice = (np.arange(len(moving_rows)), np.argmax(combined, axis=1))
+                chunk_best[moving] = window[choice]
+                chunk_pose[moving] = window_pose[choice]
+                chunk_motion[moving] = np.where(valid, window_motion, 0.0).max(axis=1)
+            
+            best_match_idx[chunk] = chunk_best
+            pose_scores[chunk] = chunk_pose
+            motion_scores[chunk] = chunk_motion
+        
+        combined_scores = self.config.pose_weight * pose_scores + self.config.motion_weight * motion_scores
+        
+        # Streaming DTW alignment, restarted at the pose match when it drifts away
+        aligner = OnlineDTW(self.reference_unit, self.config.dtw_band)
+        dtw_ref_idx = np.zeros(num_user, dtype=int)
+        dtw_scores = np.zeros(num_user)
+        lost_frames = 0
+        for i in range(num_user):
+            expected_advance = 0.0
+            if aligner.steps > 0:
+                expected_advance = max(0.0, timestamps[i] - timestamps[i - 1]) * self.reference_fps
+            dtw_ref_idx[i], _ = aligner.step(user_unit[i], expected_advance, anchor=int(best_match_idx[i]))
+            dtw_scores[i] = max(0.0, 1.0 - aligner.normalized_cost / 2.0)
+            
+            if abs(dtw_ref_idx[i] - best_match_idx[i]) > aligner.band_width:
+                lost_frames += 1
+                if lost_frames >= self.config.tracking_max_lost_frames:
+                    aligner.reset()
+                    lost_frames = 0
+            else:
+                lost_frames = 0
+        
+        # Timing offsets from one banded DTW of the whole take against the segment it covered
+        segment_start = int(dtw_ref_idx.min())
+        segment_end = int(dtw_ref_idx.max()) + 1
+        _, path = sakoe_chiba_dtw(
+            user_unit, self.reference_unit[segment_start:segment_end], self.config.dtw_band
+        )
+        path = [(user_idx, segment_start + ref_idx) for user_idx, ref_idx in path]
+        offsets = timing_offsets(path, timestamps, self.reference_timestamps)
         
-        combined_avg = np.mean([score['combined_score'] for score in recent_scores])
-        pose_avg = np.mean([score['pose_score'] for score in recent_scores])
-        motion_avg = np.mean([score['motion_score'] for score in recent_scores])
-        dtw_avg = np.mean([score['dtw_score'] for score in recent_scores])
+        raw_scores = np.column_stack([combined_scores, pose_scores, motion_scores, dtw_scores])
+        smoothed = self._trailing_mean(raw_scores, self.config.smoothing_window)
         
-        return {
-            'combined_score': combined_avg,
-            'pose_score': pose_avg,
-            'motion_score': motion_avg,
-            'dtw_score': dtw_avg
+        result = {
+            'timestamp': timestamps,
+            'best_match_idx': best_match_idx,
+            'dtw_ref_idx': dtw_ref_idx,
+            'reference_timestamp': self.reference_timestamps[dtw_ref_idx],
+            'timing_offset': offsets,
         }
+        for column, name in enumerate(SCORE_FIELDS):
+            result[name] = smoothed[:, column]
+            result['raw_' + name] = raw_scores[:, column]
+        return result
+    
+    @staticmethod
+    def _trailing_mean(values: np.ndarray, window: int) -> np.ndarray:
+        """Mean of each row and the up to window - 1 rows before it (like _apply_smoothing)."""
+        window = max(1, window)
+        totals = np.vstack([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+        end = np.arange(1, len(values) + 1)
+        start = np.maximum(0, end - window)
+        return (totals[end] - totals[start]) / (end - start)[:, None]
     
     def get_reference_pose_at_index(self, index: int) -> Optional[np.ndarray]:
         """Get reference pose landmarks at specific index."""
@@ -363,20 +834,49 @@ class PoseComparisonService:
             return self.reference_poses[index]
         return None
     
+    def get_history_bytes(self) -> int:
+        """Fixed memory held by this session's pose, motion and score history."""
+        return (self.user_pose_history.nbytes + self.user_motion_history.nbytes +
+                self.similarity_scores.nbytes)
+    
+    def get_tracking_statistics(self) -> Dict[str, Any]:
+        """Get temporal-locality search statistics."""
+        return {
+            'tracking_enabled': self.config.tracking_enabled,
+            'tracking_window': self.config.tracking_window,
+            'windowed_searches': self.windowed_searches,
+            'full_scans': self.full_scans,
+            'tracking_fallbacks': self.tracking_fallbacks,
+            'resyncs': self.resyncs,
+            'last_resync': self.last_resync,
+            'fallback_rate': (
+                self.tracking_fallbacks / self.windowed_searches
+                if self.windowed_searches > 0 else 0.0
+            ),
+            'ann_index_active': self.reference_index is not None,
+            'ann_queries': self.ann_queries,
+            'ann_recall': (
+                self.ann_recall_total / self.ann_recall_checks
+                if self.ann_recall_checks > 0 else None
+            )
+        }
+    
     def get_statistics(self) -> Dict[str, Any]:
         """Get comparison statistics."""
-        if not self.similarity_scores:
-            return {'average_score': 0.0, 'total_comparisons': 0}
+        if len(self.similarity_scores) == 0:
+            return {'average_score': 0.0, 'total_comparisons': 0, **self.get_tracking_statistics()}
         
-        recent_scores = list(self.similarity_scores)[-10:]  # Last 10 comparisons
-        avg_score = np.mean([score['combined_score'] for score in recent_scores])
+        recent_scores = self.similarity_scores.last('scores', 10)  # Last 10 comparisons
+        avg_score = float(recent_scores[:, SCORE_FIELDS.index('combined_score')].mean())
         
         return {
             'average_score': avg_score,
             'total_comparisons': len(self.similarity_scores),
             'reference_frames': len(self.reference_landmarks),
             'user_pose_history_length': len(self.user_pose_history),
-            'dtw_enabled': self.dtw_enabled
+            'history_bytes': self.get_history_bytes(),
+            'dtw_enabled': self.dtw_enabled,
+            **self.get_tracking_statistics()
         }
     
     def set_dtw_enabled(self, enabled: bool):
@@ -385,6 +885,9 @@ class PoseComparisonService:
         if not enabled:
             # Clear DTW-related data when disabled
             self.last_dtw_time = 0
+            self.last_path_time = 0.0
+            self.timing_offset = 0.0
+            self.online_dtw.reset()
     
     def update_config(self, config: PoseComparisonConfig):
         """Update the configuration dynamically."""
@@ -393,12 +896,18 @@ class PoseComparisonService:
         self.dtw_window = min(self.config.dtw_window, len(self.reference_landmarks))
         self.dtw_interval = self.config.dtw_interval
         self.dtw_enabled = self.config.dtw_enabled
-        
-        # Resize deques if needed
+        if self.online_dtw.band_width != max(1, self.config.dtw_band):
+            self.online_dtw.band_width = max(1, self.config.dtw_band)
+            self.reference_upper, self.reference_lower = self.reference_features.envelopes(
+                self.config.dtw_band + 1
+            )
+        self._build_reference_index()
+        
+        # Resize history buffers in place (no-op when the smoothing window is unchanged)
         new_maxlen = self.config.smoothing_window
-        self.user_pose_history = deque(list(self.user_pose_history), maxlen=new_maxlen * 2)
-        self.user_motion_history = deque(list(self.user_motion_history), maxlen=new_maxlen)
-        self.similarity_scores = deque(list(self.similarity_scores), maxlen=new_maxlen)
+        self.user_pose_history.resize(new_maxlen * 2)
+        self.user_motion_history.resize(new_maxlen)
+        self.similarity_scores.resize(new_maxlen)
 
 
 # Example usage and testing
@@ -0,0 +1,775 @@
+"""
+Pose Detector Pool
+
+Runs MediaPipe pose (and hand) inference in a pool of worker processes, each
+owning its own detector graphs, so snapshots from different sessions are
+inferred in parallel instead of queuing behind one global graph.
+
+Frames travel through a shared-memory ring of frame slots; only the slot number
+and frame size are sent to the worker. Each worker writes its result as a
+compact float32 block into a second shared-memory array, so neither frames nor
+landmarks are ever pickled:
+
+    [has_pose, num_hands, pose (33 x 4), hands (2 x 21 x 3), handedness (2 x 2)]
+
+With num_workers=0 detection runs in-process on one background thread (same
+API, no extra processes).
+
+Every stream (a session's webcam, a reference video) gets its own tracking
+detector, so MediaPipe's tracker follows one person instead of alternating
+between unrelated frames and falling back to full detection on every call.
+Frames without a stream use a static-image detector. Streams are pinned to the
+worker with the fewest streams, which puts a session's user and reference
+streams on different workers so both inferences overlap.
+
+Each worker reports results over its own pipe, so a worker that dies (e.g. a
+native MediaPipe crash) cannot leave a lock held that the others need. The
+collector thread watches the worker processes: the frames a dead worker held
+fail with RuntimeError and a fresh process takes over its streams.
+"""
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import connection, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.data.config import settings
+
+NUM_POSE_LANDMARKS = 33
+NUM_HAND_LANDMARKS = 21
+MAX_HANDS = 2
+HAND_LABELS = ['', 'Left', 'Right']
+LEVEL_HOLD_SECONDS = 30.0  # Unused quality levels of a stream are kept this long before closing
+
+# Result block layout (float32)
+POSE_OFFSET = 2
+HANDS_OFFSET = POSE_OFFSET + NUM_POSE_LANDMARKS * 4
+HANDEDNESS_OFFSET = HANDS_OFFSET + MAX_HANDS * NUM_HAND_LANDMARKS * 3
+RESULT_FLOATS = HANDEDNESS_OFFSET + MAX_HANDS * 2
+
+
+@dataclass
+class PoseDetection:
+    """Landmarks detected in one frame."""
+    pose_landmarks: Optional[np.ndarray]  # (33, 4) float32 [x, y, z, visibility], None if no pose
+    hand_landmarks: List[np.ndarray] = field(default_factory=list)  # (21, 3) float32 per hand
+    hand_classifications: List[Dict[str, Any]] = field(default_factory=list)
+    inference_time: float = 0.0
+    worker_id: int = -1
+    warmup: bool = False  # A detector graph was built for this frame (latency is not representative)
+
+    @classmethod
+    def from_block(cls, block: np.ndarray, inference_time: float = 0.0,
+                   worker_id: int = -1, warmup: bool = False) -> 'PoseDetection':
+        """Unpack a result block (the block is copied)."""
+        block = np.array(block, dtype=np.float32)
+        pose_landmarks = None
+        if block[0] > 0:
+            pose_landmarks = block[POSE_OFFSET:HANDS_OFFSET].reshape(NUM_POSE_LANDMARKS, 4)
+
+        hands = block[HANDS_OFFSET:HANDEDNESS_OFFSET].reshape(MAX_HANDS, NUM_HAND_LANDMARKS, 3)
+        handedness = block[HANDEDNESS_OFFSET:].reshape(MAX_HANDS, 2)
+        hand_landmarks = []
+        hand_classifications = []
+        for hand in range(int(block[1])):
+            # One classification per hand, so the two lists always pair up
+            hand_landmarks.append(hands[hand])
+            label = int(handedness[hand, 0])
+            hand_classifications.append({
+                'label': HAND_LABELS[label] or 'Unknown',
+                'confidence': float(handedness[hand, 1])
+            })
+
+        return cls(pose_landmarks, hand_landmarks, hand_classifications, inference_time, worker_id, warmup)
+
+
+class _Detector:
+    """MediaPipe pose and hands graphs (created on first use) writing results as float32 blocks."""
+
+    def __init__(self, model_complexity: int, min_detection_confidence: float,
+                 min_tracking_confidence: float, static_image_mode: bool = False):
+        self.model_complexity = model_complexity
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.static_image_mode = static_image_mode
+        self.lock = threading.Lock()
+        self._pose = None
+        self._hands = None
+
+    @property
+    def pose(self):
+        if self._pose is None:
+            import mediapipe as mp
+
+            self._pose = mp.solutions.pose.Pose(
+                static_image_mode=self.static_image_mode,
+                model_complexity=self.model_complexity,
+                enable_segmentation=False,
+                min_detection_confidence=self.min_detection_confidence,
+                min_tracking_confidence=self.min_tracking_confidence
+            )
+        return self._pose
+
+    @property
+    def hands(self):
+        if self._hands is None:
+            import mediapipe as mp
+
+            self._hands = mp.solutions.hands.Hands(
+                static_image_mode=self.static_image_mode,
+                max_num_hands=MAX_HANDS,
+                model_complexity=min(self.model_complexity, 1),
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+        return self._hands
+
+    def detect(self, rgb_frame: np.ndarray, detect_hands: bool, out: np.ndarray,
+               detect_pose: bool = True) -> bool:
+        """
+        Run inference on an RGB frame and write the result block into out.
+
+        Returns:
+            True if a graph had to be built first (warm-up frame)
+        """
+        with self.lock:
+            warmup = (detect_pose and self._pose is None) or (detect_hands and self._hands is None)
+            self._detect(rgb_frame, detect_hands, out, detect_pose)
+            return warmup
+
+    def _detect(self, rgb_frame: np.ndarray, detect_hands: bool, out: np.ndarray, detect_pose: bool):
+        out[:] = 0.0
+
+        if detect_pose:
+            pose_results = self.pose.process(rgb_frame)
+            if pose_results.pose_landmarks:
+                out[0] = 1.0
+                out[POSE_OFFSET:HANDS_OFFSET] = [
+                    value
+                    for lm in pose_results.pose_landmarks.landmark
+                    for value in (lm.x, lm.y, lm.z, lm.visibility)
+                ]
+
+        if not detect_hands:
+            return
+
+        hand_results = self.hands.process(rgb_frame)
+        if hand_results.multi_hand_landmarks:
+            hands = hand_results.multi_hand_landmarks[:MAX_HANDS]
+            out[1] = len(hands)
+            for hand, hand_landmark in enumerate(hands):
+                start = HANDS_OFFSET + hand * NUM_HAND_LANDMARKS * 3
+                out[start:start + NUM_HAND_LANDMARKS * 3] = [
+                    value for lm in hand_landmark.landmark for value in (lm.x, lm.y, lm.z)
+                ]
+                if hand_results.multi_handedness and hand < len(hand_results.multi_handedness):
+                    classification = hand_results.multi_handedness[hand].classification[0]
+                    label = classification.label
+                    out[HANDEDNESS_OFFSET + hand * 2] = HAND_LABELS.index(label) if label in HAND_LABELS else 0
+                    out[HANDEDNESS_OFFSET + hand * 2 + 1] = classification.score
+
+    def close(self):
+        with self.lock:
+            for graph in (self._pose, self._hands):
+                if graph is not None:
+                    graph.close()
+            self._pose = None
+            self._hands = None
+
+
+class _StreamDetectors:
+    """
+    Tracking detector per (stream, model complexity), least recently used stream closed first.
+
+    Keeping one detector per complexity lets a stream switch quality levels and
+    back without rebuilding its graphs or restarting tracking. A stream's other
+    levels are closed once they have gone unused for level_hold seconds, so the
+    live graphs stay within max_streams x the levels in use. Frames without a
+    stream share a static-image detector per complexity.
+    """
+
+    def __init__(self, detector_options: Dict[str, Any], max_streams: int,
+                 level_hold: float = LEVEL_HOLD_SECONDS):
+        self.detector_options = detector_options
+        self.max_streams = max(1, max_streams)
+        self.level_hold = level_hold
+        self._detectors: 'OrderedDict[Tuple[str, int], _Detector]' = OrderedDict()
+        self._last_used: Dict[Tuple[str, int], float] = {}
+        self._static: Dict[int, _Detector] = {}
+        self._lock = threading.Lock()
+
+    def get(self, stream_id: Optional[str], model_complexity: Optional[int] = None) -> _Detector:
+        """Detector for a stream at a model complexity (default: the pool's), created on first use."""
+        if model_complexity is None:
+            model_complexity = self.detector_options['model_complexity']
+        options = dict(self.detector_options, model_complexity=model_complexity)
+        with self._lock:
+            if stream_id is None:
+                if model_complexity not in self._static:
+                    self._static[model_complexity] = _Detector(**options, static_image_mode=True)
+                return self._static[model_complexity]
+
+            now = time.monotonic()
+            key = (stream_id, model_complexity)
+            detector = self._detectors.get(key)
+            if detector is None:
+                detector = _Detector(**options)
+                self._detectors[key] = detector
+            self._detectors.move_to_end(key)
+            self._last_used[key] = now
+
+            # Other levels of this stream past their hold, then least recently used streams
+            stale = [old_key for old_key in self._detectors
+                     if old_key[0] == stream_id and old_key != key
+                     and now - self._last_used[old_key] >= self.level_hold]
+            recent_streams = list(OrderedDict.fromkeys(old_key[0] for old_key in reversed(self._detectors)))
+            stale += [old_key for old_key in self._detectors
+                      if old_key[0] in recent_streams[self.max_streams:]]
+            evicted = [self._pop(old_key) for old_key in stale]
+        for old in evicted:
+            old.close()
+        return detector
+
+    def release(self, stream_id: str):
+        """Close the detectors of a finished stream and its sub-streams ("<stream_id>:...")."""
+        with self._lock:
+            released = [self._pop(key) for key in list(self._detectors)
+                        if _in_stream(key[0], stream_id)]
+        for detector in released:
+            detector.close()
+
+    def __len__(self) -> int:
+        return len({key[0] for key in self._detectors})
+
+    @property
+    def num_graphs(self) -> int:
+        """Tracking detectors currently open (one per stream and level in use)."""
+        return len(self._detectors)
+
+    def close(self):
+        with self._lock:
+            detectors = list(self._detectors.values()) + list(self._static.values())
+            self._detectors.clear()
+            self._last_used.clear()
+            self._static.clear()
+        for detector in detectors:
+            detector.close()
+
+    def _pop(self, key: Tuple[str, int]) -> _Detector:
+        self._last_used.pop(key, None)
+        return self._detectors.pop(key)
+
+
+def _resolve(future: Future, detection: Optional[PoseDetection] = None,
+             error: Optional[Exception] = None):
+    """Complete a future unless its caller already cancelled it."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(detection)
+    except InvalidStateError:
+        pass
+
+
+def _in_stream(key: Optional[str], stream_id: str) -> bool:
+    """Whether key is stream_id or one of its sub-streams."""
+    return key is not None and (key == stream_id or key.startswith(stream_id + ":"))
+
+
+def _worker_main(worker_id: int, frames_name: str, results_name: str, slot_bytes: int,
+                 num_slots: int, detector_options: Dict[str, Any], max_streams: int, tasks, done):
+    """
+    Worker process: run tasks (slot, height, width, detect_pose, detect_hands, stream_id,
+    model_complexity) until None arrives, sending results over the done pipe.
+
+    ('release', stream_id) closes the detector of a finished stream.
+    """
+    frames_memory = shared_memory.SharedMemory(name=frames_name)
+    results_memory = shared_memory.SharedMemory(name=results_name)
+    results = np.ndarray((num_slots, RESULT_FLOATS), dtype=np.float32, buffer=results_memory.buf)
+    detectors = _StreamDetectors(detector_options, max_streams)
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            if task[0] == 'release':
+                detectors.release(task[1])
+                continue
+
+            slot, height, width, detect_pose, detect_hands, stream_id, model_complexity = task
+            start = time.perf_counter()
+            error = None
+            warmup = False
+            try:
+                frame = np.ndarray((height, width, 3), dtype=np.uint8,
+                                   buffer=frames_memory.buf, offset=slot * slot_bytes)
+                detector = detectors.get(stream_id, model_complexity)
+                warmup = detector.detect(frame, detect_hands, results[slot], detect_pose)
+            except Exception as e:
+                results[slot] = 0.0
+                error = str(e)
+            done.send((slot, worker_id, time.perf_counter() - start, error, warmup))
+    finally:
+        detectors.close()
+        done.close()
+        del results
+        frames_memory.close()
+        results_memory.close()
+
+
+class PoseDetectorPool:
+    """
+    Parallel MediaPipe inference over worker processes.
+
+    Usage:
+        detection = pose_detector_pool.detect(rgb_frame, stream_id=session_id)
+        detection = await pose_detector_pool.detect_async(rgb_frame, stream_id=session_id)
+
+    Each stream_id gets its own tracking detector on one worker (chosen as the
+    worker with the fewest streams), so MediaPipe's tracking mode sees a
+    continuous video; frames without a stream go to the least busy worker and
+    use a static-image detector. Submissions never block: when every frame slot is in use
+    they wait in a queue (see queue_depth) until a slot frees up.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, model_complexity: int = 1,
+                 min_detection_confidence: float = 0.5, min_tracking_confidence: float = 0.5,
+                 max_frame_pixels: int = 1280 * 720, slots_per_worker: int = 2,
+                 max_streams_per_worker: int = 8, timeout: float = 10.0):
+        """
+        Initialize the pool (workers start on first use).
+
+        Args:
+            num_workers: Worker processes (None = one per CPU core, 0 = in-process)
+            model_complexity: MediaPipe pose model complexity (0, 1 or 2)
+            min_detection_confidence: Pose detection threshold
+            min_tracking_confidence: Pose tracking threshold
+            max_frame_pixels: Frame slot size; larger frames are downscaled first
+                (landmarks are normalised, so results are unaffected)
+            slots_per_worker: Frames in flight per worker
+            max_streams_per_worker: Streams with tracking detectors kept per worker, each
+                with a detector per quality level in use (least recently used streams
+                are dropped first)
+            timeout: Seconds detect() waits for a result
+        """
+        self.num_workers = (os.cpu_count() or 1) if num_workers is None else max(0, int(num_workers))
+        self.detector_options = {
+            'model_complexity': model_complexity,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence
+        }
+        self.max_frame_pixels = max_frame_pixels
+        self.num_slots = max(1, self.num_workers * slots_per_worker)
+        self.slot_bytes = max_frame_pixels * 3
+        self.max_streams_per_worker = max_streams_per_worker
+        self.timeout = timeout
+
+        self.frames_processed = 0
+        self.total_inference_time = 0.0
+        self.worker_restarts = 0
+
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._free_slots: deque = deque()
+        self._pending: deque = deque()
+        self._in_flight: Dict[int, Tuple[Future, int]] = {}
+        self._worker_load: List[int] = []
+        self._stream_workers: 'OrderedDict[str, int]' = OrderedDict()
+        self._worker_streams: List[int] = [0] * max(1, self.num_workers)
+        self._processes: List[Any] = []
+        self._task_queues: List[Any] = []
+        self._result_pipes: List[Any] = []
+        self._context = None
+        self._wakeup: Optional[Tuple[Any, Any]] = None
+        self._collector: Optional[threading.Thread] = None
+        self._frames_memory: Optional[shared_memory.SharedMemory] = None
+        self._results_memory: Optional[shared_memory.SharedMemory] = None
+        self._frames: Optional[np.ndarray] = None
+        self._results: Optional[np.ndarray] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local_detectors: Optional[_StreamDetectors] = None
+
+    def start(self):
+        """Start the worker processes (called automatically on first submit)."""
+        with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("PoseDetectorPool is closed")
+            self._started = True
+
+            if self.num_workers == 0:
+                # Two threads so a session's user and reference frames overlap
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pose-detector")
+                self._local_detectors = _StreamDetectors(self.detector_options, self.max_streams_per_worker)
+                return
+
+            self._frames_memory = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_bytes)
+            self._results_memory = shared_memory.SharedMemory(
+                create=True, size=self.num_slots * RESULT_FLOATS * 4
+            )
+            self._frames = np.ndarray((self.num_slots * self.slot_bytes,), dtype=np.uint8,
+                                      buffer=self._frames_memory.buf)
+            self._results = np.ndarray((self.num_slots, RESULT_FLOATS), dtype=np.float32,
+                                       buffer=self._results_memory.buf)
+            self._free_slots.extend(range(self.num_slots))
+            self._worker_load = [0] * self.num_workers
+
+            self._context = multiprocessing.get_context("spawn")
+            self._wakeup = self._context.Pipe(duplex=False)
+            try:
+                for worker_id in range(self.num_workers):
+                    self._processes.append(None)
+                    self._task_queues.append(None)
+                    self._result_pipes.append(None)
+                    self._spawn_worker(worker_id)
+            except Exception:
+                # Leave the pool unstarted (and the shared memory released) so a retry starts clean
+                for process in self._processes:
+                    if process is not None:
+                        process.terminate()
+                for pipe in [*self._result_pipes, *self._wakeup]:
+                    if pipe is not None:
+                        pipe.close()
+                self._processes.clear()
+                self._task_queues.clear()
+                self._result_pipes.clear()
+                self._free_slots.clear()
+                self._frames = None
+                self._results = None
+                for memory in (self._frames_memory, self._results_memory):
+                    memory.close()
+                    memory.unlink()
+                self._started = False
+                raise
+
+            self._collector = threading.Thread(target=self._collect_results, daemon=True,
+                                               name="pose-detector-collector")
+            self._collector.start()
+            print(f"[PoseDetectorPool] Started {self.num_workers} worker processes")
+
+    def submit(self, rgb_frame: np.ndarray, stream_id: Optional[str] = None,
+               detect_hands: bool = True, detect_pose: bool = True,
+               model_complexity: Optional[int] = None) -> Future:
+        """
+        Queue an RGB frame for inference.
+
+        Args:
+            rgb_frame: (H, W, 3) uint8 RGB image
+            stream_id: Video stream the frame belongs to (keeps tracking continuous;
+                None = independent image)
+            detect_hands: Also run hand detection
+            detect_pose: Run pose detection (False for hand-only crops)
+            model_complexity: Pose model complexity for this frame (None = the pool's)
+
+        Returns:
+            Future resolving to a PoseDetection
+        """
+        if not self._started:
+            self.start()
+
+        if self.num_workers == 0:
+            return self._executor.submit(self._detect_local, rgb_frame, stream_id, detect_hands, detect_pose,
+                                         model_complexity)
+
+        frame = self._fit_frame(rgb_frame)
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PoseDetectorPool is closed")
+            worker_id = self._choose_worker(stream_id)
+            self._worker_load[worker_id] += 1
+            if self._free_slots:
+                self._dispatch(self._free_slots.popleft(), frame, worker_id, detect_pose, detect_hands,
+                               stream_id, model_complexity, future)
+            else:
+                self._pending.append((frame, worker_id, detect_pose, detect_hands, stream_id,
+                                      model_complexity, future))
+        return future
+
+    def release_stream(self, stream_id: str):
+        """Drop the tracking detectors of a stream that has ended and of its sub-streams
+        ("<stream_id>:reference", ...)."""
+        if self.num_workers == 0:
+            if self._local_detectors is not None:
+                self._local_detectors.release(stream_id)
+            return
+
+        with self._lock:
+            if self._closed:
+                return
+            workers = set()
+            for key in [key for key in self._stream_workers if _in_stream(key, stream_id)]:
+                worker_id = self._stream_workers.pop(key)
+                self._worker_streams[worker_id] -= 1
+                workers.add(worker_id)
+            for worker_id in workers:
+                self._task_queues[worker_id].put(('release', stream_id))
+
+    def detect(self, rgb_frame: np.ndarray, stream_id: Optional[str] = None,
+               detect_hands: bool = True, detect_pose: bool = True,
+               model_complexity: Optional[int] = None) -> PoseDetection:
+        """Run inference and wait for the result (thread-safe)."""
+        future = self.submit(rgb_frame, stream_id, detect_hands, detect_pose, model_complexity)
+        return future.result(timeout=self.timeout)
+
+    async def detect_async(self, rgb_frame: np.ndarray, stream_id: Optional[str] = None,
+                           detect_hands: bool = True, detect_pose: bool = True,
+                           model_complexity: Optional[int] = None) -> PoseDetection:
+        """Run inference without blocking the event loop."""
+        future = asyncio.wrap_future(self.submit(rgb_frame, stream_id, detect_hands, detect_pose,
+                                                 model_complexity))
+        return await asyncio.wait_for(future, timeout=self.timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        """Frames waiting for a free slot."""
+        return len(self._pending)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Pool statistics."""
+        return {
+            'workers': self.num_workers,
+            'started': self._started,
+            'frames_processed': self.frames_processed,
+            'worker_restarts': self.worker_restarts,
+            'average_inference_time': (self.total_inference_time / self.frames_processed
+                                       if self.frames_processed else 0.0),
+            'in_flight': len(self._in_flight),
+            'queue_depth': self.queue_depth,
+            'streams': (len(self._local_detectors) if self._local_detectors is not None
+                        else len(self._stream_workers))
+        }
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            started = self._started
+
+        if not started:
+            return
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._local_detectors.close()
+            return
+
+        for tasks in self._task_queues:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._wakeup[1].send(None)
+        self._collector.join(timeout=5)
+        for pipe in [*self._result_pipes, *self._wakeup]:
+            pipe.close()
+
+        with self._lock:
+            for future, _ in self._in_flight.values():
+                _resolve(future, error=RuntimeError("PoseDetectorPool closed"))
+            for *_, future in self._pending:
+                _resolve(future, error=RuntimeError("PoseDetectorPool closed"))
+            self._in_flight.clear()
+            self._pending.clear()
+
+        self._frames = None
+        self._results = None
+        for memory in (self._frames_memory, self._results_memory):
+            memory.close()
+            memory.unlink()
+
+    def _fit_frame(self, rgb_frame: np.ndarray) -> np.ndarray:
+        """Downscale frames larger than a slot, keeping the aspect ratio."""
+        height, width = rgb_frame.shape[:2]
+        if height * width <= self.max_frame_pixels:
+            return rgb_frame
+        scale = (self.max_frame_pixels / (height * width)) ** 0.5
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(rgb_frame, size, interpolation=cv2.INTER_AREA)
+
+    def _choose_worker(self, stream_id: Optional[str]) -> int:
+        """Worker for a frame: fixed per stream, otherwise the least busy (caller holds the lock)."""
+        if stream_id is None:
+            return min(range(self.num_workers), key=self._worker_load.__getitem__)
+
+        worker_id = self._stream_workers.get(stream_id)
+        if worker_id is not None:
+            self._stream_workers.move_to_end(stream_id)
+            return worker_id
+
+        # New stream: the worker tracking the fewest streams, then the least busy one
+        worker_id = min(range(self.num_workers),
+                        key=lambda w: (self._worker_streams[w], self._worker_load[w]))
+        self._stream_workers[stream_id] = worker_id
+        self._worker_streams[worker_id] += 1
+
+        # Forget streams the workers have already evicted
+        while len(self._stream_workers) > self.num_workers * self.max_streams_per_worker:
+            _, old_worker = self._stream_workers.popitem(last=False)
+            self._worker_streams[old_worker] -= 1
+        return worker_id
+
+    def _dispatch(self, slot: int, frame: np.ndarray, worker_id: int, detect_pose: bool,
+                  detect_hands: bool, stream_id: Optional[str], model_complexity: Optional[int],
+                  future: Future):
+        """Copy a frame into a slot and hand the slot to a worker (caller holds the lock)."""
+        height, width = frame.shape[:2]
+        start = slot * self.slot_bytes
+        self._frames[start:start + height * width * 3].reshape(height, width, 3)[:] = frame
+        self._in_flight[slot] = (future, worker_id)
+        self._task_queues[worker_id].put((slot, height, width, detect_pose, detect_hands, stream_id,
+                                          model_complexity))
+
+    def _spawn_worker(self, worker_id: int):
+        """Start (or replace) a worker process with fresh task and result channels."""
+        results_reader, results_writer = self._context.Pipe(duplex=False)
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self._frames_memory.name, self._results_memory.name,
+                  self.slot_bytes, self.num_slots, self.detector_options,
+                  self.max_streams_per_worker, tasks, results_writer),
+            daemon=True,
+            name=f"pose-detector-{worker_id}"
+        )
+        process.start()
+        results_writer.close()
+        self._processes[worker_id] = process
+        self._task_queues[worker_id] = tasks
+        self._result_pipes[worker_id] = results_reader
+
+    def _collect_results(self):
+        """Collector thread: resolve futures as workers finish, refill freed slots and
+        restart workers that died."""
+        wakeup = self._wakeup[0]
+        while True:
+            # Only the collector replaces workers, so the lists are read without the lock
+            pipes = [pipe for pipe in self._result_pipes if not pipe.closed]
+            sentinels = {} if self._closed else {
+                process.sentinel: worker_id for worker_id, process in enumerate(self._processes)
+            }
+            ready = connection.wait([wakeup, *pipes, *sentinels])
+            if wakeup in ready:
+                break
+
+            for pipe in pipes:
+                if pipe in ready:
+                    self._receive_results(pipe)
+            dead = [worker_id for sentinel, worker_id in sentinels.items() if sentinel in ready]
+            if dead:
+                self._restart_workers(dead)
+
+    def _receive_results(self, pipe):
+        """Handle the results waiting in a worker's pipe (closing it once the worker has exited)."""
+        try:
+            while pipe.poll():
+                self._finish(*pipe.recv())
+        except (EOFError, OSError):
+            pipe.close()
+
+    def _finish(self, slot: int, worker_id: int, inference_time: float, error: Optional[str],
+                warmup: bool):
+        """Resolve the future of a finished frame and reuse its slot."""
+        with self._lock:
+            if slot not in self._in_flight:
+                return
+            future, _ = self._in_flight.pop(slot)
+            detection = PoseDetection.from_block(self._results[slot], inference_time, worker_id, warmup)
+            self._worker_load[worker_id] -= 1
+            self.frames_processed += 1
+            self.total_inference_time += inference_time
+            self._release_slot(slot)
+
+        if error is not None:
+            _resolve(future, error=RuntimeError(f"Pose inference failed: {error}"))
+        else:
+            _resolve(future, detection)
+
+    def _release_slot(self, slot: int):
+        """Hand a freed slot to the next waiting frame (caller holds the lock)."""
+        # Frames whose caller gave up (timeout) are dropped instead of inferred
+        while self._pending and self._pending[0][-1].cancelled():
+            _, cancelled_worker, *_ = self._pending.popleft()
+            self._worker_load[cancelled_worker] -= 1
+        if self._pending:
+            self._dispatch(slot, *self._pending.popleft())
+        else:
+            self._free_slots.append(slot)
+
+    def _restart_workers(self, worker_ids: List[int]):
+        """Fail the frames held by dead workers and start replacement processes."""
+        for worker_id in worker_ids:
+            # Results sent before the worker died still count
+            pipe = self._result_pipes[worker_id]
+            if not pipe.closed:
+                self._receive_results(pipe)
+                pipe.close()
+
+            failed: List[Future] = []
+            with self._lock:
+                if self._closed:
+                    return
+                process = self._processes[worker_id]
+                process.join()
+                print(f"[PoseDetectorPool] Worker {worker_id} died (exit code {process.exitcode}), restarting")
+                self.worker_restarts += 1
+
+                # Frames waiting for the dead worker fail too instead of queuing behind it
+                failed.extend(entry[-1] for entry in self._pending if entry[1] == worker_id)
+                self._pending = deque(entry for entry in self._pending if entry[1] != worker_id)
+                slots = [slot for slot, (_, owner) in self._in_flight.items() if owner == worker_id]
+                failed.extend(self._in_flight.pop(slot)[0] for slot in slots)
+                self._worker_load[worker_id] = 0
+
+                old_tasks = self._task_queues[worker_id]
+                old_tasks.cancel_join_thread()
+                old_tasks.close()
+                self._spawn_worker(worker_id)
+                for slot in slots:
+                    self._release_slot(slot)
+
+            for future in failed:
+                _resolve(future, error=RuntimeError(f"Pose detector worker {worker_id} died"))
+
+    def _detect_local(self, rgb_frame: np.ndarray, stream_id: Optional[str],
+                      detect_hands: bool, detect_pose: bool,
+                      model_complexity: Optional[int]) -> PoseDetection:
+        """In-process inference on one of the pool's background threads."""
+        start = time.perf_counter()
+        block = np.zeros(RESULT_FLOATS, dtype=np.float32)
+        detector = self._local_detectors.get(stream_id, model_complexity)
+        warmup = detector.detect(np.ascontiguousarray(rgb_frame), detect_hands, block, detect_pose)
+        inference_time = time.perf_counter() - start
+        with self._lock:
+            self.frames_processed += 1
+            self.total_inference_time += inference_time
+        return PoseDetection.from_block(block, inference_time, worker_id=0, warmup=warmup)
+
+
+# Global pose detector pool instance (worker processes start on first use)
+pose_detector_pool = PoseDetectorPool(
+    num_workers=settings.pose_pool_workers,
+    model_complexity=settings.mediapipe_model_complexity,
+    min_detection_confidence=settings.mediapipe_min_detection_confidence,
+    min_tracking_confidence=settings.mediapipe_min_tracking_confidence,
+    max_frame_pixels=settings.pose_pool_max_frame_pixels,
+    max_streams_per_worker=settings.pose_pool_max_streams_per_worker
+)
+atexit.register(pose_detector_pool.close)
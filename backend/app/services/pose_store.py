@@ -0,0 +1,392 @@
+"""
+Columnar storage for processed video poses.
+
+A processed video is stored as a directory of plain .npy arrays (one column
+each) plus a small metadata.json, instead of one pickled array of frame dicts:
+
+    magnetic_poses/
+        metadata.json
+        landmarks.npy        (frames, 33, 4) float32
+        timestamps.npy       (frames,) float64
+        frame_numbers.npy    (frames,) int32
+        has_pose.npy         (frames,) bool
+        hand_landmarks.npy   (frames, 2, 21, 4) float32
+        hand_count.npy       (frames,) int8
+        hand_labels.npy      (frames, 2) int8     index into HAND_LABELS
+        hand_confidence.npy  (frames, 2) float32
+        gestures.npy         (frames, 2) int8     index into GESTURE_NAMES
+
+Every column loads with np.load(mmap_mode='r'), so opening a long reference
+costs a few page-table entries instead of unpickling thousands of dicts.
+Legacy <name>_poses.npy files are converted on first load.
+
+Convert existing files with:
+    python -m app.services.pose_store [processed_poses_dir_or_npy_files...]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+POSE_STORE_VERSION = 1
+NUM_POSE_LANDMARKS = 33
+NUM_HAND_LANDMARKS = 21
+MAX_HANDS = 2
+
+HAND_LABELS = ['', 'Left', 'Right']
+GESTURE_NAMES = ['', 'closed_fist', 'pointing', 'peace_sign', 'three_fingers',
+                 'open_hand', 'thumbs_up', 'other_gesture']
+
+# Default location of processed reference poses (app/data/processed_poses)
+PROCESSED_POSES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "processed_poses"
+)
+
+COLUMNS = {
+    'landmarks': np.float32,
+    'timestamps': np.float64,
+    'frame_numbers': np.int32,
+    'has_pose': np.bool_,
+    'hand_landmarks': np.float32,
+    'hand_count': np.int8,
+    'hand_labels': np.int8,
+    'hand_confidence': np.float32,
+    'gestures': np.int8,
+}
+
+
+class PoseArrays:
+    """
+    Column arrays of one processed video.
+
+    Arrays may be read-only memory maps; frames() gives the familiar list-of-dicts
+    view on top of them without copying landmarks.
+    """
+
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None, **columns: np.ndarray):
+        """
+        Wrap column arrays.
+
+        Args:
+            metadata: Video information (filename, fps, ...)
+            **columns: One array per entry of COLUMNS
+        """
+        missing = set(COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing pose columns: {sorted(missing)}")
+
+        self.metadata = dict(metadata or {})
+        self.landmarks = columns['landmarks']
+        self.timestamps = columns['timestamps']
+        self.frame_numbers = columns['frame_numbers']
+        self.has_pose = columns['has_pose']
+        self.hand_landmarks = columns['hand_landmarks']
+        self.hand_count = columns['hand_count']
+        self.hand_labels = columns['hand_labels']
+        self.hand_confidence = columns['hand_confidence']
+        self.gestures = columns['gestures']
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Column name to array."""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    @property
+    def pose_indices(self) -> np.ndarray:
+        """Indices of the frames with a detected pose."""
+        return np.flatnonzero(self.has_pose)
+
+    def frames(self, pose_only: bool = False) -> 'PoseFrames':
+        """
+        Frames in process_video layout, built on access.
+
+        Args:
+            pose_only: Only include frames with a detected pose
+        """
+        indices = self.pose_indices if pose_only else np.arange(len(self))
+        return PoseFrames(self, indices)
+
+    def frame(self, index: int) -> Dict[str, Any]:
+        """One frame in process_video layout (landmarks are views into the columns)."""
+        has_pose = bool(self.has_pose[index])
+        gestures = []
+        for hand in range(int(self.hand_count[index])):
+            label = int(self.hand_labels[index, hand])
+            gestures.append({
+                'hand_landmarks': self.hand_landmarks[index, hand],
+                'handedness': {
+                    'label': HAND_LABELS[label],
+                    'confidence': float(self.hand_confidence[index, hand])
+                } if label else None,
+                'gesture': GESTURE_NAMES[int(self.gestures[index, hand])] or None
+            })
+
+        return {
+            'frame_number': int(self.frame_numbers[index]),
+            'timestamp': float(self.timestamps[index]),
+            'landmarks': self.landmarks[index] if has_pose else None,
+            'has_pose': has_pose,
+            'gestures': gestures
+        }
+
+    @classmethod
+    def from_frames(cls, frames: List[Dict[str, Any]],
+                    metadata: Optional[Dict[str, Any]] = None) -> 'PoseArrays':
+        """
+        Build columns from frames in process_video layout.
+
+        Args:
+            frames: Frame dicts (frame_number, timestamp, landmarks, has_pose, gestures)
+            metadata: Video information to store alongside
+
+        Returns:
+            PoseArrays holding copies of the frame data
+        """
+        count = len(frames)
+        columns = {
+            'landmarks': np.zeros((count, NUM_POSE_LANDMARKS, 4), dtype=np.float32),
+            'timestamps': np.zeros(count, dtype=np.float64),
+            'frame_numbers': np.zeros(count, dtype=np.int32),
+            'has_pose': np.zeros(count, dtype=np.bool_),
+            'hand_landmarks': np.zeros((count, MAX_HANDS, NUM_HAND_LANDMARKS, 4), dtype=np.float32),
+            'hand_count': np.zeros(count, dtype=np.int8),
+            'hand_labels': np.zeros((count, MAX_HANDS), dtype=np.int8),
+            'hand_confidence': np.zeros((count, MAX_HANDS), dtype=np.float32),
+            'gestures': np.zeros((count, MAX_HANDS), dtype=np.int8),
+        }
+
+        for i, frame in enumerate(frames):
+            columns['frame_numbers'][i] = frame.get('frame_number', i)
+            columns['timestamps'][i] = frame.get('timestamp') or 0.0
+
+            landmarks = frame.get('landmarks')
+            if landmarks is not None:
+                landmarks = np.asarray(landmarks)
+                columns['landmarks'][i, :, :landmarks.shape[1]] = landmarks[:NUM_POSE_LANDMARKS, :4]
+                columns['has_pose'][i] = True
+
+            hands = (frame.get('gestures') or [])[:MAX_HANDS]
+            columns['hand_count'][i] = len(hands)
+            for hand, gesture in enumerate(hands):
+                hand_landmarks = gesture.get('hand_landmarks')
+                if hand_landmarks is not None:
+                    hand_landmarks = np.asarray(hand_landmarks)
+                    columns['hand_landmarks'][i, hand, :, :hand_landmarks.shape[1]] = hand_landmarks[:, :4]
+                handedness = gesture.get('handedness')
+                if handedness:
+                    columns['hand_labels'][i, hand] = _code(HAND_LABELS, handedness.get('label'))
+                    columns['hand_confidence'][i, hand] = handedness.get('confidence', 0.0)
+                columns['gestures'][i, hand] = _code(GESTURE_NAMES, gesture.get('gesture'))
+
+        return cls(metadata, **columns)
+
+
+class PoseFrames(Sequence):
+    """Read-only list of frame dicts over PoseArrays, built one frame at a time."""
+
+    def __init__(self, arrays: PoseArrays, indices: np.ndarray):
+        self.arrays = arrays
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PoseFrames(self.arrays, self.indices[index])
+        return self.arrays.frame(int(self.indices[index]))
+
+
+def save_pose_arrays(arrays: PoseArrays, path: str):
+    """
+    Write PoseArrays as a columnar pose directory.
+
+    The directory is written next to its final location and renamed into place,
+    so readers never see a partially written store.
+    """
+    columns = {name: np.asarray(getattr(arrays, name), dtype=dtype) for name, dtype in COLUMNS.items()}
+    metadata = {'version': POSE_STORE_VERSION, 'frames': len(arrays), **arrays.metadata}
+    write_array_dir(path, columns, metadata)
+
+
+def is_pose_store(path: str) -> bool:
+    """Whether path is a columnar pose directory."""
+    return os.path.isfile(os.path.join(path, "metadata.json"))
+
+
+def load_pose_arrays(path: str, mmap_mode: Optional[str] = 'r') -> PoseArrays:
+    """
+    Open a columnar pose directory.
+
+    Args:
+        path: Pose directory written by save_pose_arrays
+        mmap_mode: np.load memory-map mode (None reads the arrays into memory)
+
+    Returns:
+        PoseArrays over the stored columns
+    """
+    metadata, columns = read_array_dir(path, COLUMNS, mmap_mode)
+    if metadata.get('version') != POSE_STORE_VERSION:
+        raise ValueError(f"Unsupported pose store version {metadata.get('version')} in {path}")
+    return PoseArrays(metadata, **columns)
+
+
+def write_array_dir(path: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any],
+                    replace: bool = True) -> bool:
+    """
+    Write named arrays (one .npy each) plus metadata.json as a directory.
+
+    The directory is staged next to its final location and renamed into place,
+    so readers (including other processes) never see a partial directory.
+
+    Args:
+        path: Directory to write
+        arrays: Array name to array
+        metadata: JSON-serialisable metadata
+        replace: Replace an existing directory; otherwise keep it and return False
+
+    Returns:
+        True if this call published the directory
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+
+    staging = tempfile.mkdtemp(prefix=".tmp_", dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(staging, "metadata.json"), "w") as f:
+            json.dump({**metadata, 'arrays': list(arrays)}, f, indent=2)
+
+        retired = None
+        if os.path.isdir(path):
+            if not replace:
+                shutil.rmtree(staging)
+                return False
+            # Move the old directory aside and delete it only after the swap, so the
+            # path is missing just between two renames (open memory maps stay valid)
+            retired = staging + ".old"
+            try:
+                os.rename(path, retired)
+            except FileNotFoundError:
+                retired = None
+        try:
+            os.replace(staging, path)
+        except OSError:
+            if retired is not None:
+                os.rename(retired, path)
+            # Another process published the same directory first
+            if replace or not os.path.isdir(path):
+                raise
+            shutil.rmtree(staging)
+            return False
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+        return True
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_array_dir(path: str, names: Optional[List[str]] = None, mmap_mode: Optional[str] = 'r'):
+    """
+    Open a directory written by write_array_dir.
+
+    Args:
+        path: Directory to read
+        names: Array names to load (defaults to every array in the directory)
+        mmap_mode: np.load memory-map mode (None reads the arrays into memory)
+
+    Returns:
+        (metadata, {name: array})
+    """
+    with open(os.path.join(path, "metadata.json")) as f:
+        metadata = json.load(f)
+    if names is None:
+        names = metadata.get('arrays', [])
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in names}
+    return metadata, arrays
+
+
+def convert_legacy_poses(npy_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Convert a pickled <name>_poses.npy file to a columnar pose directory.
+
+    Args:
+        npy_path: Legacy file saved by process_video
+        output_path: Pose directory to write (defaults to npy_path without .npy)
+
+    Returns:
+        Path of the written pose directory
+    """
+    if output_path is None:
+        output_path = os.path.splitext(npy_path)[0]
+
+    frames = np.load(npy_path, allow_pickle=True)
+    arrays = PoseArrays.from_frames(list(frames), metadata={'source': os.path.basename(npy_path)})
+    save_pose_arrays(arrays, output_path)
+    return output_path
+
+
+def load_poses(path: str, mmap_mode: Optional[str] = 'r', convert: bool = True) -> PoseArrays:
+    """
+    Load processed poses from a columnar directory or a legacy .npy file.
+
+    Used by every reader of processed poses. A legacy file is converted to the
+    columnar format next to it on first load (if the directory is writable).
+
+    Args:
+        path: Pose directory, legacy .npy file, or either without extension
+        mmap_mode: np.load memory-map mode for columnar stores
+        convert: Write a columnar copy of legacy files
+
+    Returns:
+        PoseArrays for the video
+    """
+    store_path = path[:-len(".npy")] if path.endswith(".npy") else path
+    if is_pose_store(store_path):
+        return load_pose_arrays(store_path, mmap_mode)
+
+    legacy_path = store_path + ".npy"
+    if not os.path.exists(legacy_path):
+        raise FileNotFoundError(f"Processed poses not found: {store_path}")
+
+    if convert:
+        try:
+            convert_legacy_poses(legacy_path, store_path)
+            print(f"[PoseStore] Converted {legacy_path} to columnar format")
+            return load_pose_arrays(store_path, mmap_mode)
+        except OSError as e:
+            print(f"[PoseStore] Could not write columnar copy of {legacy_path}: {e}")
+
+    frames = np.load(legacy_path, allow_pickle=True)
+    return PoseArrays.from_frames(list(frames), metadata={'source': os.path.basename(legacy_path)})
+
+
+def _code(names: List[str], name: Optional[str]) -> int:
+    """Index of name in a code table (0 for missing or unknown names)."""
+    return names.index(name) if name in names else 0
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or [PROCESSED_POSES_DIR]
+    npy_files = []
+    for target in targets:
+        if os.path.isdir(target):
+            npy_files.extend(os.path.join(target, name) for name in sorted(os.listdir(target))
+                             if name.endswith(".npy"))
+        else:
+            npy_files.append(target)
+
+    for npy_file in npy_files:
+        output = convert_legacy_poses(npy_file)
+        print(f"Converted {npy_file} -> {output} ({len(load_pose_arrays(output))} frames)")
@@ -3,9 +3,11 @@ import mediapipe as mp
 import json
 import pickle
 import os
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Optional, Callable
 import numpy as np
 
+from .pose_store import PoseArrays, save_pose_arrays, load_poses, is_pose_store
+
 class VideoPoseProcessor:
     """
     Service for processing reference videos and extracting pose landmarks.
@@ -48,9 +50,11 @@ class VideoPoseProcessor:
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
-        # Set output filename (NumPy format)
+        # Set output name (columnar pose directory)
         if output_filename is None:
-            output_filename = os.path.splitext(video_filename)[0] + "_poses.npy"
+            output_filename = os.path.splitext(video_filename)[0] + "_poses"
+        elif output_filename.endswith(".npy"):
+            output_filename = output_filename[:-len(".npy")]
         
         output_path = os.path.join(self.processed_poses_dir, output_filename)
         
@@ -172,9 +176,9 @@ class VideoPoseProcessor:
             }
         }
         
-        # Save as NumPy array for maximum speed
-        np.save(output_path, poses_data)
-        print(f"Saved as NumPy array: {output_path}")
+        # Save as columnar arrays (memory-mappable, no pickling)
+        save_pose_arrays(PoseArrays.from_frames(poses_data, metadata=output_data["video_info"]), output_path)
+        print(f"Saved columnar poses: {output_path}")
         
         print(f"Processing complete! Saved to: {output_path}")
         print(f"Total poses detected: {output_data['processing_info']['total_poses_detected']}")
@@ -182,6 +186,78 @@ class VideoPoseProcessor:
         
         return output_data
     
+    def extract_poses(self, video_path: str, target_fps: float = 15.0,
+                      model_complexity: int = 1,
+                      progress_callback: Optional[Callable[[float], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Extract body pose landmarks from any video file, sampled at target_fps.
+
+        Frames between samples are only grabbed, not decoded. Hands are not
+        detected. Frames have the same layout as process_video output.
+        
+        Args:
+            video_path: Path to the video file
+            target_fps: Sampling rate (matched to the reference for scoring)
+            model_complexity: MediaPipe pose model complexity (0, 1 or 2)
+            progress_callback: Called with the fraction of the video read (0-1)
+            
+        Returns:
+            List of pose data dictionaries (frame_number, timestamp, landmarks, has_pose)
+        """
+        cap = cv2.VideoCapture(video_path)
+        
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_step = max(1, int(round(fps / target_fps))) if target_fps > 0 else 1
+        
+        poses_data = []
+        frame_count = 0
+        
+        with self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        ) as pose:
+            while cap.grab():
+                frame_count += 1
+                if frame_count % frame_step != 0:
+                    continue
+                
+                success, frame = cap.retrieve()
+                if not success:
+                    break
+                
+                pose_results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                
+                pose_data = {
+                    "frame_number": frame_count,
+                    "timestamp": frame_count / fps,
+                    "landmarks": None,
+                    "has_pose": False,
+                    "gestures": []
+                }
+                if pose_results.pose_landmarks:
+                    pose_data["landmarks"] = np.array([
+                        [lm.x, lm.y, lm.z, lm.visibility] for lm in pose_results.pose_landmarks.landmark
+                    ])
+                    pose_data["has_pose"] = True
+                
+                poses_data.append(pose_data)
+                
+                if progress_callback is not None and total_frames > 0 and len(poses_data) % 15 == 0:
+                    progress_callback(min(1.0, frame_count / total_frames))
+        
+        cap.release()
+        if progress_callback is not None:
+            progress_callback(1.0)
+        
+        return poses_data
+    
     def _normalize_pose(self, landmarks: List[Dict]) -> List[Dict]:
         """
         Normalize pose landmarks for comparison.
@@ -270,21 +346,17 @@ class VideoPoseProcessor:
     
     def load_processed_poses(self, poses_filename: str) -> List[Dict]:
         """
-        Load previously processed pose data from NumPy file.
+        Load previously processed pose data.
         
         Args:
-            poses_filename: Name of the processed poses .npy file
+            poses_filename: Name of the processed poses directory (or legacy .npy file,
+                which is converted on first load)
             
         Returns:
-            List of pose data dictionaries
+            List of pose data dictionaries (built on access from memory-mapped columns)
         """
         poses_path = os.path.join(self.processed_poses_dir, poses_filename)
-        
-        if not os.path.exists(poses_path):
-            raise FileNotFoundError(f"Processed poses file not found: {poses_path}")
-        
-        # Load NumPy array
-        return np.load(poses_path, allow_pickle=True)
+        return load_poses(poses_path).frames()
     
     def get_available_videos(self) -> List[str]:
         """Get list of available reference videos."""
@@ -306,16 +378,18 @@ class VideoPoseProcessor:
         return video_files
     
     def get_available_processed_poses(self) -> List[str]:
-        """Get list of available processed pose files."""
+        """Get list of available processed pose directories (and unconverted .npy files)."""
         if not os.path.exists(self.processed_poses_dir):
             return []
         
-        npy_files = []
-        for file in os.listdir(self.processed_poses_dir):
-            if file.endswith('.npy'):
-                npy_files.append(file)
+        files = os.listdir(self.processed_poses_dir)
+        pose_files = [file for file in files if is_pose_store(os.path.join(self.processed_poses_dir, file))]
+        
+        # Legacy .npy files not converted yet
+        pose_files += [file for file in files
+                       if file.endswith('.npy') and os.path.splitext(file)[0] not in pose_files]
         
-        return npy_files
+        return sorted(pose_files)
 
 
 # Example usage
@@ -343,7 +417,7 @@ if __name__ == "__main__":
         
         # Test numpy loading
         start = time.time()
-        numpy_data = processor.load_processed_poses(f"{os.path.splitext(video_file)[0]}_poses.npy")
+        numpy_data = processor.load_processed_poses(f"{os.path.splitext(video_file)[0]}_poses")
         numpy_time = time.time() - start
         
         print(f"NumPy load time: {numpy_time:.4f}s")
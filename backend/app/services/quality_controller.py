@@ -0,0 +1,174 @@
+"""
+Adaptive Inference Quality
+
+Keeps snapshot inference inside its latency budget under load. Every snapshot
+reports how long pose inference took (including time queued in the detector
+pool) and the pool's backlog. When the budget is at risk the server steps down
+a quality level (lower model complexity, smaller inference resolution), and it
+steps back up when there is headroom again:
+
+    high     complexity 2, 320 px crops, 960 px full frames
+    medium   complexity 1, 256 px crops, 640 px full frames
+    low      complexity 0, 192 px crops, 480 px full frames
+    minimal  complexity 0, 128 px crops, 320 px full frames
+
+The configured mediapipe_model_complexity is the ceiling. Hysteresis (several
+consecutive observations plus a cooldown after each change) keeps the level
+from flapping. The detector pool keeps a separate detector per stream and
+complexity, so switching levels does not rebuild graphs or restart tracking; a
+level a stream has not used for LEVEL_HOLD_SECONDS is closed.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Optional
+
+from app.data.config import settings
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """Inference settings of one quality level."""
+    name: str
+    model_complexity: int
+    crop_size: int  # Longest side of the pose crop around the dancer
+    frame_size: int  # Longest side of full frames (when not tracking)
+
+
+QUALITY_LEVELS = (
+    QualityLevel('high', 2, 320, 960),
+    QualityLevel('medium', 1, 256, 640),
+    QualityLevel('low', 0, 192, 480),
+    QualityLevel('minimal', 0, 128, 320),
+)
+
+
+class QualityController:
+    """
+    Server-wide quality level driven by inference latency and queue depth.
+
+    Usage:
+        level = quality_controller.level
+        ... run inference with level ...
+        quality_controller.record(latency, pose_detector_pool.queue_depth)
+    """
+
+    def __init__(self, latency_budget: float = 0.5, max_complexity: int = 1, enabled: bool = True,
+                 degrade_fraction: float = 0.8, recover_fraction: float = 0.4,
+                 degrade_after: int = 3, recover_after: int = 10, cooldown: float = 5.0,
+                 smoothing: float = 0.3):
+        """
+        Initialize the controller at the highest allowed level.
+
+        Args:
+            latency_budget: Seconds a snapshot's inference may take
+            max_complexity: Highest model complexity to use (ceiling level)
+            enabled: Adapt the level (False keeps the ceiling level)
+            degrade_fraction: Step down when average latency exceeds this share of the budget
+            recover_fraction: Step up when average latency is below this share of the budget
+            degrade_after: Consecutive over-budget observations before stepping down
+            recover_after: Consecutive observations with headroom before stepping up
+            cooldown: Seconds after a change before the level may change again
+            smoothing: Weight of the newest latency in the moving average
+        """
+        self.latency_budget = latency_budget
+        self.enabled = enabled
+        self.degrade_fraction = degrade_fraction
+        self.recover_fraction = recover_fraction
+        self.degrade_after = degrade_after
+        self.recover_after = recover_after
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+
+        self.top_index = next(
+            (index for index, level in enumerate(QUALITY_LEVELS) if level.model_complexity <= max_complexity),
+            len(QUALITY_LEVELS) - 1
+        )
+        self.index = self.top_index
+        self.average_latency: Optional[float] = None
+        self.frames = 0
+        self.transitions: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+        self._over_budget = 0
+        self._headroom = 0
+        self._changed_at = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def level(self) -> QualityLevel:
+        """Current quality level."""
+        return QUALITY_LEVELS[self.index]
+
+    def record(self, latency: float, queue_depth: int = 0, now: Optional[float] = None):
+        """
+        Record one snapshot's inference latency and adapt the level.
+
+        Args:
+            latency: Seconds from submitting the snapshot to its landmarks
+            queue_depth: Frames waiting for a detector slot
+            now: Current time (for tests)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.frames += 1
+            if self.average_latency is None:
+                self.average_latency = latency
+            else:
+                self.average_latency += self.smoothing * (latency - self.average_latency)
+
+            if not self.enabled:
+                return
+
+            over_budget = self.average_latency > self.degrade_fraction * self.latency_budget or queue_depth > 0
+            headroom = self.average_latency < self.recover_fraction * self.latency_budget and queue_depth == 0
+            self._over_budget = self._over_budget + 1 if over_budget else 0
+            self._headroom = self._headroom + 1 if headroom else 0
+
+            if now - self._changed_at < self.cooldown:
+                return
+            if self._over_budget >= self.degrade_after and self.index < len(QUALITY_LEVELS) - 1:
+                self._change(self.index + 1, now, queue_depth)
+            elif self._headroom >= self.recover_after and self.index > self.top_index:
+                self._change(self.index - 1, now, queue_depth)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Current level and recent transitions (for /health)."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'level': self.level.name,
+                'settings': asdict(self.level),
+                'average_latency': self.average_latency,
+                'latency_budget': self.latency_budget,
+                'frames': self.frames,
+                'transitions': list(self.transitions)
+            }
+
+    def _change(self, index: int, now: float, queue_depth: int):
+        """Switch level (caller holds the lock)."""
+        previous = self.level
+        self.index = index
+        self.transitions.append({
+            'time': now,
+            'from': previous.name,
+            'to': self.level.name,
+            'average_latency': self.average_latency,
+            'queue_depth': queue_depth
+        })
+        print(f"[Quality] {previous.name} -> {self.level.name} "
+              f"(average latency {self.average_latency * 1000:.0f} ms, queue depth {queue_depth})")
+
+        # Measure the new level from scratch
+        self.average_latency = None
+        self._over_budget = 0
+        self._headroom = 0
+        self._changed_at = now
+
+
+# Global quality controller instance (shared by every session in this process)
+quality_controller = QualityController(
+    latency_budget=settings.snapshot_latency_budget,
+    max_complexity=settings.mediapipe_model_complexity,
+    enabled=settings.adaptive_quality_enabled
+)
@@ -0,0 +1,147 @@
+"""
+Reference Cache
+
+Process-wide LRU cache of ReferenceFeatures keyed by file identity
+(path, mtime, size, inode). Switching back to a reference that was loaded
+before reuses its pose matrix, motions, envelopes and nearest-neighbour
+indexes instead of re-reading and re-deriving them. Rewriting the processed
+poses changes the identity, so stale entries are never served.
+
+Entries are evicted least recently used first once the cached features exceed
+the memory budget. An evicted reference still in use by sessions stays alive
+until those sessions move on; it is only dropped from the cache.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from app.data.config import settings
+from .pose_store import is_pose_store, load_poses
+from .reference_features import ReferenceFeatures
+
+FileIdentity = Tuple[str, int, int, int]
+
+
+class ReferenceCache:
+    """
+    LRU cache of reference features under a memory budget.
+
+    Usage:
+        features = reference_cache.get(".../processed_poses/magnetic_poses")
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget for cached features (the most recently used
+                reference is always kept, even if it alone exceeds the budget)
+        """
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[FileIdentity, ReferenceFeatures]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str) -> ReferenceFeatures:
+        """
+        Get the features of a processed-poses file, loading them on a miss.
+
+        Args:
+            path: Pose directory or legacy .npy file (see pose_store.load_poses)
+
+        Returns:
+            Shared, read-only ReferenceFeatures
+
+        Raises:
+            FileNotFoundError: If no processed poses exist at path
+        """
+        key = self.file_identity(path)
+        with self._lock:
+            features = self.entries.get(key)
+            if features is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return features
+
+        # Load outside the lock so other references stay available meanwhile.
+        # Columnar stores share their features with other worker processes.
+        pose_arrays = load_poses(path)
+        store_path = path[:-len(".npy")] if path.endswith(".npy") else path
+        if is_pose_store(store_path):
+            features = ReferenceFeatures.shared(store_path, pose_arrays)
+        else:
+            features = ReferenceFeatures.from_arrays(pose_arrays)
+
+        # Loading may have converted a legacy file, so key on what is on disk now
+        key = self.file_identity(path)
+        with self._lock:
+            self.misses += 1
+            # Older versions of the same file can never be hit again
+            for stale_key in [entry for entry in self.entries if entry[0] == key[0]]:
+                del self.entries[stale_key]
+            self.entries[key] = features
+            self.entries.move_to_end(key)
+            self._evict()
+        return features
+
+    def clear(self):
+        """Drop every cached reference."""
+        with self._lock:
+            self.entries.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the cached features (including lazily built indexes)."""
+        with self._lock:
+            return sum(features.total_nbytes for features in self.entries.values())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Cache statistics."""
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    @staticmethod
+    def file_identity(path: str) -> FileIdentity:
+        """
+        Identity of the processed poses at path.
+
+        Columnar stores are identified by their metadata.json, which is rewritten
+        whenever the store is saved; legacy files by the .npy file itself.
+        """
+        store_path = path[:-len(".npy")] if path.endswith(".npy") else path
+        if is_pose_store(store_path):
+            identity_file = os.path.join(store_path, "metadata.json")
+        else:
+            identity_file = store_path + ".npy"
+            if not os.path.exists(identity_file):
+                raise FileNotFoundError(f"Processed poses not found: {store_path}")
+
+        stat = os.stat(identity_file)
+        return (os.path.abspath(store_path), stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _evict(self):
+        """Drop least recently used entries until within budget (caller holds the lock)."""
+        total = sum(features.total_nbytes for features in self.entries.values())
+        while total > self.max_bytes and len(self.entries) > 1:
+            key, features = self.entries.popitem(last=False)
+            total -= features.total_nbytes
+            self.evictions += 1
+            print(f"[ReferenceCache] Evicted {os.path.basename(key[0])} "
+                  f"({features.total_nbytes / 1e6:.1f} MB)")
+
+
+# Global reference cache instance
+reference_cache = ReferenceCache(max_bytes=settings.reference_cache_max_mb * 1024 * 1024)
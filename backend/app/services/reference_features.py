@@ -0,0 +1,319 @@
+"""
+Shared reference features.
+
+Everything PoseComparisonService derives from a reference video that does not
+depend on the dancer: the (N, 69) pose matrix, motions, unit-length copies,
+timestamps, LB_Keogh envelopes and the nearest-neighbour index. The full
+(33, 4) landmarks stay reachable by video timestamp (landmarks_at), so clients
+can ask for the reference pose instead of uploading the reference frame. One instance is
+built per loaded reference and shared read-only by every session comparing
+against it, so adding a dancer does not copy the reference.
+
+For a columnar pose store, shared() also publishes every array to a features/
+directory inside the store and memory-maps it back. All uvicorn worker
+processes attach to the same files, so the page cache holds one copy of a
+reference no matter how many workers serve it. Envelopes and indexes built by
+any worker are published the same way.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dtw_alignment import keogh_envelope
+from .pose_store import PoseArrays, read_array_dir, write_array_dir
+from .reference_index import RandomProjectionForest
+
+# Nose + 22 body/limb landmarks, 3 coordinates each
+ESSENTIAL_LANDMARK_INDICES = [0] + list(range(11, 33))
+ESSENTIAL_FEATURE_COUNT = 69
+
+FEATURE_STORE_VERSION = 1
+FEATURES_DIR = "features"
+
+
+class ReferenceFeatures:
+    """
+    Immutable reference arrays plus lazily built, cached derived structures.
+
+    The arrays are marked read-only. Envelopes and indexes depend on per-session
+    config values (DTW band, index settings), so they are built on first request
+    for each setting and cached for every later session.
+    """
+
+    def __init__(self, reference_poses: Sequence[Dict[str, Any]], landmarks: np.ndarray,
+                 motions: np.ndarray, timestamps: np.ndarray, fps: float,
+                 unit: Optional[np.ndarray] = None, motion_unit: Optional[np.ndarray] = None,
+                 store_path: Optional[str] = None, frame_landmarks: Optional[np.ndarray] = None,
+                 frame_rows: Optional[np.ndarray] = None):
+        """
+        Wrap precomputed reference arrays.
+
+        Args:
+            reference_poses: Reference frames as loaded (kept for frame lookups)
+            landmarks: (N, 69) reference pose matrix
+            motions: (N-1, 69) frame-to-frame motion matrix
+            timestamps: (N,) timestamp of every row in seconds
+            fps: Reference frame rate
+            unit, motion_unit: Unit-length copies (computed if not given)
+            store_path: features/ directory envelopes and indexes are published to
+            frame_landmarks: (M, 33, 4) full landmarks the rows were taken from
+            frame_rows: (N,) index into frame_landmarks of every row (None = row i is frame i)
+        """
+        self.reference_poses = reference_poses
+        self.landmarks = self._frozen(landmarks)
+        self.motions = self._frozen(motions)
+        self.unit = self._frozen(self._unit_rows(landmarks) if unit is None else unit)
+        self.motion_unit = self._frozen(self._unit_rows(motions) if motion_unit is None else motion_unit)
+        self.timestamps = self._frozen(timestamps)
+        self.fps = fps
+        self.store_path = store_path
+        self.frame_landmarks = frame_landmarks
+        self.frame_rows = frame_rows
+
+        # Timestamp index: rows in time order (processed videos already are)
+        self._time_order = None
+        if len(self.timestamps) > 1 and np.any(np.diff(self.timestamps) < 0):
+            self._time_order = np.argsort(self.timestamps, kind='stable')
+        self._sorted_timestamps = (self.timestamps if self._time_order is None
+                                   else self._frozen(self.timestamps[self._time_order]))
+
+        self._envelopes: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._indexes: Dict[Tuple[int, int], RandomProjectionForest] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_poses(cls, reference_poses: List[Dict[str, Any]]) -> 'ReferenceFeatures':
+        """
+        Build the reference arrays from processed video frames.
+
+        Args:
+            reference_poses: Frames with (33, 4) 'landmarks' and 'timestamp'
+                (frames without landmarks are skipped)
+
+        Returns:
+            ReferenceFeatures for the frames
+        """
+        frames = [
+            pose_data for pose_data in reference_poses
+            if pose_data.get("landmarks") is not None and pose_data["landmarks"].shape[1] >= 3
+        ]
+
+        # x, y, z of the essential dance landmarks (ignore visibility)
+        if frames:
+            landmarks = np.vstack([
+                np.asarray(pose_data["landmarks"], dtype=np.float64)[ESSENTIAL_LANDMARK_INDICES, :3].ravel()
+                for pose_data in frames
+            ])
+        else:
+            landmarks = np.zeros((0, ESSENTIAL_FEATURE_COUNT), dtype=np.float64)
+
+        # Motion: v_t = pose_t - pose_(t-1)
+        motions = np.diff(landmarks, axis=0)
+
+        timestamps = [pose_data.get("timestamp") for pose_data in frames]
+        fps = cls._estimate_fps([timestamp for timestamp in timestamps if timestamp is not None])
+
+        if None in timestamps:
+            row_timestamps = np.arange(len(landmarks), dtype=np.float64) / fps
+        else:
+            row_timestamps = np.asarray(timestamps, dtype=np.float64)
+
+        frame_landmarks = np.zeros((len(frames), 33, 4), dtype=np.float32)
+        frame_landmarks[:, :, 3] = 1.0
+        for row, pose_data in enumerate(frames):
+            pose_landmarks = np.asarray(pose_data["landmarks"], dtype=np.float32)[:, :4]
+            frame_landmarks[row, :len(pose_landmarks), :pose_landmarks.shape[1]] = pose_landmarks
+
+        return cls(reference_poses, landmarks, motions, row_timestamps, fps,
+                   frame_landmarks=frame_landmarks)
+
+    @classmethod
+    def from_arrays(cls, pose_arrays: PoseArrays) -> 'ReferenceFeatures':
+        """
+        Build the reference arrays from columnar poses without per-frame Python work.
+
+        Args:
+            pose_arrays: Processed video (frames without a pose are skipped)
+
+        Returns:
+            ReferenceFeatures for the frames with a pose
+        """
+        indices = pose_arrays.pose_indices
+        landmarks = pose_arrays.landmarks[indices][:, ESSENTIAL_LANDMARK_INDICES, :3]
+        landmarks = landmarks.reshape(len(indices), ESSENTIAL_FEATURE_COUNT).astype(np.float64)
+        timestamps = np.asarray(pose_arrays.timestamps[indices], dtype=np.float64)
+
+        return cls(pose_arrays.frames(pose_only=True), landmarks, np.diff(landmarks, axis=0),
+                   timestamps, cls._estimate_fps(timestamps),
+                   frame_landmarks=pose_arrays.landmarks, frame_rows=indices)
+
+    @classmethod
+    def shared(cls, pose_store_path: str, pose_arrays: PoseArrays) -> 'ReferenceFeatures':
+        """
+        Attach to the features published inside a columnar pose store.
+
+        The first process to load the store computes the features and publishes
+        them; every later load (in any worker) memory-maps the published files.
+        Falls back to in-memory features if the store is not writable.
+
+        Args:
+            pose_store_path: Columnar pose directory
+            pose_arrays: The store's columns (from load_pose_arrays)
+
+        Returns:
+            ReferenceFeatures backed by read-only memory maps
+        """
+        path = os.path.join(pose_store_path, FEATURES_DIR)
+        if not os.path.isdir(path):
+            features = cls.from_arrays(pose_arrays)
+            try:
+                write_array_dir(path, {
+                    'landmarks': features.landmarks,
+                    'motions': features.motions,
+                    'unit': features.unit,
+                    'motion_unit': features.motion_unit,
+                    'timestamps': features.timestamps,
+                }, {'version': FEATURE_STORE_VERSION, 'fps': features.fps}, replace=False)
+            except OSError as e:
+                print(f"[ReferenceFeatures] Could not publish features to {path}: {e}")
+                return features
+
+        metadata, arrays = read_array_dir(path)
+        if metadata.get('version') != FEATURE_STORE_VERSION:
+            raise ValueError(f"Unsupported feature store version {metadata.get('version')} in {path}")
+        return cls(pose_arrays.frames(pose_only=True), arrays['landmarks'], arrays['motions'],
+                   arrays['timestamps'], metadata['fps'], unit=arrays['unit'],
+                   motion_unit=arrays['motion_unit'], store_path=path,
+                   frame_landmarks=pose_arrays.landmarks, frame_rows=pose_arrays.pose_indices)
+
+    def __len__(self) -> int:
+        return len(self.landmarks)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the shared arrays (excluding cached envelopes and indexes)."""
+        arrays = [self.landmarks, self.motions, self.unit, self.motion_unit, self.timestamps]
+        arrays += [array for array in (self.frame_landmarks, self.frame_rows, self._time_order)
+                   if array is not None]
+        return sum(array.nbytes for array in arrays)
+
+    def landmarks_at(self, timestamp: float, max_gap: float = 0.5) -> Optional[np.ndarray]:
+        """
+        Full reference landmarks at a video timestamp.
+
+        Interpolates linearly between the frames either side of the timestamp.
+        Across a gap longer than max_gap (the pose was lost in between) the
+        nearest frame is returned instead.
+
+        Args:
+            timestamp: Position in the reference video in seconds
+            max_gap: Longest gap between frames to interpolate across, and how far
+                past the first/last frame a timestamp may lie
+
+        Returns:
+            (33, 4) float32 [x, y, z, visibility], or None if no reference pose is
+            near the timestamp
+        """
+        timestamps = self._sorted_timestamps
+        if self.frame_landmarks is None or len(timestamps) == 0:
+            return None
+        if timestamp < timestamps[0] - max_gap or timestamp > timestamps[-1] + max_gap:
+            return None
+
+        after = int(np.searchsorted(timestamps, timestamp, side='right'))
+        before = max(after - 1, 0)
+        after = min(after, len(timestamps) - 1)
+
+        start, end = float(timestamps[before]), float(timestamps[after])
+        if after == before or end - start > max_gap:
+            nearest = before if abs(timestamp - start) <= abs(end - timestamp) else after
+            return np.array(self._row_landmarks(nearest), dtype=np.float32)
+
+        weight = np.float32((timestamp - start) / (end - start))
+        return (1 - weight) * self._row_landmarks(before) + weight * self._row_landmarks(after)
+
+    def _row_landmarks(self, position: int) -> np.ndarray:
+        """(33, 4) landmarks of the position-th row in time order."""
+        row = position if self._time_order is None else int(self._time_order[position])
+        if self.frame_rows is not None:
+            row = int(self.frame_rows[row])
+        return self.frame_landmarks[row]
+
+    @property
+    def total_nbytes(self) -> int:
+        """Memory held by the shared arrays plus every cached envelope and index."""
+        with self._lock:
+            envelope_bytes = sum(upper.nbytes + lower.nbytes for upper, lower in self._envelopes.values())
+            index_bytes = sum(index.nbytes for index in self._indexes.values())
+        return self.nbytes + envelope_bytes + index_bytes
+
+    def envelopes(self, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """LB_Keogh (upper, lower) envelopes of the unit reference for a radius."""
+        with self._lock:
+            if radius not in self._envelopes:
+                def build():
+                    upper, lower = keogh_envelope(self.unit, radius)
+                    return {'upper': upper, 'lower': lower}
+
+                arrays = self._published(f"envelopes_{radius}", build)
+                self._envelopes[radius] = (self._frozen(arrays['upper']), self._frozen(arrays['lower']))
+            return self._envelopes[radius]
+
+    def index(self, num_trees: int, leaf_size: int) -> RandomProjectionForest:
+        """Nearest-neighbour index over the unit reference for the given settings."""
+        key = (num_trees, leaf_size)
+        with self._lock:
+            if key not in self._indexes:
+                def build():
+                    return RandomProjectionForest(num_trees, leaf_size).build(self.unit).tree_arrays
+
+                self._indexes[key] = RandomProjectionForest.from_tree_arrays(
+                    self._published(f"index_{num_trees}_{leaf_size}", build),
+                    self.unit, num_trees, leaf_size
+                )
+            return self._indexes[key]
+
+    def _published(self, name: str, build: Callable[[], Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        Arrays of a derived structure, shared through the feature store when there is one.
+
+        Attaches to the published copy if another process already built it;
+        otherwise builds it, publishes it and attaches to the published copy.
+        """
+        if self.store_path is None:
+            return build()
+
+        path = os.path.join(self.store_path, name)
+        if not os.path.isdir(path):
+            arrays = build()
+            try:
+                write_array_dir(path, arrays, {'version': FEATURE_STORE_VERSION}, replace=False)
+            except OSError as e:
+                print(f"[ReferenceFeatures] Could not publish {name}: {e}")
+                return arrays
+        return read_array_dir(path)[1]
+
+    @staticmethod
+    def _estimate_fps(timestamps) -> float:
+        """Frame rate from the median timestamp step (15 FPS if unknown)."""
+        if len(timestamps) >= 2:
+            step = float(np.median(np.diff(timestamps)))
+            if step > 0:
+                return 1.0 / step
+        return 15.0
+
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        """Scale every row to unit length (rows with zero length stay zero)."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        return matrix * inverse
+
+    @staticmethod
+    def _frozen(array: np.ndarray) -> np.ndarray:
+        """Contiguous read-only array."""
+        array = np.ascontiguousarray(array)
+        array.flags.writeable = False
+        return array
@@ -0,0 +1,244 @@
+"""
+Approximate nearest-neighbour index over reference poses.
+
+A random-projection forest built once over the unit-length reference pose
+vectors. For unit vectors the nearest neighbour in Euclidean distance is the
+pose with the highest cosine similarity, so the index returns candidates for
+the same score PoseComparisonService computes exhaustively.
+
+The forest is stored as flat numpy arrays (no Python node objects), so it can
+be cached and shared alongside the reference matrix.
+"""
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class RandomProjectionForest:
+    """
+    Forest of random-projection trees for top-k cosine search.
+
+    Each tree splits its points in half along a random direction until a node
+    holds at most `leaf_size` points. A query descends all trees at once,
+    keeping the `search_k / leaf_size` most promising branches, then ranks the
+    points in the leaves it reaches exactly.
+    """
+
+    def __init__(self, num_trees: int = 10, leaf_size: int = 32, seed: int = 0):
+        """
+        Initialize an empty forest.
+
+        Args:
+            num_trees: Number of trees (more trees = higher recall, slower queries)
+            leaf_size: Maximum number of points in a leaf
+            seed: Random seed for the split directions
+        """
+        self.num_trees = max(1, int(num_trees))
+        self.leaf_size = max(1, int(leaf_size))
+        self.seed = seed
+
+        self.data: Optional[np.ndarray] = None
+        self.directions = np.zeros((0, 0), dtype=np.float32)
+        self.thresholds = np.zeros(0)
+        self.children = np.zeros((0, 2), dtype=np.int32)
+        self.leaf_ranges = np.zeros((0, 2), dtype=np.int32)
+        self.leaf_items = np.zeros(0, dtype=np.int32)
+        self.roots = np.zeros(0, dtype=np.int32)
+
+    @property
+    def num_nodes(self) -> int:
+        """Total number of nodes across all trees."""
+        return len(self.thresholds)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the tree arrays (the indexed data is not copied and not counted)."""
+        return sum(array.nbytes for array in (
+            self.directions, self.thresholds, self.children,
+            self.leaf_ranges, self.leaf_items, self.roots
+        ))
+
+    @property
+    def tree_arrays(self) -> Dict[str, np.ndarray]:
+        """The flat arrays describing the trees (for saving the index)."""
+        return {
+            'directions': self.directions,
+            'thresholds': self.thresholds,
+            'children': self.children,
+            'leaf_ranges': self.leaf_ranges,
+            'leaf_items': self.leaf_items,
+            'roots': self.roots,
+        }
+
+    @classmethod
+    def from_tree_arrays(cls, tree_arrays: Dict[str, np.ndarray], data: np.ndarray,
+                         num_trees: int, leaf_size: int, seed: int = 0) -> 'RandomProjectionForest':
+        """
+        Rebuild a forest from saved tree arrays without re-splitting the data.
+
+        Args:
+            tree_arrays: Arrays from tree_arrays (may be read-only memory maps)
+            data: The (N, D) unit-length matrix the forest was built over
+            num_trees, leaf_size, seed: Settings the forest was built with
+        """
+        forest = cls(num_trees, leaf_size, seed)
+        forest.data = data
+        for name, array in tree_arrays.items():
+            setattr(forest, name, array)
+        return forest
+
+    def build(self, data: np.ndarray) -> 'RandomProjectionForest':
+        """
+        Build the forest over the rows of `data` (kept by reference, not copied).
+
+        Args:
+            data: (N, D) matrix of unit-length vectors
+
+        Returns:
+            self
+        """
+        rng = np.random.default_rng(self.seed)
+        directions: List[np.ndarray] = []
+        thresholds: List[float] = []
+        children: List[List[int]] = []
+        leaf_ranges: List[List[int]] = []
+        leaf_items: List[np.ndarray] = []
+        item_count = 0
+        roots = []
+
+        def add_node(items: np.ndarray) -> int:
+            nonlocal item_count
+            node = len(thresholds)
+            directions.append(np.zeros(data.shape[1], dtype=np.float32))
+            thresholds.append(0.0)
+            children.append([-1, -1])
+            leaf_ranges.append([0, 0])
+
+            if len(items) > self.leaf_size:
+                direction = rng.normal(size=data.shape[1]).astype(np.float32)
+                projections = data[items] @ direction
+                order = np.argsort(projections, kind='stable')
+                half = len(items) // 2
+                if projections[order[half - 1]] < projections[order[half]]:
+                    directions[node] = direction
+                    thresholds[node] = 0.5 * (projections[order[half - 1]] + projections[order[half]])
+                    left = add_node(items[order[:half]])
+                    right = add_node(items[order[half:]])
+                    children[node] = [left, right]
+                    return node
+
+            # Leaf (also used when every point projects to the same value)
+            leaf_ranges[node] = [item_count, item_count + len(items)]
+            leaf_items.append(items)
+            item_count += len(items)
+            return node
+
+        all_items = np.arange(len(data), dtype=np.int32)
+        if len(data) > 0:
+            for _ in range(self.num_trees):
+                roots.append(add_node(all_items))
+
+        self.data = data
+        self.directions = (np.ascontiguousarray(np.vstack(directions)) if directions
+                           else np.zeros((0, data.shape[1]), dtype=np.float32))
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.children = np.asarray(children, dtype=np.int32).reshape(-1, 2)
+        self.leaf_ranges = np.asarray(leaf_ranges, dtype=np.int32).reshape(-1, 2)
+        self.leaf_items = np.concatenate(leaf_items).astype(np.int32) if leaf_items else np.zeros(0, dtype=np.int32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        return self
+
+    def candidates(self, vector: np.ndarray, search_k: int) -> np.ndarray:
+        """
+        Gather about `search_k` candidate indices (fewer if the forest is smaller).
+
+        All trees are descended together as one beam. A node's priority is the
+        smallest split margin on its path, so the beam keeps the leaves the query
+        is least likely to have been separated from.
+
+        Args:
+            vector: Unit-length query vector
+            search_k: Number of candidates to gather (with duplicates across trees)
+
+        Returns:
+            Unique candidate row indices
+        """
+        if len(self.roots) == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        beam_width = max(len(self.roots), int(np.ceil(search_k / self.leaf_size)))
+        nodes = self.roots
+        priorities = np.full(len(nodes), np.inf)
+
+        while True:
+            internal = self.children[nodes, 0] >= 0
+            if not internal.any():
+                break
+
+            split_nodes = nodes[internal]
+            margins = self.directions[split_nodes] @ vector - self.thresholds[split_nodes]
+            split_priorities = priorities[internal]
+            nodes = np.concatenate([
+                nodes[~internal],
+                self.children[split_nodes, 1],
+                self.children[split_nodes, 0],
+            ])
+            priorities = np.concatenate([
+                priorities[~internal],
+                np.minimum(split_priorities, margins),
+                np.minimum(split_priorities, -margins),
+            ])
+
+            if len(nodes) > beam_width:
+                keep = np.argpartition(-priorities, beam_width - 1)[:beam_width]
+                nodes, priorities = nodes[keep], priorities[keep]
+
+        ranges = self.leaf_ranges[nodes]
+        return np.unique(np.concatenate([self.leaf_items[start:end] for start, end in ranges]))
+
+    def query(self, vector: np.ndarray, k: int, search_k: Optional[int] = None) -> np.ndarray:
+        """
+        Approximate top-k rows by inner product with `vector`.
+
+        Args:
+            vector: Unit-length query vector
+            k: Number of results
+            search_k: Candidates to gather before exact ranking
+                (defaults to k * num_trees)
+
+        Returns:
+            Up to k row indices, best first
+        """
+        if search_k is None:
+            search_k = k * self.num_trees
+        candidates = self.candidates(vector, max(k, search_k))
+        if len(candidates) == 0:
+            return candidates
+
+        scores = self.data[candidates] @ vector
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        return candidates[np.argsort(-scores, kind='stable')]
+
+    def measure_recall(self, queries: np.ndarray, k: int, search_k: Optional[int] = None) -> float:
+        """
+        Recall@k of the index against exhaustive search.
+
+        Args:
+            queries: (Q, D) matrix of unit-length query vectors
+            k: Number of neighbours compared
+            search_k: Candidates gathered per query (see query)
+
+        Returns:
+            Average fraction of the exact top-k found by the index (0-1)
+        """
+        if len(queries) == 0 or self.data is None or len(self.data) == 0:
+            return 1.0
+
+        k = min(k, len(self.data))
+        exact = np.argsort(-(queries @ self.data.T), axis=1, kind='stable')[:, :k]
+        hits = [
+            len(np.intersect1d(self.query(query, k, search_k), expected))
+            for query, expected in zip(queries, exact)
+        ]
+        return float(np.sum(hits) / (len(queries) * k))
@@ -0,0 +1,128 @@
+"""
+Fixed-capacity numpy ring buffers for per-session history.
+
+Every field is preallocated once with room for two copies of the ring. Each
+append writes a row to both copies, so the newest n rows are always one
+contiguous slice and can be handed out as a view without copying.
+"""
+from typing import Any, Dict, Tuple
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Ring buffer of fixed-shape records stored column-wise.
+
+    Example:
+        history = RingBuffer(10, {'landmarks': ((69,), np.float32),
+                                  'timestamp': ((), np.float64)})
+        history.append(landmarks=vector, timestamp=1.5)
+        recent = history.last('landmarks', 5)  # (5, 69) view, oldest first
+    """
+
+    def __init__(self, capacity: int, fields: Dict[str, Tuple[Tuple[int, ...], Any]]):
+        """
+        Allocate the buffer.
+
+        Args:
+            capacity: Maximum number of records kept
+            fields: Mapping of field name to (per-record shape, dtype)
+        """
+        self.fields = dict(fields)
+        self._capacity = 0
+        self._size = 0
+        self._next = 0
+        self._data: Dict[str, np.ndarray] = {}
+        self._allocate(max(1, int(capacity)))
+
+    def _allocate(self, capacity: int):
+        """Allocate empty storage for `capacity` records."""
+        self._capacity = capacity
+        self._size = 0
+        self._next = 0
+        self._data = {
+            name: np.zeros((2 * capacity,) + tuple(shape), dtype=dtype)
+            for name, (shape, dtype) in self.fields.items()
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of records kept."""
+        return self._capacity
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffer's storage (independent of how full it is)."""
+        return sum(array.nbytes for array in self._data.values())
+
+    def append(self, **values):
+        """
+        Append one record, overwriting the oldest when full.
+
+        Fields that are not given are zero-filled.
+        """
+        slot = self._next
+        for name, array in self._data.items():
+            value = values.get(name, 0)
+            array[slot] = value
+            array[slot + self._capacity] = value
+        self._next = (slot + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def last(self, name: str, n: int = None) -> np.ndarray:
+        """
+        View of the newest n values of a field, oldest first.
+
+        Args:
+            name: Field name
+            n: Number of records (defaults to all stored records)
+
+        Returns:
+            Read-only view into the buffer; valid until the next append
+        """
+        n = self._size if n is None else max(0, min(int(n), self._size))
+        end = self._next + self._capacity
+        view = self._data[name][end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, name: str):
+        """Newest value of a field."""
+        if self._size == 0:
+            raise IndexError("latest() on an empty RingBuffer")
+        return self._data[name][self._next + self._capacity - 1]
+
+    def set_latest(self, name: str, value):
+        """Overwrite a field of the newest record."""
+        if self._size == 0:
+            raise IndexError("set_latest() on an empty RingBuffer")
+        slot = (self._next - 1) % self._capacity
+        self._data[name][slot] = value
+        self._data[name][slot + self._capacity] = value
+
+    def resize(self, capacity: int):
+        """
+        Change the capacity, keeping the newest records that still fit.
+
+        Storage is only reallocated when the capacity actually changes.
+        """
+        capacity = max(1, int(capacity))
+        if capacity == self._capacity:
+            return
+
+        keep = min(self._size, capacity)
+        kept = {name: self.last(name, keep).copy() for name in self._data}
+        self._allocate(capacity)
+        for name, values in kept.items():
+            self._data[name][:keep] = values
+            self._data[name][capacity:capacity + keep] = values
+        self._size = keep
+        self._next = keep % capacity
+
+    def clear(self):
+        """Forget all records without releasing the storage."""
+        self._size = 0
+        self._next = 0
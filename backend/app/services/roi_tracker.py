@@ -0,0 +1,364 @@
+"""
+ROI Tracker
+
+Crops each webcam frame to the dancer before pose inference. The previous
+frame's landmarks give a padded, square box around the dancer; only that crop
+(downscaled to a fixed size) goes to MediaPipe, and the landmarks are mapped
+back to full-frame normalized coordinates. Hands are detected on small crops
+around the wrists placed from the same landmarks, on every hand_interval-th
+frame only; in between, the last hand landmarks are carried along by the
+motion of the pose wrists. No hand inference runs while both wrists are below
+the visibility threshold.
+
+Inference cost then depends on the crop size instead of the camera resolution.
+When tracking is lost (no pose in the crop, too few visible landmarks, or the
+dancer reaching the crop border) the frame is re-run at full size and the next
+box is taken from that result.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.data.config import settings
+from .pose_detector_pool import PoseDetection, PoseDetectorPool
+from .quality_controller import QualityLevel
+
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+HAND_SIDES = (('left', LEFT_WRIST, LEFT_ELBOW), ('right', RIGHT_WRIST, RIGHT_ELBOW))
+WRISTS = {side: wrist for side, wrist, _ in HAND_SIDES}
+
+MIN_TRACKED_LANDMARKS = 8  # Visible landmarks needed to keep tracking
+BORDER_MARGIN = 0.02  # Landmarks this close to a crop edge mean the dancer is leaving the crop
+MIN_HAND_CROP = 32  # Pixels
+
+
+@dataclass
+class CropRegion:
+    """Pixel rectangle of a frame that is sent to inference."""
+    x: int
+    y: int
+    width: int
+    height: int
+    frame_width: int
+    frame_height: int
+
+    @classmethod
+    def full(cls, frame_shape: Tuple[int, ...]) -> 'CropRegion':
+        height, width = frame_shape[:2]
+        return cls(0, 0, width, height, width, height)
+
+    @classmethod
+    def around(cls, center_x: float, center_y: float, side: float,
+               frame_shape: Tuple[int, ...]) -> 'CropRegion':
+        """Square of the given side (pixels) around a point, clipped to the frame."""
+        height, width = frame_shape[:2]
+        x0 = int(max(0, np.floor(center_x - side / 2)))
+        y0 = int(max(0, np.floor(center_y - side / 2)))
+        x1 = int(min(width, np.ceil(center_x + side / 2)))
+        y1 = int(min(height, np.ceil(center_y + side / 2)))
+        return cls(x0, y0, max(1, x1 - x0), max(1, y1 - y0), width, height)
+
+    @property
+    def is_full_frame(self) -> bool:
+        return self.width == self.frame_width and self.height == self.frame_height
+
+    def crop(self, frame: np.ndarray, max_side: Optional[int] = None) -> np.ndarray:
+        """Pixels of the region, downscaled so the longest side is at most max_side."""
+        image = frame[self.y:self.y + self.height, self.x:self.x + self.width]
+        longest = max(self.width, self.height)
+        if max_side and longest > max_side:
+            scale = max_side / longest
+            size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image
+
+    def to_frame(self, landmarks: np.ndarray) -> np.ndarray:
+        """Map (N, 3+) landmarks normalized to the crop into full-frame normalized coordinates."""
+        mapped = np.array(landmarks, dtype=np.float32)
+        mapped[:, 0] = (self.x + mapped[:, 0] * self.width) / self.frame_width
+        mapped[:, 1] = (self.y + mapped[:, 1] * self.height) / self.frame_height
+        # MediaPipe z uses the same scale as x
+        mapped[:, 2] *= self.width / self.frame_width
+        return mapped
+
+
+class RoiTracker:
+    """
+    Per-session crop tracker.
+
+    Usage:
+        detection = await tracker.detect(pose_detector_pool, rgb_frame, session_id)
+    """
+
+    def __init__(self, enabled: bool = settings.roi_tracking_enabled,
+                 crop_size: int = settings.roi_crop_size,
+                 padding: float = settings.roi_padding,
+                 hand_crop_size: int = settings.roi_hand_crop_size,
+                 hand_interval: int = settings.hand_detection_interval,
+                 min_visibility: float = 0.5):
+        """
+        Initialize the tracker.
+
+        Args:
+            enabled: Crop frames (False sends every frame whole, with hands in the same call
+                on hand_interval frames)
+            crop_size: Longest side of the pose crop sent to inference
+            padding: Margin added around the dancer's box on each side, as a fraction of its size
+            hand_crop_size: Longest side of each wrist crop sent to inference
+            hand_interval: Run hand inference every n-th frame (1 = every frame)
+            min_visibility: Landmark visibility counted as visible
+        """
+        self.enabled = enabled
+        self.crop_size = crop_size
+        self.padding = padding
+        self.hand_crop_size = hand_crop_size
+        self.hand_interval = max(1, hand_interval)
+        self.min_visibility = min_visibility
+
+        # Box of the dancer in normalized frame coordinates (x0, y0, x1, y1); None = not tracking
+        self.box: Optional[Tuple[float, float, float, float]] = None
+
+        # Last inferred hands per side: (landmarks in full-frame coordinates, classification, wrist x/y)
+        self.hands: Dict[str, Tuple[np.ndarray, Dict[str, Any], np.ndarray]] = {}
+        self._frames_since_hands: Optional[int] = None  # None = hands never inferred
+
+        self.frames = 0
+        self.tracking_lost = 0
+        self.pixels_inferred = 0
+        self.frame_pixels = 0
+        self.hand_inferences = 0
+        self.hands_reused = 0
+
+    @property
+    def tracking(self) -> bool:
+        return self.box is not None
+
+    def reset(self):
+        """Forget the dancer's position (next frame is inferred at full size)."""
+        self.box = None
+
+    def pose_region(self, frame_shape: Tuple[int, ...]) -> CropRegion:
+        """Region to run pose inference on: padded square around the dancer, or the full frame."""
+        if self.box is None:
+            return CropRegion.full(frame_shape)
+
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = self.box
+        box_width, box_height = (x1 - x0) * width, (y1 - y0) * height
+        side = max(box_width, box_height) * (1 + 2 * self.padding)
+        return CropRegion.around((x0 + x1) / 2 * width, (y0 + y1) / 2 * height, side, frame_shape)
+
+    def update(self, pose_landmarks: Optional[np.ndarray], region: CropRegion):
+        """
+        Take the next box from this frame's full-frame landmarks.
+
+        Args:
+            pose_landmarks: (33, 4) landmarks in full-frame coordinates, None if no pose
+            region: Region the landmarks were inferred on
+        """
+        if pose_landmarks is None:
+            self.reset()
+            return
+
+        visible = pose_landmarks[pose_landmarks[:, 3] >= self.min_visibility]
+        if len(visible) < MIN_TRACKED_LANDMARKS:
+            self.reset()
+            return
+
+        if not region.is_full_frame and self._near_crop_border(visible, region):
+            # Part of the dancer may be outside the crop; look at the whole frame next time
+            self.reset()
+            return
+
+        x0, y0 = np.clip(visible[:, :2].min(axis=0), 0.0, 1.0)
+        x1, y1 = np.clip(visible[:, :2].max(axis=0), 0.0, 1.0)
+        self.box = (float(x0), float(y0), float(x1), float(y1))
+
+    def hand_regions(self, pose_landmarks: np.ndarray,
+                     frame_shape: Tuple[int, ...]) -> List[Tuple[str, CropRegion]]:
+        """
+        Crops around each visible wrist, extended along the forearm towards the hand.
+
+        Args:
+            pose_landmarks: (33, 4) landmarks in full-frame coordinates
+            frame_shape: Shape of the full frame
+
+        Returns:
+            (side, region) for every wrist above the visibility threshold
+        """
+        height, width = frame_shape[:2]
+        regions = []
+        for side, wrist, elbow in HAND_SIDES:
+            if pose_landmarks[wrist, 3] < self.min_visibility:
+                continue
+            wrist_px = pose_landmarks[wrist, :2] * (width, height)
+            elbow_px = pose_landmarks[elbow, :2] * (width, height)
+            forearm = wrist_px - elbow_px
+            center = wrist_px + 0.4 * forearm
+            crop_side = max(2.0 * float(np.linalg.norm(forearm)), MIN_HAND_CROP)
+            regions.append((side, CropRegion.around(center[0], center[1], crop_side, frame_shape)))
+        return regions
+
+    async def detect(self, pool: PoseDetectorPool, rgb_frame: np.ndarray, stream_id: Optional[str] = None,
+                     detect_hands: bool = True, level: Optional[QualityLevel] = None) -> PoseDetection:
+        """
+        Detect pose (and hands) in a full frame, inferring only the dancer's region.
+
+        Args:
+            pool: Detector pool running the inference
+            rgb_frame: (H, W, 3) full RGB frame
+            stream_id: Session the frame belongs to (hand crops use "<stream_id>:hand_<side>")
+            detect_hands: Also detect hands around the wrists
+            level: Quality level (model complexity, crop and full-frame size);
+                None uses crop_size, full frames as decoded and the pool's complexity
+
+        Returns:
+            PoseDetection with landmarks in full-frame normalized coordinates
+        """
+        self.frames += 1
+        self.frame_pixels += rgb_frame.shape[0] * rgb_frame.shape[1]
+
+        crop_size = level.crop_size if level else self.crop_size
+        frame_size = level.frame_size if level else None
+        model_complexity = level.model_complexity if level else None
+        full_frame = CropRegion.full(rgb_frame.shape)
+
+        if not self.enabled:
+            hands_due = detect_hands and self._hands_due()
+            detection = await self._detect_region(pool, rgb_frame, full_frame, frame_size, stream_id,
+                                                  model_complexity, detect_hands=hands_due)
+            if hands_due:
+                self.hand_inferences += 1
+                self._frames_since_hands = 0
+                self._cache_frame_hands(detection)
+                return detection
+            if detect_hands and detection.pose_landmarks is not None:
+                self._reuse_hands(detection.pose_landmarks)
+            else:
+                self.hands.clear()
+            return PoseDetection(detection.pose_landmarks,
+                                 [landmarks for landmarks, _, _ in self.hands.values()],
+                                 [classification for _, classification, _ in self.hands.values()],
+                                 detection.inference_time, detection.worker_id, detection.warmup)
+
+        region = self.pose_region(rgb_frame.shape)
+        max_side = frame_size if region.is_full_frame else crop_size
+        detection = await self._detect_region(pool, rgb_frame, region, max_side, stream_id, model_complexity)
+        if detection.pose_landmarks is None and not region.is_full_frame:
+            self.tracking_lost += 1
+            region = full_frame
+            detection = await self._detect_region(pool, rgb_frame, region, frame_size, stream_id, model_complexity)
+
+        pose_landmarks = None
+        if detection.pose_landmarks is not None:
+            pose_landmarks = region.to_frame(detection.pose_landmarks)
+        self.update(pose_landmarks, region)
+
+        inference_time = detection.inference_time
+        warmup = detection.warmup
+        if detect_hands and pose_landmarks is not None:
+            hand_regions = self.hand_regions(pose_landmarks, rgb_frame.shape)
+            if hand_regions and self._hands_due():
+                hand_detections = await asyncio.gather(*[
+                    self._detect_region(pool, rgb_frame, hand_region, self.hand_crop_size,
+                                        f"{stream_id}:hand_{side}" if stream_id else None,
+                                        model_complexity, detect_pose=False, detect_hands=True)
+                    for side, hand_region in hand_regions
+                ])
+                self.hand_inferences += 1
+                self._frames_since_hands = 0
+                self.hands.clear()
+                for (side, hand_region), hand_detection in zip(hand_regions, hand_detections):
+                    inference_time += hand_detection.inference_time
+                    warmup = warmup or hand_detection.warmup
+                    if hand_detection.hand_landmarks:
+                        self.hands[side] = (
+                            hand_region.to_frame(hand_detection.hand_landmarks[0]),
+                            hand_detection.hand_classifications[0],
+                            pose_landmarks[WRISTS[side], :2].copy()
+                        )
+            else:
+                self._reuse_hands(pose_landmarks)
+        else:
+            self.hands.clear()
+
+        hand_landmarks = [landmarks for landmarks, _, _ in self.hands.values()]
+        hand_classifications = [classification for _, classification, _ in self.hands.values()]
+        return PoseDetection(pose_landmarks, hand_landmarks, hand_classifications,
+                             inference_time, detection.worker_id, warmup)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Tracking statistics."""
+        return {
+            'tracking': self.tracking,
+            'frames': self.frames,
+            'tracking_lost': self.tracking_lost,
+            'inferred_pixel_ratio': self.pixels_inferred / self.frame_pixels if self.frame_pixels else 0.0,
+            'hand_inferences': self.hand_inferences,
+            'hands_reused': self.hands_reused
+        }
+
+    def _hands_due(self) -> bool:
+        """Whether this frame runs hand inference (every hand_interval-th frame)."""
+        return self._frames_since_hands is None or self._frames_since_hands + 1 >= self.hand_interval
+
+    def _reuse_hands(self, pose_landmarks: np.ndarray):
+        """Keep the cached hands for a frame between hand inferences."""
+        self._frames_since_hands = (self._frames_since_hands or 0) + 1
+        if self.hands:
+            self.hands_reused += 1
+        self._follow_wrists(pose_landmarks)
+
+    def _cache_frame_hands(self, detection: PoseDetection):
+        """Cache hands detected on a whole frame under the side of the nearest visible pose wrist."""
+        self.hands.clear()
+        if detection.pose_landmarks is None:
+            return
+        sides = [side for side, wrist in WRISTS.items()
+                 if detection.pose_landmarks[wrist, 3] >= self.min_visibility]
+        if not sides:
+            return
+        for landmarks, classification in zip(detection.hand_landmarks, detection.hand_classifications):
+            side = min(sides, key=lambda side: np.linalg.norm(
+                detection.pose_landmarks[WRISTS[side], :2] - landmarks[0, :2]))
+            self.hands[side] = (landmarks, classification, detection.pose_landmarks[WRISTS[side], :2].copy())
+
+    def _follow_wrists(self, pose_landmarks: np.ndarray):
+        """Shift the cached hands by their pose wrist's motion; drop hands whose wrist is no longer visible."""
+        for side, (landmarks, classification, wrist) in list(self.hands.items()):
+            if pose_landmarks[WRISTS[side], 3] < self.min_visibility:
+                del self.hands[side]
+                continue
+            current = pose_landmarks[WRISTS[side], :2].copy()
+            moved = landmarks.copy()
+            moved[:, :2] += current - wrist
+            self.hands[side] = (moved, classification, current)
+
+    async def _detect_region(self, pool: PoseDetectorPool, rgb_frame: np.ndarray, region: CropRegion,
+                             max_side: Optional[int], stream_id: Optional[str],
+                             model_complexity: Optional[int] = None, detect_pose: bool = True,
+                             detect_hands: bool = False) -> PoseDetection:
+        """Run inference on one region of the frame."""
+        image = region.crop(rgb_frame, max_side)
+        self.pixels_inferred += image.shape[0] * image.shape[1]
+        return await pool.detect_async(image, stream_id=stream_id, detect_hands=detect_hands,
+                                       detect_pose=detect_pose, model_complexity=model_complexity)
+
+    def _near_crop_border(self, visible: np.ndarray, region: CropRegion) -> bool:
+        """Whether visible landmarks touch a crop edge that is not also a frame edge."""
+        x = visible[:, 0] * region.frame_width
+        y = visible[:, 1] * region.frame_height
+        margin_x = BORDER_MARGIN * region.width
+        margin_y = BORDER_MARGIN * region.height
+        return bool(
+            (region.x > 0 and np.any(x < region.x + margin_x))
+            or (region.y > 0 and np.any(y < region.y + margin_y))
+            or (region.x + region.width < region.frame_width
+                and np.any(x > region.x + region.width - margin_x))
+            or (region.y + region.height < region.frame_height
+                and np.any(y > region.y + region.height - margin_y))
+        )
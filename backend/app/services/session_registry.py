@@ -0,0 +1,236 @@
+"""
+Session Registry
+
+Keeps every active dance session keyed by session ID. Each session has its own
+comparison state, scoring state and feedback history, while all sessions share
+one read-only copy of the loaded reference (ReferenceFeatures).
+
+Sessions idle for longer than max_session_duration are evicted.
+
+A new reference or config is staged on each session and applied before its
+next frame is compared, so it never changes a comparison service while a frame
+is being processed on the snapshot executor.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from .frame_change_gate import FrameChangeGate
+from .live_feedback_service import LiveFeedbackService
+from .pose_comparison_config import PoseComparisonConfig, DEFAULT_CONFIG
+from .pose_comparison_service import PoseComparisonService
+from .reference_features import ReferenceFeatures
+from .roi_tracker import RoiTracker
+from .scoring import ScoringService
+
+MAX_SEQUENCE_LENGTH = 100  # Keep last 100 poses per session
+
+
+@dataclass
+class DanceSession:
+    """State of one dancer's session."""
+    session_id: str
+    start_time: float
+    live_feedback_service: LiveFeedbackService
+    scoring_service: ScoringService = field(default_factory=ScoringService)
+    comparison_service: Optional[PoseComparisonService] = None
+    reference_video: Optional[str] = None
+    last_active: float = field(default_factory=time.time)
+    pose_data: List[Dict[str, Any]] = field(default_factory=list)
+    feedback_history: List[Dict[str, Any]] = field(default_factory=list)
+    pose_sequence: Deque[np.ndarray] = field(default_factory=lambda: deque(maxlen=MAX_SEQUENCE_LENGTH))
+    roi_tracker: RoiTracker = field(default_factory=RoiTracker)
+    frame_gate: FrameChangeGate = field(default_factory=FrameChangeGate)
+    frame_lock: asyncio.Lock = field(default_factory=asyncio.Lock)  # One frame in flight per session
+
+    # Reference/config changes waiting for the next frame (see stage_changes)
+    _pending_service: Optional[PoseComparisonService] = field(default=None, init=False, repr=False)
+    _pending_config: Optional[PoseComparisonConfig] = field(default=None, init=False, repr=False)
+    _pending_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the session started."""
+        return time.time() - self.start_time
+
+    @property
+    def has_reference(self) -> bool:
+        """Whether frames can be compared (a comparison service is active or staged)."""
+        return self.comparison_service is not None or self._pending_service is not None
+
+    def stage_changes(self, comparison_service: Optional[PoseComparisonService] = None,
+                      config: Optional[PoseComparisonConfig] = None):
+        """Stage a new comparison service and/or config for the next frame."""
+        with self._pending_lock:
+            if comparison_service is not None:
+                self._pending_service = comparison_service
+                self._pending_config = None  # Built with the current config
+            if config is not None:
+                self._pending_config = config
+
+    def apply_pending_changes(self) -> Optional[PoseComparisonService]:
+        """Apply staged changes (only between frames) and return the active comparison service."""
+        with self._pending_lock:
+            service, config = self._pending_service, self._pending_config
+            self._pending_service = self._pending_config = None
+        if service is not None:
+            self.comparison_service = service
+        if config is not None and self.comparison_service is not None:
+            self.comparison_service.update_config(config)
+        return self.comparison_service
+
+    def compare_pose(self, pose_landmarks: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Compare one frame against the reference, applying staged changes first."""
+        service = self.apply_pending_changes()
+        if service is None:
+            return None
+        return service.update_user_pose(pose_landmarks)
+
+
+class SessionRegistry:
+    """
+    Registry of active sessions sharing one reference.
+
+    Usage:
+    1. set_reference() when a reference video is loaded
+    2. create_session() per dancer; pass the session ID on every request
+    3. get_session() to look a session up (also marks it active)
+    4. end_session() when the dancer finishes
+    """
+
+    def __init__(self, max_session_duration: float = 3600,
+                 config: PoseComparisonConfig = DEFAULT_CONFIG,
+                 feedback_client: Any = None, feedback_async_client: Any = None):
+        """
+        Initialize the registry.
+
+        Args:
+            max_session_duration: Seconds a session may stay idle before eviction
+            config: Pose comparison config for new sessions
+            feedback_client: OpenAI client shared by every session's LiveFeedbackService
+            feedback_async_client: AsyncOpenAI client shared the same way
+        """
+        self.max_session_duration = max_session_duration
+        self.config = config
+        self.feedback_client = feedback_client
+        self.feedback_async_client = feedback_async_client
+
+        self.reference_video: Optional[str] = None
+        self.reference_poses: Optional[List[Dict[str, Any]]] = None
+        self.reference_features: Optional[ReferenceFeatures] = None
+
+        self.sessions: Dict[str, DanceSession] = {}
+        self.sessions_evicted = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def reference_loaded(self) -> bool:
+        """Whether a reference video has been loaded."""
+        return self.reference_features is not None
+
+    def set_reference(self, video_name: str, reference_poses: List[Dict[str, Any]],
+                      reference_features: Optional[ReferenceFeatures] = None):
+        """
+        Load a reference for every current and future session.
+
+        Active sessions keep their scores and feedback history but restart pose
+        comparison against the new reference from their next frame.
+
+        Args:
+            video_name: Reference video name
+            reference_poses: Reference frames with landmarks and timestamps
+            reference_features: Precomputed features (built from the poses if not given)
+        """
+        if reference_features is None:
+            reference_features = ReferenceFeatures.from_poses(reference_poses)
+
+        with self._lock:
+            self.reference_video = video_name
+            self.reference_poses = reference_poses
+            self.reference_features = reference_features
+            for session in self.sessions.values():
+                session.stage_changes(comparison_service=self.create_comparison_service())
+                session.reference_video = video_name
+
+    def update_config(self, config: PoseComparisonConfig):
+        """Apply a new pose comparison config to every session (from its next frame)."""
+        with self._lock:
+            self.config = config
+            for session in self.sessions.values():
+                session.stage_changes(config=config)
+
+    def create_comparison_service(self) -> Optional[PoseComparisonService]:
+        """New comparison service on the shared reference (None if no reference is loaded)."""
+        if self.reference_features is None:
+            return None
+        return PoseComparisonService(self.reference_poses, self.config, self.reference_features)
+
+    def create_session(self) -> DanceSession:
+        """Start a new session on the current reference."""
+        with self._lock:
+            self.evict_idle()
+            session = DanceSession(
+                session_id=f"session_{uuid.uuid4().hex}",
+                start_time=time.time(),
+                live_feedback_service=LiveFeedbackService(client=self.feedback_client,
+                                                          async_client=self.feedback_async_client),
+                comparison_service=self.create_comparison_service(),
+                reference_video=self.reference_video
+            )
+            self.sessions[session.session_id] = session
+            return session
+
+    def get_session(self, session_id: str) -> Optional[DanceSession]:
+        """Look up an active session and mark it as active."""
+        with self._lock:
+            self.evict_idle()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_active = time.time()
+            return session
+
+    def end_session(self, session_id: str) -> Optional[DanceSession]:
+        """Remove a session from the registry and return it."""
+        with self._lock:
+            return self.sessions.pop(session_id, None)
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Drop sessions idle for longer than max_session_duration.
+
+        Returns:
+            IDs of the evicted sessions
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                session_id for session_id, session in self.sessions.items()
+                if now - session.last_active > self.max_session_duration
+            ]
+            for session_id in expired:
+                del self.sessions[session_id]
+            self.sessions_evicted += len(expired)
+
+        for session_id in expired:
+            print(f"[Sessions] Evicted idle session {session_id}")
+        return expired
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Registry statistics for health checks."""
+        return {
+            'active_sessions': len(self.sessions),
+            'sessions_evicted': self.sessions_evicted,
+            'frames_skipped': sum(session.frame_gate.frames_skipped for session in self.sessions.values()),
+            'reference_video': self.reference_video,
+            'reference_frames': len(self.reference_features) if self.reference_features is not None else 0,
+            'shared_reference_bytes': self.reference_features.nbytes if self.reference_features is not None else 0
+        }
@@ -0,0 +1,79 @@
+"""
+Shared Reference Pointer
+
+Which reference every uvicorn worker process should serve. Loading a reference
+in any worker publishes its name to a small JSON file; the other workers notice
+the change with one stat() per request and attach to the same memory-mapped
+feature store (see ReferenceFeatures.shared), so a single load step makes the
+reference visible everywhere without another copy in memory.
+"""
+import json
+import os
+import tempfile
+import time
+from typing import Optional, Tuple
+
+
+class ReferencePointer:
+    """
+    Cross-process pointer to the current reference video.
+
+    Usage:
+        pointer.publish("magnetic")   # after loading in this worker
+        name = pointer.poll()         # in every worker, before serving a request
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the pointer.
+
+        Args:
+            path: JSON file shared by all worker processes
+        """
+        self.path = path
+        self._seen: Optional[Tuple[int, int]] = None
+
+    def publish(self, video_name: str):
+        """Make video_name the reference every worker serves."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, staging = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({'video_name': video_name, 'published_at': time.time(), 'pid': os.getpid()}, f)
+            os.replace(staging, self.path)
+        except Exception:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+        # This worker already has it loaded
+        self._seen = self._identity()
+
+    def poll(self) -> Optional[str]:
+        """
+        Name of the published reference if it changed since the last poll or publish.
+
+        Returns:
+            Video name to load, or None if nothing new was published
+        """
+        identity = self._identity()
+        if identity is None or identity == self._seen:
+            return None
+        self._seen = identity
+
+        try:
+            with open(self.path) as f:
+                return json.load(f).get('video_name')
+        except (OSError, ValueError) as e:
+            print(f"[SharedReference] Could not read {self.path}: {e}")
+            return None
+
+    def _identity(self) -> Optional[Tuple[int, int]]:
+        """(mtime, inode) of the pointer file, None if it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
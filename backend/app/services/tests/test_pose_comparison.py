@@ -368,6 +368,260 @@ class PoseComparisonTester:
         except Exception as e:
             self.log_test("DTW in PoseComparisonService", False, f"Exception: {e}")
     
+    def test_vectorized_reference_matching(self):
+        """Test the vectorized whole-reference matching kernel."""
+        print("\n🧪 Testing Vectorized Reference Matching")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(50)
+            service = PoseComparisonService(mock_reference_data)
+            
+            # Test 1: Reference is stored once as a contiguous (N, 69) matrix
+            self.log_test(
+                "Reference Matrix Layout",
+                service.reference_landmarks.shape == (50, 69) and
+                service.reference_landmarks.flags['C_CONTIGUOUS'],
+                f"Shape: {service.reference_landmarks.shape}"
+            )
+            
+            # Test 2: Kernel scores match the pairwise similarity on raw reference poses
+            user_landmarks = np.random.rand(33, 4)
+            kernel_scores = service._score_reference_poses(service._prepare_pose_vector(user_landmarks))
+            pairwise_scores = np.array([
+                service._calculate_pose_similarity(user_landmarks, frame['landmarks'])
+                for frame in mock_reference_data
+            ])
+            self.log_test(
+                "Kernel Matches Pairwise Similarity",
+                np.allclose(kernel_scores, pairwise_scores, atol=1e-9),
+                f"Max difference: {np.max(np.abs(kernel_scores - pairwise_scores)):.2e}"
+            )
+            
+            # Test 3: An exact reference pose is found at its own index
+            target_idx = 37
+            best_idx, pose_score, _ = service._find_best_reference_match(
+                mock_reference_data[target_idx]['landmarks']
+            )
+            self.log_test(
+                "Exact Reference Pose Found",
+                best_idx == target_idx and abs(pose_score - 1.0) < 1e-9,
+                f"Index: {best_idx}, Expected: {target_idx}, Score: {pose_score}"
+            )
+            
+        except Exception as e:
+            self.log_test("Vectorized Reference Matching", False, f"Exception: {e}")
+    
+    def test_temporal_locality_tracking(self):
+        """Test windowed reference search with full-scan fallback."""
+        print("\n🧪 Testing Temporal-Locality Tracking")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(200)
+            config = PoseComparisonConfig(dtw_enabled=False, tracking_window=10, tracking_min_score=0.99)
+            service = PoseComparisonService(mock_reference_data, config)
+            
+            # Test 1: Following the reference in time stays inside the window
+            indices = []
+            for i in range(50, 80):
+                frame = mock_reference_data[i]
+                result = service.update_user_pose(frame['landmarks'], timestamp=frame['timestamp'])
+                indices.append(result['best_match_idx'])
+            stats = service.get_statistics()
+            self.log_test(
+                "Tracking Follows Reference",
+                indices == list(range(50, 80)) and stats['full_scans'] == 1 and stats['fallback_rate'] == 0.0,
+                f"Full scans: {stats['full_scans']}, Windowed: {stats['windowed_searches']}"
+            )
+            
+            # Test 2: Jumping far away falls back to a full scan
+            frame = mock_reference_data[180]
+            result = service.update_user_pose(frame['landmarks'], timestamp=mock_reference_data[80]['timestamp'])
+            stats = service.get_statistics()
+            self.log_test(
+                "Tracking Falls Back On Jump",
+                result['best_match_idx'] == 180 and stats['tracking_fallbacks'] == 1,
+                f"Index: {result['best_match_idx']}, Fallbacks: {stats['tracking_fallbacks']}, "
+                f"Window: {stats['tracking_window']}"
+            )
+            
+        except Exception as e:
+            self.log_test("Temporal-Locality Tracking", False, f"Exception: {e}")
+    
+    def test_dtw_timing_alignment(self):
+        """Test streaming alignment fields and DTW timing offsets."""
+        print("\n🧪 Testing DTW Timing Alignment")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(120)
+            config = PoseComparisonConfig(dtw_interval=0.0)
+            service = PoseComparisonService(mock_reference_data, config)
+            
+            # Dancer follows the reference but moves twice as fast as the clock
+            result = None
+            for step, ref_idx in enumerate(range(20, 60, 2)):
+                result = service.update_user_pose(
+                    mock_reference_data[ref_idx]['landmarks'], timestamp=100.0 + step * 0.1
+                )
+            
+            self.log_test(
+                "DTW Reference Position",
+                result['dtw_ref_idx'] == 58 and
+                abs(result['reference_timestamp'] - mock_reference_data[58]['timestamp']) < 1e-9,
+                f"Aligned index: {result['dtw_ref_idx']}, Reference time: {result['reference_timestamp']}"
+            )
+            
+            # History of 10 frames over 0.9 s covers about 1.8 s of reference
+            self.log_test(
+                "DTW Timing Offset Ahead",
+                0.6 < result['timing_offset'] < 1.2,
+                f"Timing offset: {result['timing_offset']}"
+            )
+            
+            # Identical sequences give a diagonal path
+            sequence = [frame['landmarks'] for frame in mock_reference_data[:20]]
+            similarity, path = service._apply_dynamic_time_warping(sequence, sequence)
+            self.log_test(
+                "DTW Returns Warping Path",
+                path == [(i, i) for i in range(20)] and abs(similarity - 1.0) < 1e-9,
+                f"Path length: {len(path)}, Similarity: {similarity}"
+            )
+            
+        except Exception as e:
+            self.log_test("DTW Timing Alignment", False, f"Exception: {e}")
+    
+    def test_reference_resync(self):
+        """Test relocating the dancer in the reference from recent motion."""
+        print("\n🧪 Testing Reference Re-Synchronisation")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(600)
+            service = PoseComparisonService(mock_reference_data)
+            
+            # Dancer joins mid-song: feed two seconds of frames from index 400 onwards
+            for step, ref_idx in enumerate(range(400, 420)):
+                service.update_user_pose(
+                    mock_reference_data[ref_idx]['landmarks'], timestamp=50.0 + step * 0.1
+                )
+            location = service.locate_in_reference()
+            
+            self.log_test(
+                "Resync Finds Reference Position",
+                location is not None and location['end_idx'] == 419,
+                f"Location: {location['end_idx'] if location else None}, Expected: 419"
+            )
+            self.log_test(
+                "Resync Within Snapshot Interval",
+                location is not None and location['search_time'] < 0.5,
+                f"Search time: {location['search_time'] if location else None}"
+            )
+            
+        except Exception as e:
+            self.log_test("Reference Re-Synchronisation", False, f"Exception: {e}")
+    
+    def test_ann_reference_index(self):
+        """Test full scans through the approximate nearest-neighbour index."""
+        print("\n🧪 Testing ANN Reference Index")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(600)
+            config = PoseComparisonConfig(
+                dtw_enabled=False, tracking_enabled=False,
+                ann_min_reference_frames=500, ann_recall_interval=1
+            )
+            service = PoseComparisonService(mock_reference_data, config)
+            exhaustive = PoseComparisonService(
+                mock_reference_data, PoseComparisonConfig(dtw_enabled=False, tracking_enabled=False)
+            )
+            
+            # Test 1: Index is only built for references above the size threshold
+            self.log_test(
+                "Index Built For Long Reference",
+                service.reference_index is not None and exhaustive.reference_index is None,
+                f"Indexed: {service.reference_index is not None}, Small: {exhaustive.reference_index is not None}"
+            )
+            
+            # Test 2: Noisy reference poses are matched like an exhaustive scan
+            agreements = 0
+            for i in range(0, 600, 20):
+                user_landmarks = mock_reference_data[i]['landmarks'] + np.random.normal(scale=0.01, size=(33, 4))
+                indexed = service._find_best_reference_match(user_landmarks)
+                expected = exhaustive._find_best_reference_match(user_landmarks)
+                agreements += indexed[0] == expected[0]
+            self.log_test(
+                "Index Agrees With Exhaustive Scan",
+                agreements >= 27,
+                f"Agreements: {agreements}/30"
+            )
+            
+            # Test 3: Recall against exhaustive search is reported
+            stats = service.get_statistics()
+            self.log_test(
+                "Index Recall Reported",
+                stats['ann_queries'] == 30 and stats['ann_recall'] is not None and stats['ann_recall'] >= 0.7,
+                f"Queries: {stats['ann_queries']}, Recall: {stats['ann_recall']}"
+            )
+            
+            # Test 4: Disabling the index through the config falls back to exhaustive scans
+            service.update_config(PoseComparisonConfig(dtw_enabled=False, ann_enabled=False))
+            self.log_test(
+                "Index Disabled By Config",
+                service.reference_index is None,
+                f"Index: {service.reference_index}"
+            )
+            
+        except Exception as e:
+            self.log_test("ANN Reference Index", False, f"Exception: {e}")
+    
+    def test_history_ring_buffers(self):
+        """Test the fixed-size pose, motion and score history."""
+        print("\n🧪 Testing History Ring Buffers")
+        
+        try:
+            mock_reference_data = self._create_mock_reference_data(50)
+            service = PoseComparisonService(mock_reference_data, PoseComparisonConfig(smoothing_window=5))
+            history_bytes = service.get_history_bytes()
+            
+            results = []
+            for i in range(40):
+                results.append(service.update_user_pose(np.random.rand(33, 4), timestamp=i * 0.1))
+            
+            # Test 1: Memory is fixed up front and does not grow with the session
+            self.log_test(
+                "History Memory Fixed",
+                service.get_history_bytes() == history_bytes and len(service.user_pose_history) == 10,
+                f"Bytes: {history_bytes}, History: {len(service.user_pose_history)}"
+            )
+            
+            # Test 2: Smoothed score is the mean of the last smoothing_window raw scores
+            raw_scores = service.similarity_scores.last('scores')[:, 0]
+            self.log_test(
+                "Smoothing Over Window",
+                abs(results[-1]['combined_score'] - raw_scores.mean()) < 1e-9,
+                f"Smoothed: {results[-1]['combined_score']:.4f}, Mean: {raw_scores.mean():.4f}"
+            )
+            
+            # Test 3: Timestamps are kept alongside the poses
+            timestamps = service.user_pose_history.last('timestamp')
+            self.log_test(
+                "Timestamps In Parallel Array",
+                np.allclose(timestamps, np.arange(30, 40) * 0.1),
+                f"Timestamps: {timestamps[0]:.1f}-{timestamps[-1]:.1f}"
+            )
+            
+            # Test 4: update_config resizes the same buffers and keeps the newest entries
+            pose_history = service.user_pose_history
+            service.update_config(PoseComparisonConfig(smoothing_window=3))
+            self.log_test(
+                "Config Resizes In Place",
+                service.user_pose_history is pose_history and
+                len(service.user_pose_history) == 6 and
+                abs(service.user_pose_history.latest('timestamp') - 3.9) < 1e-9,
+                f"History: {len(service.user_pose_history)}, Capacity: {service.user_pose_history.capacity}"
+            )
+            
+        except Exception as e:
+            self.log_test("History Ring Buffers", False, f"Exception: {e}")
+    
     def test_motion_similarity_calculation(self):
         """Test motion similarity calculation."""
         print("\n🧪 Testing Motion Similarity Calculation")
@@ -520,6 +774,12 @@ class PoseComparisonTester:
         self.test_pose_normalization()
         self.test_pose_similarity_calculation()
         self.test_dtw_in_pose_comparison_service()
+        self.test_vectorized_reference_matching()
+        self.test_temporal_locality_tracking()
+        self.test_dtw_timing_alignment()
+        self.test_reference_resync()
+        self.test_ann_reference_index()
+        self.test_history_ring_buffers()
         self.test_motion_similarity_calculation()
         self.test_pose_sequence_management()
         self.test_performance_benchmarks()
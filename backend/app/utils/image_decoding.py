@@ -0,0 +1,199 @@
+"""
+Image decoding for uploaded frames.
+
+Decodes base64 / raw image bytes straight to the array layout the caller needs
+with a single cv2.imdecode call (no PIL round trip, no colour conversions that
+cancel each other out). When the upload is larger than the inference resolution,
+JPEGs are decoded at 1/2, 1/4 or 1/8 scale (IMREAD_REDUCED_*), which skips most
+of the IDCT work instead of decoding full size and resizing afterwards.
+
+Compare against the previous PIL path with:
+    python -m app.utils.image_decoding
+"""
+import base64
+import binascii
+import struct
+import sys
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# EXIF orientation is ignored, as it was with the previous PIL decode
+_IMREAD_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def decode_base64_image(image_b64: str, max_pixels: Optional[int] = None,
+                        rgb: bool = True) -> np.ndarray:
+    """
+    Decode a base64 image (optionally a data: URL) to a uint8 array.
+
+    Args:
+        image_b64: Base64 encoded image, with or without a data:image/...;base64, prefix
+        max_pixels: Inference resolution; larger images may be decoded at reduced scale
+            (never below max_pixels). None decodes at full size.
+        rgb: Return RGB (for MediaPipe) instead of OpenCV's BGR
+
+    Returns:
+        (H, W, 3) uint8 image
+
+    Raises:
+        ValueError: If the data is not a decodable image
+    """
+    if image_b64.startswith("data:"):
+        image_b64 = image_b64.split(",", 1)[-1]
+    try:
+        data = base64.b64decode(image_b64)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+    return decode_image(data, max_pixels, rgb)
+
+
+def decode_frame(image: Union[str, bytes, bytearray, memoryview], max_pixels: Optional[int] = None,
+                 rgb: bool = True) -> np.ndarray:
+    """
+    Decode an uploaded frame: a base64 string (JSON endpoints) or raw encoded bytes (binary endpoints).
+
+    Raises:
+        ValueError: If the data is not a decodable image
+    """
+    if isinstance(image, str):
+        return decode_base64_image(image, max_pixels, rgb)
+    return decode_image(image, max_pixels, rgb)
+
+
+def decode_image(data: Union[bytes, bytearray, memoryview, np.ndarray], max_pixels: Optional[int] = None,
+                 rgb: bool = True) -> np.ndarray:
+    """
+    Decode encoded image bytes (JPEG, PNG, WebP, ...) to a uint8 array.
+
+    Args:
+        data: Encoded image
+        max_pixels: Inference resolution; larger images may be decoded at reduced scale
+        rgb: Return RGB instead of BGR
+
+    Returns:
+        (H, W, 3) uint8 image
+
+    Raises:
+        ValueError: If the data is not a decodable image
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        raise ValueError("Empty image data")
+    scale = reduction_factor(image_size(buffer), max_pixels)
+    try:
+        image = cv2.imdecode(buffer, _IMREAD_FLAGS[scale] | cv2.IMREAD_IGNORE_ORIENTATION)
+    except cv2.error as e:
+        raise ValueError(f"Could not decode image data: {e}")
+    if image is None:
+        raise ValueError("Could not decode image data")
+    if rgb:
+        # In place: the decoded buffer is ours
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    return image
+
+
+def reduction_factor(size: Optional[Tuple[int, int]], max_pixels: Optional[int]) -> int:
+    """
+    Largest decode reduction (1, 2, 4 or 8) that keeps at least max_pixels.
+
+    Args:
+        size: (width, height) of the encoded image, None if unknown
+        max_pixels: Inference resolution, None for full size
+    """
+    if size is None or not max_pixels:
+        return 1
+    width, height = size
+    for scale in (8, 4, 2):
+        if (width // scale) * (height // scale) >= max_pixels:
+            return scale
+    return 1
+
+
+def image_size(data: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) read from a JPEG or PNG header without decoding.
+
+    Returns:
+        Image size, or None for other formats and malformed headers
+    """
+    header = data[:32].tobytes()
+    if header.startswith(b"\x89PNG\r\n\x1a\n") and len(header) >= 24:
+        return struct.unpack(">II", header[16:24])
+    if not header.startswith(b"\xff\xd8"):
+        return None
+
+    # Walk the JPEG segments up to the start-of-frame marker
+    position = 2
+    length = len(data)
+    while position + 9 < length:
+        if data[position] != 0xFF:
+            return None
+        marker = int(data[position + 1])
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[position + 5:position + 9].tobytes())
+            return width, height
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            position += 2
+            continue
+        position += 2 + (int(data[position + 2]) << 8 | int(data[position + 3]))
+    return None
+
+
+def _decode_with_pil(image_b64: str) -> np.ndarray:
+    """The decode path used before this module, kept for the benchmark."""
+    from io import BytesIO
+    from PIL import Image
+
+    image = Image.open(BytesIO(base64.b64decode(image_b64)))
+    frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def _benchmark_frame(width: int, height: int) -> str:
+    """Base64 JPEG (quality 85) of a synthetic camera-like frame."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height))], axis=-1)
+    image = np.clip(image + rng.normal(0, 12, image.shape), 0, 255).astype(np.uint8)
+    cv2.rectangle(image, (width // 3, height // 6), (2 * width // 3, 5 * height // 6), (40, 60, 200), -1)
+    return base64.b64encode(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()).decode()
+
+
+def _time_per_frame(decode, repeats: int) -> float:
+    """Median milliseconds of one decode."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decode()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+if __name__ == "__main__":
+    from app.data.config import settings
+
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    max_pixels = settings.image_decode_max_pixels
+    print(f"Decode cost per frame (median of {repeats}, JPEG q85, inference resolution {max_pixels} px)")
+    print(f"{'frame':>10} {'PIL path':>10} {'imdecode':>10} {'reduced':>10} {'decoded size':>14}")
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        image_b64 = _benchmark_frame(width, height)
+        pil_ms = _time_per_frame(lambda: _decode_with_pil(image_b64), repeats)
+        full_ms = _time_per_frame(lambda: decode_base64_image(image_b64), repeats)
+        reduced_ms = _time_per_frame(lambda: decode_base64_image(image_b64, max_pixels), repeats)
+        decoded = decode_base64_image(image_b64, max_pixels)
+        print(f"{width}x{height:<5} {pil_ms:>8.2f}ms {full_ms:>8.2f}ms {reduced_ms:>8.2f}ms "
+              f"{decoded.shape[1]:>8}x{decoded.shape[0]}")
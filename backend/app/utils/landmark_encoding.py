@@ -0,0 +1,99 @@
+"""
+Compact landmark encoding for API responses.
+
+Landmark arrays are the bulk of snapshot and pose-sequence responses, and as
+nested JSON float lists they cost ~20 bytes and a float-to-text conversion per
+value. Clients can opt into packed encodings instead, returned as base64 inside
+the usual JSON body:
+
+    f16   little-endian float16 (~3 significant digits)
+    i16   little-endian int16, value * 10000 (1e-4 steps, |value| <= 3.2767)
+
+    {"encoding": "i16", "shape": [33, 4], "scale": 0.0001, "data": "<base64>"}
+
+Arrays with a value i16 cannot hold (e.g. a large MediaPipe z or an off-frame
+x/y) are sent as f16 instead of being clipped, so clients decode by the
+payload's "encoding" field rather than the one they asked for.
+
+Decode with numpy:
+    np.frombuffer(base64.b64decode(data), "<i2").reshape(shape) * scale   (i16)
+    np.frombuffer(base64.b64decode(data), "<f2").reshape(shape)           (f16)
+
+The encoding is requested with ?landmark_encoding=i16 or an Accept header
+parameter (Accept: application/json; landmarks=i16).
+"""
+import base64
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+I16_SCALE = 1e-4
+I16_LIMIT = 32767 * I16_SCALE  # Largest magnitude i16 holds
+ENCODINGS = {
+    'f16': '<f2',
+    'i16': '<i2',
+}
+
+
+def requested_encoding(query_value: Optional[str] = None, accept: Optional[str] = None) -> Optional[str]:
+    """
+    Landmark encoding asked for by a request.
+
+    Args:
+        query_value: landmark_encoding query parameter
+        accept: Accept header (its landmarks=... parameter is used)
+
+    Returns:
+        'f16', 'i16', or None for plain JSON lists
+
+    Raises:
+        ValueError: For an unknown encoding
+    """
+    encoding = query_value
+    if encoding is None and accept:
+        for parameter in accept.replace(",", ";").split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "landmarks":
+                encoding = value.strip()
+                break
+
+    if encoding is None or encoding.lower() in ("", "json"):
+        return None
+    encoding = encoding.lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown landmark encoding '{encoding}' (use one of {', '.join(ENCODINGS)} or json)")
+    return encoding
+
+
+def encode_landmarks(landmarks: np.ndarray, encoding: str) -> Dict[str, Any]:
+    """
+    Pack a landmark array.
+
+    Args:
+        landmarks: Array of any shape, e.g. (33, 4) or (N, 33, 4)
+        encoding: 'f16' or 'i16' (i16 falls back to f16 for values beyond I16_LIMIT)
+
+    Returns:
+        Dict with encoding, shape, scale and base64 data
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if encoding == 'i16' and not np.all(np.abs(landmarks) <= I16_LIMIT):
+        encoding = 'f16'
+    if encoding == 'i16':
+        packed = np.rint(landmarks / I16_SCALE).astype('<i2')
+        scale = I16_SCALE
+    else:
+        packed = landmarks.astype('<f2')
+        scale = 1.0
+    return {
+        'encoding': encoding,
+        'shape': list(landmarks.shape),
+        'scale': scale,
+        'data': base64.b64encode(packed.tobytes()).decode('ascii')
+    }
+
+
+def decode_landmarks(payload: Dict[str, Any]) -> np.ndarray:
+    """Unpack encode_landmarks output to float32 (for clients and tests)."""
+    values = np.frombuffer(base64.b64decode(payload['data']), dtype=ENCODINGS[payload['encoding']])
+    return (values.astype(np.float32) * payload['scale']).reshape(payload['shape'])
@@ -0,0 +1,112 @@
+"""
+Landmark payloads sent by clients that run pose estimation themselves.
+
+Browsers can run MediaPipe locally and send only the landmarks, either as
+JSON arrays or as packed little-endian float32 bytes:
+
+    pose   33 x (x, y, z, visibility)   528 bytes
+    hand   21 x (x, y, z)               252 bytes each, appended after the pose
+
+Coordinates use MediaPipe's conventions (x, y normalized to the frame, z on
+the scale of x). Everything is validated before it reaches comparison and
+scoring, since a malformed pose would otherwise corrupt a session's motion
+history.
+"""
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+POSE_SHAPE = (33, 4)
+HAND_SHAPE = (21, 3)
+POSE_BYTES = POSE_SHAPE[0] * POSE_SHAPE[1] * 4
+HAND_BYTES = HAND_SHAPE[0] * HAND_SHAPE[1] * 4
+MAX_HANDS = 2
+
+# Landmarks of body parts just outside the frame are extrapolated past [0, 1]
+XY_RANGE = (-1.0, 2.0)
+Z_LIMIT = 10.0
+
+
+def parse_pose_landmarks(landmarks: Union[Sequence[Sequence[float]], np.ndarray]) -> np.ndarray:
+    """
+    Validate client pose landmarks.
+
+    Args:
+        landmarks: 33 x (x, y, z, visibility) values
+
+    Returns:
+        (33, 4) float32 array
+
+    Raises:
+        ValueError: If the shape or any value is out of range
+    """
+    pose = _as_array(landmarks, POSE_SHAPE, "pose_landmarks")
+    _check_coordinates(pose, "pose_landmarks")
+    if np.any((pose[:, 3] < 0.0) | (pose[:, 3] > 1.0)):
+        raise ValueError("pose_landmarks visibility must be within [0, 1]")
+    return pose
+
+
+def parse_hand_landmarks(hands: Sequence[Union[Sequence[Sequence[float]], np.ndarray]]) -> List[np.ndarray]:
+    """
+    Validate client hand landmarks.
+
+    Args:
+        hands: Up to two hands of 21 x (x, y, z) values
+
+    Returns:
+        List of (21, 3) float32 arrays
+
+    Raises:
+        ValueError: If there are too many hands or a hand is malformed
+    """
+    if len(hands) > MAX_HANDS:
+        raise ValueError(f"At most {MAX_HANDS} hands are supported, got {len(hands)}")
+    parsed = []
+    for hand in hands:
+        hand = _as_array(hand, HAND_SHAPE, "hand_landmarks")
+        _check_coordinates(hand, "hand_landmarks")
+        parsed.append(hand)
+    return parsed
+
+
+def parse_landmark_bytes(data: Union[bytes, bytearray, memoryview]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Unpack a binary landmarks payload: the pose, then zero to two hands.
+
+    Returns:
+        (pose landmarks (33, 4), hand landmarks [(21, 3), ...])
+
+    Raises:
+        ValueError: If the size does not match a pose plus whole hands, or values are out of range
+    """
+    size = len(data)
+    if size < POSE_BYTES or (size - POSE_BYTES) % HAND_BYTES:
+        raise ValueError(f"Expected {POSE_BYTES} bytes of pose landmarks plus {HAND_BYTES} bytes "
+                         f"per hand (float32), got {size} bytes")
+    values = np.frombuffer(data, dtype="<f4")
+    pose = parse_pose_landmarks(values[:POSE_BYTES // 4].reshape(POSE_SHAPE))
+    hand_values = values[POSE_BYTES // 4:].reshape(-1, *HAND_SHAPE)
+    return pose, parse_hand_landmarks(list(hand_values))
+
+
+def _as_array(values, shape: Tuple[int, int], name: str) -> np.ndarray:
+    """float32 copy of values with the expected shape."""
+    try:
+        array = np.array(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a numeric array of shape {shape}")
+    if array.shape != shape:
+        raise ValueError(f"{name} must have shape {shape}, got {array.shape}")
+    return array
+
+
+def _check_coordinates(landmarks: np.ndarray, name: str):
+    """Finite values, x/y near the frame, z within MediaPipe's scale."""
+    if not np.all(np.isfinite(landmarks)):
+        raise ValueError(f"{name} contains NaN or infinite values")
+    xy = landmarks[:, :2]
+    if np.any((xy < XY_RANGE[0]) | (xy > XY_RANGE[1])):
+        raise ValueError(f"{name} x/y must be normalized coordinates within {list(XY_RANGE)}")
+    if np.any(np.abs(landmarks[:, 2]) > Z_LIMIT):
+        raise ValueError(f"{name} z must be within [-{Z_LIMIT}, {Z_LIMIT}]")
@@ -0,0 +1,54 @@
+"""
+Shared test data factories.
+
+Import them in test modules with:
+    from tests.conftest import make_frames, make_reference, make_reference_poses
+"""
+
+import numpy as np
+
+
+def make_reference(num_frames: int = 120, dims: int = 69, seed: int = 0) -> np.ndarray:
+    """Smooth random-walk reference of unit pose vectors."""
+    rng = np.random.default_rng(seed)
+    walk = np.cumsum(rng.normal(scale=0.05, size=(num_frames, dims)), axis=0) + 1.0
+    return walk / np.linalg.norm(walk, axis=1, keepdims=True)
+
+
+def make_reference_poses(num_frames: int = 120, fps: float = 15.0, seed: int = 0):
+    """Smoothly moving reference poses in process_video layout."""
+    rng = np.random.default_rng(seed)
+    walk = 0.5 + np.cumsum(rng.normal(scale=0.01, size=(num_frames, 33, 4)), axis=0)
+    return [
+        {'frame_number': i, 'timestamp': i / fps, 'landmarks': walk[i], 'has_pose': True, 'gestures': []}
+        for i in range(num_frames)
+    ]
+
+
+def make_frames(num_frames: int = 50, fps: float = 15.0, seed: int = 0):
+    """Frames in process_video layout, some without a pose and some with hands."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(num_frames):
+        has_pose = i % 7 != 3
+        gestures = []
+        if i % 5 == 0:
+            gestures.append({
+                'hand_landmarks': rng.random((21, 4)),
+                'handedness': {'label': 'Right', 'confidence': 0.9},
+                'gesture': 'open_hand'
+            })
+        if i % 10 == 0:
+            gestures.append({
+                'hand_landmarks': rng.random((21, 4)),
+                'handedness': {'label': 'Left', 'confidence': 0.7},
+                'gesture': 'peace_sign'
+            })
+        frames.append({
+            'frame_number': 4 * (i + 1),
+            'timestamp': (i + 1) / fps,
+            'landmarks': rng.random((33, 4)) if has_pose else None,
+            'has_pose': has_pose,
+            'gestures': gestures
+        })
+    return frames
@@ -0,0 +1,240 @@
+"""
+Tests for the live practice API endpoints.
+
+Run with:
+    pytest tests/test_api.py -v
+"""
+
+import asyncio
+import base64
+import os
+import threading
+import time
+
+import cv2
+import httpx
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")  # Services check for a key at import
+
+import app.main as main  # noqa: E402
+from app.services.live_feedback_service import SnapshotData  # noqa: E402
+from app.services.pose_detector_pool import PoseDetectorPool  # noqa: E402
+from tests.conftest import make_reference_poses  # noqa: E402
+
+
+def encoded_frame(value: int = 180) -> bytes:
+    """JPEG of a frame without a person in it."""
+    return cv2.imencode('.jpg', np.full((120, 160, 3), value, dtype=np.uint8))[1].tobytes()
+
+
+def frame_message(sequence: int, value: int = 180) -> bytes:
+    """Binary stream message: 4-byte sequence number + encoded frame."""
+    return sequence.to_bytes(4, "little") + encoded_frame(value)
+
+
+def fake_result() -> dict:
+    """Minimal successful snapshot result."""
+    return {'timestamp': time.time(), 'pose_landmarks': None, 'hand_landmarks': [], 'success': True}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Client (without the startup OpenAI check) with a loaded reference and in-process inference."""
+    pool = PoseDetectorPool(num_workers=0)
+    monkeypatch.setattr(main, "pose_detector_pool", pool)
+    main.session_registry.set_reference("test_dance", make_reference_poses())
+    yield TestClient(main.app)
+    pool.close()
+
+
+def start_session(client: TestClient) -> str:
+    return client.post("/api/sessions/start").json()["session_id"]
+
+
+# =============================================================================
+# WebSocket stream
+# =============================================================================
+
+class TestStream:
+    """Frames over /ws/sessions/{session_id}."""
+
+    def test_frame_result(self, client):
+        with client.websocket_connect(f"/ws/sessions/{start_session(client)}") as websocket:
+            websocket.send_bytes(frame_message(7))
+            message = websocket.receive_json()
+
+        assert message['type'] == "result"
+        assert message['sequence'] == 7
+        assert message['success']
+        assert message['pose_landmarks'] is None
+        assert message['frames_dropped'] == 0
+
+    def test_newer_frame_replaces_queued_frame(self, client, monkeypatch):
+        started, release = threading.Event(), threading.Event()
+        processed = []
+
+        async def slow_snapshot(image, session):
+            processed.append(bytes(image))
+            if len(processed) == 1:
+                started.set()
+                await asyncio.to_thread(release.wait, 10)
+            return fake_result()
+
+        monkeypatch.setattr(main, "process_image_snapshot", slow_snapshot)
+        with client.websocket_connect(f"/ws/sessions/{start_session(client)}") as websocket:
+            websocket.send_bytes(frame_message(0))
+            assert started.wait(10)
+
+            # Frame 1 waits while frame 0 is processed, then frame 2 replaces it
+            websocket.send_bytes(frame_message(1, value=100))
+            websocket.send_bytes(frame_message(2, value=50))
+            websocket.send_text("sync")  # Answered in order, so frames 1 and 2 have been queued
+            assert websocket.receive_json()['type'] == "error"
+            release.set()
+
+            first, second = websocket.receive_json(), websocket.receive_json()
+
+        assert (first['sequence'], second['sequence']) == (0, 2)
+        assert second['frames_dropped'] == 1
+        assert processed[1] == encoded_frame(50)
+
+    def test_processing_failure_closes_stream(self, client, monkeypatch):
+        async def failing_snapshot(image, session):
+            raise RuntimeError("detector pool unavailable")
+
+        monkeypatch.setattr(main, "process_image_snapshot", failing_snapshot)
+        with client.websocket_connect(f"/ws/sessions/{start_session(client)}") as websocket:
+            websocket.send_bytes(frame_message(3))
+            error = websocket.receive_json()
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+
+        assert error == {'type': "error", 'sequence': 3, 'error': "detector pool unavailable"}
+        assert closed.value.code == 1011
+
+    def test_bad_frame_keeps_stream_open(self, client, monkeypatch):
+        async def picky_snapshot(image, session):
+            if bytes(image) == encoded_frame(0):
+                raise HTTPException(status_code=400, detail="Could not decode image")
+            return fake_result()
+
+        monkeypatch.setattr(main, "process_image_snapshot", picky_snapshot)
+        with client.websocket_connect(f"/ws/sessions/{start_session(client)}") as websocket:
+            websocket.send_bytes(frame_message(1, value=0))
+            error = websocket.receive_json()
+            websocket.send_bytes(frame_message(2))
+            result = websocket.receive_json()
+
+        assert error == {'type': "error", 'sequence': 1, 'error': "Could not decode image"}
+        assert (result['type'], result['sequence'], result['success']) == ("result", 2, True)
+
+    def test_unknown_session_is_rejected(self, client):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect("/ws/sessions/unknown") as websocket:
+                websocket.receive_json()
+        assert closed.value.code == 4404
+
+
+# =============================================================================
+# Frame slot
+# =============================================================================
+
+class TestFrameSlot:
+    """One frame in flight per session; other sessions are unaffected."""
+
+    def test_busy_session_gets_429(self, client, monkeypatch):
+        busy_id, other_id = start_session(client), start_session(client)
+        image = base64.b64encode(encoded_frame()).decode()
+
+        async def run():
+            release = asyncio.Event()
+
+            async def held_snapshot(image_data, session):
+                if session.session_id == busy_id:
+                    await release.wait()
+                return fake_result()
+
+            monkeypatch.setattr(main, "process_image_snapshot", held_snapshot)
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                async def snapshot(session_id):
+                    return await http.post("/api/sessions/snapshot", json={"session_id": session_id, "image": image})
+
+                first = asyncio.create_task(snapshot(busy_id))
+                session = main.session_registry.get_session(busy_id)
+                while not session.frame_lock.locked():
+                    await asyncio.sleep(0.01)
+
+                second = await snapshot(busy_id)
+                other = await snapshot(other_id)
+                health = await http.get("/health")
+                release.set()
+                return (await first).status_code, second.status_code, other.status_code, \
+                    health.status_code, (await snapshot(busy_id)).status_code
+
+        first, second, other, health, after = asyncio.run(run())
+        assert (first, second, other, after) == (200, 429, 200, 200)
+        assert health == 200
+
+    def test_shared_reference_loads_off_the_event_loop(self, client, monkeypatch):
+        session_id = start_session(client)
+        loaded_on = []
+
+        def slow_load(video_name, publish=True):
+            loaded_on.append(threading.current_thread().name)
+            time.sleep(0.2)
+            return True
+
+        monkeypatch.setattr(main, "load_reference_video", slow_load)
+        monkeypatch.setattr(main.reference_pointer, "poll", lambda: "other_dance")
+        assert client.get("/api/sessions/status", params={"session_id": session_id}).status_code == 200
+        assert loaded_on and loaded_on[0].startswith("snapshot")
+
+
+# =============================================================================
+# Feedback frame
+# =============================================================================
+
+class TestFeedbackFrame:
+    """Binary frames reach the feedback model without a per-frame base64 copy."""
+
+    def test_frame_not_encoded_without_llm_call(self, client, monkeypatch):
+        session = main.session_registry.get_session(start_session(client))
+
+        def no_encoding(data):
+            raise AssertionError("frame was base64-encoded")
+
+        monkeypatch.setattr(base64, "b64encode", no_encoding)
+        feedback = asyncio.run(main.generate_llm_feedback(encoded_frame(), {'combined_score': 0.95}, session))
+
+        assert feedback is None
+        assert session.live_feedback_service.total_llm_calls == 0
+
+    def test_frame_encoded_for_llm_request(self, client):
+        session = main.session_registry.get_session(start_session(client))
+        snapshot = SnapshotData(timestamp=1.0, frame_base64="", pose_similarity=0.5, motion_similarity=0.5,
+                                combined_score=0.5, frame_bytes=memoryview(encoded_frame()))
+
+        content = session.live_feedback_service._live_request(snapshot)['messages'][1]['content']
+
+        expected = base64.b64encode(encoded_frame()).decode()
+        assert content[1]['image_url']['url'] == f"data:image/jpeg;base64,{expected}"
+
+
+# =============================================================================
+# Batch scoring upload
+# =============================================================================
+
+class TestBatchUpload:
+    """Practice video uploads for /api/batch/score."""
+
+    def test_oversized_video_is_rejected(self, client, monkeypatch):
+        monkeypatch.setattr(main.settings, "batch_max_upload_mb", 1)
+        video = bytes(main.UPLOAD_CHUNK_BYTES + 1)
+        response = client.post("/api/batch/score", files={"video": ("practice.mp4", video, "video/mp4")})
+        assert response.status_code == 413
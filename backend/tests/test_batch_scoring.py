@@ -0,0 +1,137 @@
+"""
+Tests for offline scoring of recorded practice videos.
+
+Run with:
+    pytest tests/test_batch_scoring.py -v
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.services.batch_scoring_service import BatchScoringService
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+from tests.conftest import make_reference_poses
+
+
+def streamed_results(service: PoseComparisonService, poses):
+    """Feed frames one by one through the live path."""
+    return [service.update_user_pose(pose['landmarks'], timestamp=pose['timestamp']) for pose in poses]
+
+
+# =============================================================================
+# Sequence scoring
+# =============================================================================
+
+class TestScoreSequence:
+    """PoseComparisonService.score_sequence against the streaming path."""
+
+    def test_matches_streaming_scores(self):
+        """Batch scores equal frame-by-frame update_user_pose scores."""
+        reference = make_reference_poses(300)
+        config = PoseComparisonConfig(tracking_enabled=False)
+        rng = np.random.default_rng(1)
+        user = [dict(pose, landmarks=pose['landmarks'] + rng.normal(scale=0.005, size=(33, 4)))
+                for pose in reference[50:200]]
+
+        batch = PoseComparisonService(reference, config).score_sequence(
+            [pose['landmarks'] for pose in user], [pose['timestamp'] for pose in user]
+        )
+        streamed = streamed_results(PoseComparisonService(reference, config), user)
+
+        for key in ('best_match_idx', 'combined_score', 'pose_score', 'motion_score', 'dtw_score'):
+            np.testing.assert_allclose(batch[key], [result[key] for result in streamed], atol=1e-6)
+
+    def test_following_dancer_tracks_reference(self):
+        """A dancer following the reference follows its timeline."""
+        reference = make_reference_poses(300)
+        service = PoseComparisonService(reference)
+
+        user = reference[30:130]
+        result = service.score_sequence([pose['landmarks'] for pose in user],
+                                        [pose['timestamp'] + 10.0 for pose in user])
+
+        assert np.mean(result['dtw_ref_idx'] == np.arange(30, 130)) > 0.95
+        np.testing.assert_allclose(result['timing_offset'], 0.0, atol=1e-9)
+
+    def test_empty_sequence(self):
+        """No frames gives empty arrays."""
+        result = PoseComparisonService(make_reference_poses(20)).score_sequence([], [])
+
+        assert len(result['combined_score']) == 0
+        assert len(result['timing_offset']) == 0
+
+
+# =============================================================================
+# Batch jobs
+# =============================================================================
+
+class TestBatchScoringService:
+    """Job results and lifecycle."""
+
+    def test_score_poses_reports_problem_areas(self):
+        """A stretch of wrong poses becomes a problem segment on the timeline."""
+        reference = make_reference_poses(300)
+        service = PoseComparisonService(reference)
+        rng = np.random.default_rng(2)
+        poses = [dict(pose) for pose in reference]
+        for pose in poses[100:160]:
+            pose['landmarks'] = rng.normal(size=(33, 4))
+        poses[10] = dict(poses[10], landmarks=None, has_pose=False)
+
+        start_time = time.perf_counter()
+        result = BatchScoringService().score_poses(poses, service)
+        elapsed = time.perf_counter() - start_time
+
+        assert result['frames_sampled'] == 300
+        assert result['frames_scored'] == 299
+        assert len(result['timeline']) == 299
+        assert len(result['problem_areas']) >= 1
+        problem = result['problem_areas'][0]
+        assert 100 / 15.0 - 1.0 <= problem['start_time'] <= 160 / 15.0
+        assert elapsed < 2.0
+
+    def test_unreadable_video_fails_job(self):
+        """A file that is not a video ends in a failed job and is cleaned up."""
+        service = PoseComparisonService(make_reference_poses(20))
+        batch_service = BatchScoringService()
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as video_file:
+            video_file.write(b'not a video')
+
+        job_id = batch_service.submit(video_file.name, service)
+        for _ in range(100):
+            job = batch_service.get_job(job_id)
+            if job['status'] in ('completed', 'failed'):
+                break
+            time.sleep(0.05)
+
+        assert job['status'] == 'failed'
+        assert job['error']
+        assert not os.path.exists(video_file.name)
+
+    def test_queued_jobs_share_executor_threads(self):
+        """Jobs beyond max_concurrent_jobs wait in the queue without their own thread."""
+        service = PoseComparisonService(make_reference_poses(20))
+        batch_service = BatchScoringService(max_concurrent_jobs=2)
+        job_ids = []
+        for _ in range(6):
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as video_file:
+                video_file.write(b'not a video')
+            job_ids.append(batch_service.submit(video_file.name, service))
+
+        threads = [thread for thread in threading.enumerate() if thread.name.startswith("batch-scoring")]
+        assert len(threads) <= 2
+
+        for _ in range(200):
+            if all(batch_service.get_job(job_id)['status'] == 'failed' for job_id in job_ids):
+                break
+            time.sleep(0.05)
+        assert all(batch_service.get_job(job_id)['status'] == 'failed' for job_id in job_ids)
+
+    def test_unknown_job(self):
+        """Unknown job IDs return None."""
+        assert BatchScoringService().get_job('missing') is None
@@ -0,0 +1,245 @@
+"""
+Tests for the DTW alignment helpers used by PoseComparisonService.
+
+Run with:
+    pytest tests/test_dtw_alignment.py -v
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from app.services.dtw_alignment import (
+    OnlineDTW, sakoe_chiba_dtw, timing_offsets, keogh_envelope, locate_subsequence
+)
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+from tests.conftest import make_reference, make_reference_poses
+
+
+def brute_force_subsequence_dtw(query: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Full open-begin DTW cost matrix, used as ground truth."""
+    costs = np.maximum(2.0 - 2.0 * query @ reference.T, 0.0)
+    matrix = np.full(costs.shape, np.inf)
+    for i in range(costs.shape[0]):
+        for j in range(costs.shape[1]):
+            if i == 0:
+                previous = 0.0  # A path may start at any reference frame
+            else:
+                previous = min(
+                    matrix[i - 1, j],
+                    matrix[i - 1, j - 1] if j > 0 else np.inf,
+                    matrix[i, j - 1] if j > 0 else np.inf,
+                )
+            matrix[i, j] = costs[i, j] + previous
+    return matrix
+
+
+def brute_force_dtw(user: np.ndarray, reference: np.ndarray) -> float:
+    """Unconstrained closed-end DTW cost, used as ground truth."""
+    costs = np.maximum(2.0 - 2.0 * user @ reference.T, 0.0)
+    matrix = np.full((len(user) + 1, len(reference) + 1), np.inf)
+    matrix[0, 0] = 0.0
+    for i in range(1, len(user) + 1):
+        for j in range(1, len(reference) + 1):
+            matrix[i, j] = costs[i - 1, j - 1] + min(
+                matrix[i - 1, j], matrix[i - 1, j - 1], matrix[i, j - 1]
+            )
+    return matrix[-1, -1]
+
+
+# =============================================================================
+# OnlineDTW
+# =============================================================================
+
+class TestOnlineDTW:
+    """Streaming open-end DTW."""
+
+    def test_matches_full_dtw_when_band_covers_reference(self):
+        """With an unbounded band every column equals the full DTW column."""
+        reference = make_reference(40)
+        query = make_reference(15, seed=1)
+        expected = brute_force_subsequence_dtw(query, reference)
+
+        aligner = OnlineDTW(reference, band_width=len(reference))
+        for i, frame in enumerate(query):
+            aligner.step(frame)
+            np.testing.assert_allclose(aligner.column_costs, expected[i], rtol=1e-9)
+
+    def test_tracks_subsampled_reference(self):
+        """A dancer at a lower frame rate stays aligned to the right reference frame."""
+        reference = make_reference(300)
+        aligner = OnlineDTW(reference, band_width=10)
+
+        for true_idx in range(60, 240, 3):
+            position, cost = aligner.step(reference[true_idx], expected_advance=3.0, anchor=60)
+            assert abs(position - true_idx) <= 1
+        assert aligner.normalized_cost < 0.05
+
+    def test_column_stays_within_band(self):
+        """Per-frame work is bounded by the band width, not the reference length."""
+        reference = make_reference(1000)
+        aligner = OnlineDTW(reference, band_width=15)
+
+        for true_idx in range(500, 560):
+            aligner.step(reference[true_idx], expected_advance=1.0, anchor=500)
+            assert len(aligner.column_costs) <= 2 * 15 + 2
+
+    def test_reset_starts_new_path(self):
+        """After reset the next step is an open-begin column around the anchor."""
+        reference = make_reference(200)
+        aligner = OnlineDTW(reference, band_width=10)
+        for idx in range(20, 30):
+            aligner.step(reference[idx], expected_advance=1.0, anchor=20)
+
+        aligner.reset()
+        position, cost = aligner.step(reference[150], anchor=150)
+
+        assert position == 150
+        assert cost == pytest.approx(0.0, abs=1e-9)
+        assert aligner.steps == 1
+
+
+# =============================================================================
+# Banded multivariate DTW and timing offsets
+# =============================================================================
+
+class TestSakoeChibaDTW:
+    """Band-constrained DTW with warping path."""
+
+    def test_wide_band_matches_unconstrained_dtw(self):
+        """A band covering the whole matrix gives the unconstrained DTW cost."""
+        user = make_reference(12, seed=2)
+        reference = make_reference(18, seed=3)
+
+        cost, path = sakoe_chiba_dtw(user, reference, band=18)
+
+        assert cost == pytest.approx(brute_force_dtw(user, reference))
+
+    def test_path_is_monotonic_and_complete(self):
+        """The path runs from (0, 0) to (n-1, m-1) in unit steps."""
+        user = make_reference(20, seed=4)
+        reference = make_reference(35, seed=5)
+
+        cost, path = sakoe_chiba_dtw(user, reference, band=5)
+
+        assert path[0] == (0, 0)
+        assert path[-1] == (19, 34)
+        steps = np.diff(np.array(path), axis=0)
+        assert np.all((steps >= 0) & (steps <= 1))
+        assert np.all(steps.sum(axis=1) >= 1)
+        path_cost = sum(max(0.0, 2.0 - 2.0 * user[i] @ reference[j]) for i, j in path)
+        assert cost == pytest.approx(path_cost)
+
+    def test_identical_sequences_follow_diagonal(self):
+        """Identical sequences align frame to frame with zero cost."""
+        reference = make_reference(25)
+
+        cost, path = sakoe_chiba_dtw(reference, reference, band=3)
+
+        assert cost == pytest.approx(0.0, abs=1e-9)
+        assert path == [(i, i) for i in range(25)]
+
+    def test_empty_input(self):
+        """Empty sequences return an infinite cost and no path."""
+        cost, path = sakoe_chiba_dtw(np.zeros((0, 69)), make_reference(5), band=3)
+
+        assert cost == float('inf')
+        assert path == []
+
+
+class TestTimingOffsets:
+    """Timing offsets derived from warping paths."""
+
+    def test_lockstep_has_zero_offset(self):
+        """Following the reference at its own speed means no offset."""
+        path = [(i, i) for i in range(10)]
+        timestamps = np.arange(10) / 15.0
+
+        offsets = timing_offsets(path, timestamps, timestamps)
+
+        np.testing.assert_allclose(offsets, 0.0, atol=1e-12)
+
+    def test_rushing_dancer_is_ahead(self):
+        """Covering two reference frames per user frame builds a positive offset."""
+        reference_timestamps = np.arange(40) / 10.0
+        user_timestamps = np.arange(10) / 10.0
+        path = [(i, 2 * i) for i in range(10)]
+
+        offsets = timing_offsets(path, user_timestamps, reference_timestamps)
+
+        assert offsets[0] == pytest.approx(0.0)
+        assert offsets[-1] == pytest.approx(0.9)
+        assert np.all(np.diff(offsets) > 0)
+
+
+# =============================================================================
+# LB_Keogh subsequence search
+# =============================================================================
+
+class TestSubsequenceSearch:
+    """Locating a short user sequence in a long reference."""
+
+    def test_envelope_bounds_reference(self):
+        """The envelope contains every reference frame within its radius."""
+        reference = make_reference(50)
+        upper, lower = keogh_envelope(reference, radius=3)
+
+        for j in range(50):
+            window = reference[max(0, j - 3):j + 4]
+            np.testing.assert_allclose(upper[j], window.max(axis=0))
+            np.testing.assert_allclose(lower[j], window.min(axis=0))
+
+    def test_pruned_search_matches_exhaustive_search(self):
+        """Pruning never changes the answer."""
+        reference = make_reference(300, seed=6)
+        query = make_reference(8, seed=7)
+        upper, lower = keogh_envelope(reference, radius=6)
+
+        result = locate_subsequence(query, 15, reference, upper, lower, band=5)
+
+        exhaustive = [sakoe_chiba_dtw(query, reference[s:s + 15], 5)[0] for s in range(300 - 15 + 1)]
+        assert result['start_idx'] == int(np.argmin(exhaustive))
+        assert result['cost'] == pytest.approx(min(exhaustive))
+
+    def test_locates_sparse_query_in_long_reference(self):
+        """Two seconds of 7.5 FPS snapshots are found in a 5-minute, 15 FPS reference in time."""
+        reference = make_reference(5 * 60 * 15, seed=8)
+        upper, lower = keogh_envelope(reference, radius=31)
+        rng = np.random.default_rng(9)
+        query = reference[3100:3130:2] + rng.normal(scale=0.002, size=(15, 69))
+        query /= np.linalg.norm(query, axis=1, keepdims=True)
+
+        start_time = time.perf_counter()
+        result = locate_subsequence(query, 29, reference, upper, lower, band=30)
+        elapsed = time.perf_counter() - start_time
+
+        assert abs(result['start_idx'] - 3100) <= 1
+        assert result['dtw_evaluations'] < result['candidates'] / 10
+        assert elapsed < 0.5
+
+
+# =============================================================================
+# Re-synchronisation
+# =============================================================================
+
+class TestResync:
+    """PoseComparisonService.locate_in_reference with its dtw_band + 1 envelopes."""
+
+    def test_sparse_history_stays_within_envelope(self):
+        """Snapshots further apart than the band still get the exhaustive answer."""
+        reference = make_reference_poses(400, seed=11)
+        service = PoseComparisonService(reference, PoseComparisonConfig(dtw_band=2))
+        for step, ref_idx in enumerate(range(200, 260, 10)):
+            service.update_user_pose(reference[ref_idx]['landmarks'], timestamp=step * 10 / 15)
+
+        location = service.locate_in_reference(duration=10.0)
+
+        query = service._unit_rows(service.user_pose_history.last('landmarks'))
+        span = location['end_idx'] - location['start_idx'] + 1
+        exhaustive = [sakoe_chiba_dtw(query, service.reference_unit[s:s + span], 2)[0]
+                      for s in range(len(reference) - span + 1)]
+        assert span == 2 * (len(query) - 1) + 1
+        assert location['start_idx'] == int(np.argmin(exhaustive))
+        assert location['cost'] == pytest.approx(min(exhaustive))
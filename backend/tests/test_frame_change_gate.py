@@ -0,0 +1,79 @@
+"""
+Tests for skipping inference on unchanged frames.
+
+Run with:
+    pytest tests/test_frame_change_gate.py -v
+"""
+
+import numpy as np
+
+from app.services.frame_change_gate import FrameChangeGate
+
+
+def scene(shift: int = 0, noise: float = 0.0, seed: int = 0) -> np.ndarray:
+    """480x640 RGB frame with a bright 'dancer' block, shifted horizontally."""
+    frame = np.full((480, 640, 3), 60, dtype=np.uint8)
+    frame[100:400, 250 + shift:390 + shift] = (200, 150, 120)
+    if noise:
+        rng = np.random.default_rng(seed)
+        frame = np.clip(frame + rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+    return frame
+
+
+def inferred(gate: FrameChangeGate, frame: np.ndarray, now: float):
+    gate.store(gate.thumbnail(frame), {'timestamp': now, 'pose_landmarks': [[0.5, 0.5, 0.0, 0.9]],
+                                       'success': True}, now=now)
+
+
+# =============================================================================
+# Gate
+# =============================================================================
+
+class TestFrameChangeGate:
+    """Near-identical frames reuse the last result."""
+
+    def test_first_frame_is_inferred(self):
+        gate = FrameChangeGate(threshold=2.0)
+        assert not gate.unchanged(gate.thumbnail(scene()), now=0.0)
+
+    def test_sensor_noise_is_unchanged(self):
+        gate = FrameChangeGate(threshold=2.0, max_reuse=1.0)
+        inferred(gate, scene(noise=4.0, seed=1), now=0.0)
+
+        assert gate.unchanged(gate.thumbnail(scene(noise=4.0, seed=2)), now=0.5)
+        result = gate.reuse(now=0.5)
+        assert result['timestamp'] == 0.5
+        assert result['frame_unchanged']
+        assert result['pose_landmarks'] == [[0.5, 0.5, 0.0, 0.9]]
+        assert gate.frames_skipped == 1
+
+    def test_movement_is_changed(self):
+        gate = FrameChangeGate(threshold=2.0)
+        inferred(gate, scene(), now=0.0)
+        assert not gate.unchanged(gate.thumbnail(scene(shift=40)), now=0.5)
+
+    def test_drift_is_measured_from_last_inferred_frame(self):
+        gate = FrameChangeGate(threshold=2.0, max_reuse=10.0)
+        inferred(gate, scene(), now=0.0)
+
+        changed = [not gate.unchanged(gate.thumbnail(scene(shift=shift)), now=shift / 10)
+                   for shift in range(2, 42, 2)]
+        assert not changed[0]
+        assert any(changed)
+
+    def test_forced_refresh(self):
+        gate = FrameChangeGate(threshold=2.0, max_reuse=1.0)
+        inferred(gate, scene(), now=0.0)
+        assert gate.unchanged(gate.thumbnail(scene()), now=0.9)
+        assert not gate.unchanged(gate.thumbnail(scene()), now=1.1)
+
+    def test_failed_result_is_not_reused(self):
+        gate = FrameChangeGate(threshold=2.0)
+        inferred(gate, scene(), now=0.0)
+        gate.store(gate.thumbnail(scene()), {'success': False, 'error': 'boom'}, now=0.1)
+        assert not gate.unchanged(gate.thumbnail(scene()), now=0.2)
+
+    def test_disabled(self):
+        gate = FrameChangeGate(enabled=False)
+        inferred(gate, scene(), now=0.0)
+        assert not gate.unchanged(gate.thumbnail(scene()), now=0.1)
@@ -0,0 +1,95 @@
+"""
+Tests for the shared image decoder.
+
+Run with:
+    pytest tests/test_image_decoding.py -v
+"""
+
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from app.utils.image_decoding import (
+    decode_base64_image, decode_frame, decode_image, image_size, reduction_factor, _decode_with_pil
+)
+
+
+def encode(image: np.ndarray, extension: str = ".png") -> bytes:
+    """Encode a BGR(A) image."""
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+def make_image(height: int = 120, width: int = 160) -> np.ndarray:
+    """BGR image with distinct channels."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+# =============================================================================
+# Decoding
+# =============================================================================
+
+class TestDecode:
+    """Bytes go straight to RGB (or BGR) arrays."""
+
+    def test_matches_previous_path(self):
+        image_b64 = base64.b64encode(encode(make_image())).decode()
+        np.testing.assert_array_equal(decode_base64_image(image_b64), _decode_with_pil(image_b64))
+
+    def test_bgr(self):
+        image = make_image()
+        np.testing.assert_array_equal(decode_image(encode(image), rgb=False), image)
+
+    def test_data_url(self):
+        image = make_image()
+        data_url = "data:image/png;base64," + base64.b64encode(encode(image)).decode()
+        np.testing.assert_array_equal(decode_base64_image(data_url, rgb=False), image)
+
+    def test_frame_upload_base64_or_bytes(self):
+        image = make_image()
+        encoded = encode(image)
+        for upload in (base64.b64encode(encoded).decode(), encoded, memoryview(encoded)):
+            np.testing.assert_array_equal(decode_frame(upload, rgb=False), image)
+
+    def test_alpha_and_grayscale_become_three_channels(self):
+        rgba = np.dstack([make_image(), np.full((120, 160), 255, np.uint8)])
+        assert decode_image(encode(rgba)).shape == (120, 160, 3)
+        assert decode_image(encode(make_image()[:, :, 0])).shape == (120, 160, 3)
+
+    def test_invalid_data(self):
+        with pytest.raises(ValueError):
+            decode_image(b"not an image")
+        with pytest.raises(ValueError):
+            decode_base64_image("%%%")
+
+
+# =============================================================================
+# Reduced-resolution decoding
+# =============================================================================
+
+class TestReducedDecode:
+    """Large uploads are decoded at a fraction of their size."""
+
+    def test_header_size(self):
+        image = make_image(90, 200)
+        for extension in (".png", ".jpg"):
+            assert image_size(np.frombuffer(encode(image, extension), np.uint8)) == (200, 90)
+        assert image_size(np.frombuffer(b"GIF89a" + bytes(32), np.uint8)) is None
+
+    def test_reduction_factor(self):
+        assert reduction_factor((1920, 1080), 640 * 480) == 2
+        assert reduction_factor((1920, 1080), 320 * 240) == 4
+        assert reduction_factor((640, 480), 640 * 480) == 1
+        assert reduction_factor((1920, 1080), None) == 1
+        assert reduction_factor(None, 640 * 480) == 1
+
+    @pytest.mark.parametrize("extension", [".jpg", ".png"])
+    def test_large_upload_decoded_reduced(self, extension):
+        data = encode(make_image(1080, 1920), extension)
+        assert decode_image(data, max_pixels=640 * 480).shape == (540, 960, 3)
+        assert decode_image(data).shape == (1080, 1920, 3)
+
+    def test_small_upload_decoded_full(self):
+        assert decode_image(encode(make_image(), ".jpg"), max_pixels=640 * 480).shape == (120, 160, 3)
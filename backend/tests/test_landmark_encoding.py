@@ -0,0 +1,75 @@
+"""
+Tests for packed landmark encodings in API responses.
+
+Run with:
+    pytest tests/test_landmark_encoding.py -v
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.utils.landmark_encoding import decode_landmarks, encode_landmarks, requested_encoding
+
+
+def make_sequence(length: int = 100) -> np.ndarray:
+    """(length, 33, 4) poses like the ones in a session's pose sequence."""
+    rng = np.random.default_rng(0)
+    sequence = rng.uniform(0.0, 1.0, (length, 33, 4)).astype(np.float32)
+    sequence[..., 2] -= 0.5
+    return sequence
+
+
+# =============================================================================
+# Encoding
+# =============================================================================
+
+class TestEncoding:
+    """Packed arrays round-trip within the encoding's precision."""
+
+    @pytest.mark.parametrize("encoding, tolerance", [("i16", 5e-5), ("f16", 5e-4)])
+    def test_round_trip(self, encoding, tolerance):
+        sequence = make_sequence()
+        payload = encode_landmarks(sequence, encoding)
+        assert payload['shape'] == [100, 33, 4]
+        np.testing.assert_allclose(decode_landmarks(payload), sequence, atol=tolerance)
+
+    @pytest.mark.parametrize("encoding", ["i16", "f16"])
+    def test_several_times_smaller_than_json(self, encoding):
+        sequence = make_sequence()
+        json_size = len(json.dumps(sequence.tolist()))
+        packed_size = len(json.dumps(encode_landmarks(sequence, encoding)))
+        assert packed_size * 4 < json_size
+
+    def test_i16_out_of_range_falls_back_to_f16(self):
+        payload = encode_landmarks(np.array([[0.5, 5.0], [-3.3, 0.1]]), "i16")
+        assert payload['encoding'] == "f16"
+        np.testing.assert_allclose(decode_landmarks(payload), [[0.5, 5.0], [-3.3, 0.1]], rtol=1e-3)
+
+    def test_i16_keeps_its_full_range(self):
+        payload = encode_landmarks(np.array([[3.2767, -3.2767]]), "i16")
+        assert payload['encoding'] == "i16"
+        np.testing.assert_allclose(decode_landmarks(payload), [[3.2767, -3.2767]], atol=1e-4)
+
+
+# =============================================================================
+# Negotiation
+# =============================================================================
+
+class TestNegotiation:
+    """Query parameter first, then the Accept header's landmarks parameter."""
+
+    def test_default_is_json(self):
+        assert requested_encoding() is None
+        assert requested_encoding(None, "application/json") is None
+        assert requested_encoding("json") is None
+
+    def test_query_and_accept(self):
+        assert requested_encoding("I16") == "i16"
+        assert requested_encoding(None, "application/json; landmarks=f16") == "f16"
+        assert requested_encoding("i16", "application/json; landmarks=f16") == "i16"
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            requested_encoding("msgpack")
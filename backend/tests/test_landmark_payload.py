@@ -0,0 +1,95 @@
+"""
+Tests for validating client-supplied landmarks.
+
+Run with:
+    pytest tests/test_landmark_payload.py -v
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.landmark_payload import (
+    HAND_BYTES, POSE_BYTES, parse_hand_landmarks, parse_landmark_bytes, parse_pose_landmarks
+)
+
+
+def make_pose() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    pose = np.zeros((33, 4), dtype=np.float32)
+    pose[:, :2] = rng.uniform(0.2, 0.8, (33, 2))
+    pose[:, 2] = rng.uniform(-0.3, 0.3, 33)
+    pose[:, 3] = rng.uniform(0.5, 1.0, 33)
+    return pose
+
+
+def make_hand() -> np.ndarray:
+    return np.full((21, 3), 0.5, dtype=np.float32)
+
+
+# =============================================================================
+# JSON arrays
+# =============================================================================
+
+class TestArrays:
+    """Nested lists are checked for shape and range."""
+
+    def test_valid_pose(self):
+        pose = make_pose()
+        np.testing.assert_array_equal(parse_pose_landmarks(pose.tolist()), pose)
+
+    @pytest.mark.parametrize("landmarks", [
+        make_pose()[:32].tolist(),
+        make_pose()[:, :3].tolist(),
+        [["a"] * 4] * 33,
+    ])
+    def test_wrong_shape(self, landmarks):
+        with pytest.raises(ValueError):
+            parse_pose_landmarks(landmarks)
+
+    @pytest.mark.parametrize("row, column, value", [
+        (0, 0, float("nan")),
+        (3, 1, 5.0),
+        (5, 2, 50.0),
+        (7, 3, 1.5),
+    ])
+    def test_out_of_range(self, row, column, value):
+        pose = make_pose()
+        pose[row, column] = value
+        with pytest.raises(ValueError):
+            parse_pose_landmarks(pose.tolist())
+
+    def test_slightly_outside_frame_is_accepted(self):
+        pose = make_pose()
+        pose[27, :2] = (0.5, 1.2)  # Ankle just below the frame
+        parse_pose_landmarks(pose)
+
+    def test_hands(self):
+        assert len(parse_hand_landmarks([make_hand().tolist()] * 2)) == 2
+        with pytest.raises(ValueError):
+            parse_hand_landmarks([make_hand().tolist()] * 3)
+        with pytest.raises(ValueError):
+            parse_hand_landmarks([make_hand()[:, :2].tolist()])
+
+
+# =============================================================================
+# Packed float32
+# =============================================================================
+
+class TestBytes:
+    """Pose then hands, little-endian float32."""
+
+    def test_pose_and_hands(self):
+        pose, hand = make_pose(), make_hand()
+        parsed_pose, parsed_hands = parse_landmark_bytes(pose.astype("<f4").tobytes() + hand.tobytes())
+        np.testing.assert_array_equal(parsed_pose, pose)
+        assert len(parsed_hands) == 1
+        np.testing.assert_array_equal(parsed_hands[0], hand)
+
+    def test_pose_only(self):
+        _, hands = parse_landmark_bytes(make_pose().tobytes())
+        assert hands == []
+
+    @pytest.mark.parametrize("size", [0, POSE_BYTES - 4, POSE_BYTES + 4, POSE_BYTES + HAND_BYTES + 8])
+    def test_wrong_size(self, size):
+        with pytest.raises(ValueError):
+            parse_landmark_bytes(bytes(size))
@@ -0,0 +1,248 @@
+"""
+Tests for the MediaPipe pose detector pool.
+
+Run with:
+    pytest tests/test_pose_detector_pool.py -v
+"""
+
+import asyncio
+import base64
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.mediapipe_service import MediaPipeService
+from app.services.pose_detector_pool import (
+    PoseDetectorPool, PoseDetection, RESULT_FLOATS, POSE_OFFSET, HANDS_OFFSET, HANDEDNESS_OFFSET,
+    _StreamDetectors
+)
+
+
+DETECTOR_OPTIONS = {'model_complexity': 1, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5}
+
+
+def blank_frame(height: int = 240, width: int = 320) -> np.ndarray:
+    """Frame without a person in it."""
+    return np.full((height, width, 3), 180, dtype=np.uint8)
+
+
+def blank_image_b64() -> str:
+    """Base64 PNG of a blank frame."""
+    return base64.b64encode(cv2.imencode('.png', blank_frame())[1].tobytes()).decode()
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    """Two worker processes with a single frame slot each (exercises queueing)."""
+    pool = PoseDetectorPool(num_workers=2, slots_per_worker=1, timeout=60)
+    pool.start()
+    yield pool
+    pool.close()
+
+
+# =============================================================================
+# Result blocks
+# =============================================================================
+
+class TestPoseDetection:
+    """Unpacking the float32 result layout."""
+
+    def test_from_block(self):
+        rng = np.random.default_rng(0)
+        block = np.zeros(RESULT_FLOATS, dtype=np.float32)
+        pose = rng.random((33, 4), dtype=np.float32)
+        hand = rng.random((21, 3), dtype=np.float32)
+        block[0], block[1] = 1, 1
+        block[POSE_OFFSET:HANDS_OFFSET] = pose.ravel()
+        block[HANDS_OFFSET:HANDS_OFFSET + 63] = hand.ravel()
+        block[HANDEDNESS_OFFSET:HANDEDNESS_OFFSET + 2] = [2, 0.75]
+
+        detection = PoseDetection.from_block(block, inference_time=0.01, worker_id=1)
+
+        np.testing.assert_array_equal(detection.pose_landmarks, pose)
+        assert len(detection.hand_landmarks) == 1
+        np.testing.assert_array_equal(detection.hand_landmarks[0], hand)
+        assert detection.hand_classifications == [{'label': 'Right', 'confidence': pytest.approx(0.75)}]
+
+    def test_hand_without_handedness_is_unknown(self):
+        block = np.zeros(RESULT_FLOATS, dtype=np.float32)
+        block[1] = 2
+        block[HANDEDNESS_OFFSET + 2:HANDEDNESS_OFFSET + 4] = [1, 0.6]
+
+        detection = PoseDetection.from_block(block)
+
+        assert len(detection.hand_landmarks) == len(detection.hand_classifications) == 2
+        assert [hand['label'] for hand in detection.hand_classifications] == ['Unknown', 'Left']
+
+    def test_empty_block(self):
+        detection = PoseDetection.from_block(np.zeros(RESULT_FLOATS, dtype=np.float32))
+        assert detection.pose_landmarks is None
+        assert detection.hand_landmarks == []
+
+    def test_large_frames_are_downscaled(self):
+        pool = PoseDetectorPool(num_workers=0, max_frame_pixels=640 * 360)
+        fitted = pool._fit_frame(blank_frame(1080, 1920))
+        assert fitted.shape[0] * fitted.shape[1] <= 640 * 360
+        assert fitted.shape[1] / fitted.shape[0] == pytest.approx(1920 / 1080, rel=0.01)
+        assert pool._fit_frame(blank_frame()).shape == (240, 320, 3)
+
+
+# =============================================================================
+# Inference
+# =============================================================================
+
+class TestInProcess:
+    """num_workers=0 runs the same API on background threads."""
+
+    def test_detect(self):
+        pool = PoseDetectorPool(num_workers=0)
+        try:
+            detection = pool.detect(blank_frame())
+            assert detection.pose_landmarks is None
+            assert pool.get_statistics()['frames_processed'] == 1
+        finally:
+            pool.close()
+
+    def test_tracking_detector_per_stream(self):
+        pool = PoseDetectorPool(num_workers=0, max_streams_per_worker=2)
+        try:
+            for stream_id in ("session_a", "session_a:reference", None):
+                pool.detect(blank_frame(), stream_id=stream_id)
+            assert pool.get_statistics()['streams'] == 2
+
+            pool.detect(blank_frame(), stream_id="session_b")
+            assert pool.get_statistics()['streams'] == 2
+
+            pool.release_stream("session_b")
+            assert pool.get_statistics()['streams'] == 1
+        finally:
+            pool.close()
+
+    def test_quality_levels_keep_their_detectors(self):
+        detectors = _StreamDetectors(DETECTOR_OPTIONS, 2)
+        full_a, full_b = detectors.get("session_a"), detectors.get("session_b")
+        lite_a, lite_b = detectors.get("session_a", 0), detectors.get("session_b", 0)
+
+        # Switching back reuses the first graphs; the limit counts streams, not levels
+        assert detectors.get("session_a") is full_a and detectors.get("session_b") is full_b
+        assert detectors.get("session_a", 0) is lite_a and lite_a.model_complexity == 0
+        assert (len(detectors), detectors.num_graphs) == (2, 4)
+
+        detectors.get("session_c")
+        assert (len(detectors), detectors.num_graphs) == (2, 3)
+        assert detectors.get("session_b", 0) is not lite_b
+        detectors.close()
+
+    def test_unused_levels_closed_after_hold(self):
+        detectors = _StreamDetectors(DETECTOR_OPTIONS, 2, level_hold=0.05)
+        detectors.get("session_a")
+        lite = detectors.get("session_a", 0)
+        assert detectors.num_graphs == 2
+
+        time.sleep(0.1)
+        assert detectors.get("session_a", 0) is lite
+        assert (len(detectors), detectors.num_graphs) == (1, 1)
+        assert detectors.get(None, 0) is detectors.get(None, 0) and detectors.num_graphs == 1
+        detectors.close()
+
+    def test_first_frame_of_a_detector_is_warmup(self):
+        pool = PoseDetectorPool(num_workers=0)
+        try:
+            assert pool.detect(blank_frame(), stream_id="session_w", detect_hands=False).warmup
+            assert not pool.detect(blank_frame(), stream_id="session_w", detect_hands=False).warmup
+            # The hands graph is built the first time hands are requested
+            assert pool.detect(blank_frame(), stream_id="session_w", detect_hands=True).warmup
+        finally:
+            pool.close()
+
+
+class TestProcessPool:
+    """Frames go through shared memory to the worker processes."""
+
+    def test_all_frames_complete(self, process_pool):
+        futures = [process_pool.submit(blank_frame(), stream_id=f"session_{i}") for i in range(8)]
+        detections = [future.result(timeout=60) for future in futures]
+
+        assert all(detection.pose_landmarks is None for detection in detections)
+        assert process_pool.queue_depth == 0
+        assert {detection.worker_id for detection in detections} <= {0, 1}
+
+    def test_stream_stays_on_one_worker(self, process_pool):
+        workers = {process_pool.detect(blank_frame(), stream_id="session_a").worker_id for _ in range(4)}
+        assert len(workers) == 1
+
+    def test_user_and_reference_streams_on_different_workers(self, process_pool):
+        for stream_id in list(process_pool._stream_workers):
+            process_pool.release_stream(stream_id)
+
+        user_stream, reference_stream = MediaPipeService.stream_ids("session_dual")
+        user = process_pool.submit(blank_frame(), stream_id=user_stream)
+        reference = process_pool.submit(blank_frame(), stream_id=reference_stream)
+        assert user.result(timeout=60).worker_id != reference.result(timeout=60).worker_id
+
+        process_pool.release_stream(user_stream)
+        process_pool.release_stream(reference_stream)
+        assert user_stream not in process_pool._stream_workers
+
+    def test_dual_frames(self, process_pool):
+        service = MediaPipeService(detector_pool=process_pool)
+        result = service.process_dual_frames(blank_image_b64(), blank_image_b64(), session_id="session_dual")
+
+        assert result.success
+        assert not result.user_pose.has_pose and not result.reference_pose.has_pose
+        service.release_session("session_dual")
+
+    def test_detect_async(self, process_pool):
+        async def detect_all():
+            return await asyncio.gather(*[
+                process_pool.detect_async(blank_frame(), detect_hands=False) for _ in range(4)
+            ])
+
+        assert len(asyncio.run(detect_all())) == 4
+
+    def test_hands_only(self, process_pool):
+        detection = process_pool.detect(blank_frame(96, 96), stream_id="session_h:hand_left", detect_pose=False)
+        assert detection.pose_landmarks is None and detection.hand_landmarks == []
+        process_pool.release_stream("session_h")
+        assert "session_h:hand_left" not in process_pool._stream_workers
+
+    def test_cancelled_frame_does_not_stop_collector(self, process_pool):
+        process_pool.submit(blank_frame()).cancel()
+        assert process_pool.detect(blank_frame()).pose_landmarks is None
+
+    def test_large_frame(self, process_pool):
+        detection = process_pool.detect(blank_frame(1080, 1920))
+        assert detection.pose_landmarks is None
+
+    def test_dead_worker_is_restarted(self):
+        pool = PoseDetectorPool(num_workers=1, slots_per_worker=1, timeout=60)
+        try:
+            pool.detect(blank_frame(), stream_id="session_k")
+            pool._processes[0].kill()
+            pool._processes[0].join()
+
+            # Frames sent to the dead worker fail instead of hanging
+            futures = [pool.submit(blank_frame(), stream_id="session_k") for _ in range(3)]
+            for future in futures:
+                try:
+                    future.result(timeout=30)
+                except RuntimeError:
+                    pass
+
+            for _ in range(3):
+                assert pool.detect(blank_frame(), stream_id="session_k").pose_landmarks is None
+            statistics = pool.get_statistics()
+            assert statistics['worker_restarts'] == 1
+            assert statistics['in_flight'] == 0 and statistics['queue_depth'] == 0
+            assert pool._worker_load == [0]
+        finally:
+            pool.close()
+
+    def test_closed_pool_rejects_frames(self):
+        pool = PoseDetectorPool(num_workers=1, timeout=60)
+        pool.detect(blank_frame())
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.submit(blank_frame())
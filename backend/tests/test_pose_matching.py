@@ -0,0 +1,167 @@
+"""
+Tests pinning the vectorised reference matching to the per-frame loop it replaced.
+
+Run with:
+    pytest tests/test_pose_matching.py -v
+"""
+
+import numpy as np
+import pytest
+
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+from tests.conftest import make_reference_poses
+
+
+def original_match(service: PoseComparisonService, user_landmarks: np.ndarray, reference_poses,
+                   user_motion=None, reference_motions=None):
+    """
+    The per-frame loop of _find_best_reference_match before vectorisation,
+    comparing against every reference pose with _calculate_pose_similarity.
+
+    Motion j is the one that reaches reference frame j (None for frame 0), as in
+    the live matcher.
+    """
+    best_motion_score = 0.0
+
+    pose_scores = []
+    for reference_pose in reference_poses:
+        pose_scores.append(service._calculate_pose_similarity(user_landmarks, reference_pose))
+
+    best_match_idx = int(np.argmax(pose_scores))
+    best_pose_score = pose_scores[best_match_idx]
+
+    if user_motion is not None:
+        motion_window = 10
+        start_idx = max(1, best_match_idx - motion_window)
+        end_idx = min(len(reference_poses), best_match_idx + motion_window)
+
+        motion_scores = []
+        for i in range(start_idx, end_idx):
+            motion_scores.append(service._calculate_motion_similarity(user_motion, reference_motions[i]))
+
+        if motion_scores:
+            best_motion_score = max(motion_scores)
+            combined_scores = []
+            for i in range(start_idx, end_idx):
+                combined_scores.append(service.config.pose_weight * pose_scores[i] +
+                                       service.config.motion_weight * motion_scores[i - start_idx])
+            best_match_idx = start_idx + int(np.argmax(combined_scores))
+            best_pose_score = pose_scores[best_match_idx]
+
+    return best_match_idx, best_pose_score, best_motion_score
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return make_reference_poses(80, seed=3)
+
+
+@pytest.fixture(scope="module")
+def service(reference):
+    """Exhaustive matcher (no tracking window, no index)."""
+    return PoseComparisonService(reference, PoseComparisonConfig(tracking_enabled=False, ann_enabled=False))
+
+
+def fixed_user_poses(reference, count: int = 12):
+    """Noisy copies of reference poses plus a few unrelated poses, always the same."""
+    rng = np.random.default_rng(42)
+    poses = [reference[i]['landmarks'] + rng.normal(scale=0.02, size=(33, 4))
+             for i in rng.integers(0, len(reference), count)]
+    poses += [rng.random((33, 4)) for _ in range(3)]
+    return poses
+
+
+# =============================================================================
+# Pose scores
+# =============================================================================
+
+class TestMatchesOriginalLoop:
+    """Same index and scores as the loop on fixed inputs."""
+
+    def test_pose_only(self, service, reference):
+        reference_poses = [frame['landmarks'] for frame in reference]
+        for user in fixed_user_poses(reference):
+            index, pose_score, motion_score = service._find_best_reference_match(user)
+            expected_index, expected_pose_score, _ = original_match(service, user, reference_poses)
+
+            assert index == expected_index
+            assert pose_score == pytest.approx(expected_pose_score, abs=1e-12)
+            assert motion_score == 0.0
+
+    def test_with_motion(self, service, reference):
+        reference_poses = [frame['landmarks'] for frame in reference]
+        reference_motions = [None] + list(service.reference_motions)
+        users = fixed_user_poses(reference)
+        for previous, user in zip(users, users[1:]):
+            user_motion = service._prepare_pose_vector(user) - service._prepare_pose_vector(previous)
+            result = service._find_best_reference_match(user, user_motion)
+            expected = original_match(service, user, reference_poses, user_motion, reference_motions)
+
+            assert result[0] == expected[0]
+            assert result[1] == pytest.approx(expected[1], abs=1e-12)
+            assert result[2] == pytest.approx(expected[2], abs=1e-12)
+
+    def test_kernel_scores_every_frame(self, service, reference):
+        user = fixed_user_poses(reference)[0]
+        expected = [service._calculate_pose_similarity(user, frame['landmarks']) for frame in reference]
+        np.testing.assert_allclose(service._score_reference_poses(service._prepare_pose_vector(user)),
+                                   expected, atol=1e-12)
+
+
+# =============================================================================
+# Landmark layout
+# =============================================================================
+
+def legacy_filter(landmarks: np.ndarray) -> np.ndarray:
+    """_filter_essential_landmarks before the layout fix (2D input flattened with visibility)."""
+    if landmarks.ndim == 2:
+        landmarks = landmarks.flatten()
+    essential = []
+    for idx in [0] + list(range(11, 33)):
+        if idx * 3 + 3 <= len(landmarks):
+            essential.extend(landmarks[idx * 3:idx * 3 + 3])
+    return np.array(essential)
+
+
+def legacy_similarity(user_landmarks: np.ndarray, reference_row: np.ndarray) -> float:
+    """Score of the original loop: both sides filtered again, then cut to the shorter one."""
+    user, reference = legacy_filter(user_landmarks), legacy_filter(reference_row)
+    length = min(len(user), len(reference))
+    user, reference = user[:length], reference[:length]
+    return float(np.clip(user @ reference / (np.linalg.norm(user) * np.linalg.norm(reference)), 0.0, 1.0))
+
+
+class TestLandmarkLayout:
+    """
+    The original loop passed filtered (69-value) reference rows through the filter
+    again, which cut them to 39 values pairing the user's arms with the reference's
+    hands and legs, and flattened 2D user poses together with visibility.
+    Scores now compare the same 23 landmarks (x, y, z) on both sides.
+    """
+
+    def test_reference_rows_are_not_filtered_twice(self, service, reference):
+        assert len(legacy_filter(service.reference_landmarks[0])) == 39
+        assert len(service._prepare_pose_vector(reference[0]['landmarks'])) == 69
+
+    def test_exact_pose_scores_one(self, service, reference):
+        pose = reference[37]['landmarks']
+        index, pose_score, _ = service._find_best_reference_match(pose)
+
+        assert (index, pose_score) == (37, pytest.approx(1.0))
+        assert legacy_similarity(pose, service.reference_landmarks[37]) < 0.999
+
+    def test_visibility_does_not_change_scores(self, service, reference):
+        pose = fixed_user_poses(reference)[0].copy()
+        before = service._score_reference_poses(service._prepare_pose_vector(pose))
+        legacy_before = legacy_similarity(pose, service.reference_landmarks[0])
+
+        pose[:, 3] = 0.1
+        np.testing.assert_array_equal(service._score_reference_poses(service._prepare_pose_vector(pose)), before)
+        assert legacy_similarity(pose, service.reference_landmarks[0]) != legacy_before
+
+    def test_legs_count(self, service, reference):
+        pose = reference[20]['landmarks'].copy()
+        pose[25:33, :3] += 0.5  # Knees, ankles and feet
+
+        assert service._find_best_reference_match(pose)[1] < 0.999
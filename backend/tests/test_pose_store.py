@@ -0,0 +1,137 @@
+"""
+Tests for the columnar processed-pose format.
+
+Run with:
+    pytest tests/test_pose_store.py -v
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from app.services.pose_store import (
+    PoseArrays, save_pose_arrays, load_pose_arrays, load_poses, convert_legacy_poses,
+    is_pose_store, PROCESSED_POSES_DIR
+)
+from app.services.reference_features import ReferenceFeatures
+from tests.conftest import make_frames
+
+
+def write_legacy(path: str, frames):
+    """Save frames the way process_video used to (pickled object array)."""
+    np.save(path, frames)
+
+
+# =============================================================================
+# Columnar round trip
+# =============================================================================
+
+class TestPoseArrays:
+    """Saving, memory-mapping and reading back frames."""
+
+    def test_round_trip(self, tmp_path):
+        frames = make_frames()
+        path = str(tmp_path / "dance_poses")
+        save_pose_arrays(PoseArrays.from_frames(frames, metadata={'fps': 60.0}), path)
+
+        arrays = load_pose_arrays(path)
+        assert is_pose_store(path)
+        assert len(arrays) == len(frames)
+        assert arrays.metadata['fps'] == 60.0
+        assert arrays.landmarks.dtype == np.float32
+        assert arrays.landmarks.shape == (len(frames), 33, 4)
+
+        for original, loaded in zip(frames, arrays.frames()):
+            assert loaded['frame_number'] == original['frame_number']
+            assert loaded['timestamp'] == pytest.approx(original['timestamp'])
+            assert loaded['has_pose'] == original['has_pose']
+            if original['landmarks'] is None:
+                assert loaded['landmarks'] is None
+            else:
+                np.testing.assert_allclose(loaded['landmarks'], original['landmarks'], atol=1e-7)
+            assert len(loaded['gestures']) == len(original['gestures'])
+            for hand, gesture in zip(loaded['gestures'], original['gestures']):
+                assert hand['gesture'] == gesture['gesture']
+                assert hand['handedness']['label'] == gesture['handedness']['label']
+                np.testing.assert_allclose(hand['hand_landmarks'], gesture['hand_landmarks'], atol=1e-7)
+
+    def test_columns_are_memory_mapped(self, tmp_path):
+        path = str(tmp_path / "dance_poses")
+        save_pose_arrays(PoseArrays.from_frames(make_frames()), path)
+
+        arrays = load_pose_arrays(path)
+        assert isinstance(arrays.landmarks, np.memmap)
+        assert not arrays.landmarks.flags.writeable
+
+    def test_replace_swaps_in_place(self, tmp_path):
+        path = str(tmp_path / "dance_poses")
+        save_pose_arrays(PoseArrays.from_frames(make_frames(20)), path)
+        old = load_pose_arrays(path)
+
+        save_pose_arrays(PoseArrays.from_frames(make_frames(30, seed=1)), path)
+
+        assert len(load_pose_arrays(path)) == 30
+        assert len(old) == 20 and np.isfinite(old.landmarks).all()  # Old mapping still readable
+        assert os.listdir(tmp_path) == ["dance_poses"]  # No staging or retired directories left
+
+    def test_pose_only_frames(self, tmp_path):
+        frames = make_frames()
+        arrays = PoseArrays.from_frames(frames)
+        pose_frames = arrays.frames(pose_only=True)
+
+        assert len(pose_frames) == sum(frame['has_pose'] for frame in frames)
+        assert all(frame['has_pose'] for frame in pose_frames)
+        assert pose_frames[-1]['frame_number'] == [f for f in frames if f['has_pose']][-1]['frame_number']
+        assert len(pose_frames[2:5]) == 3
+
+
+# =============================================================================
+# Legacy files
+# =============================================================================
+
+class TestLegacyConversion:
+    """Pickled <name>_poses.npy files are converted and loaded transparently."""
+
+    def test_convert(self, tmp_path):
+        frames = make_frames()
+        legacy = str(tmp_path / "dance_poses.npy")
+        write_legacy(legacy, frames)
+
+        output = convert_legacy_poses(legacy)
+        assert output == str(tmp_path / "dance_poses")
+        assert len(load_pose_arrays(output)) == len(frames)
+
+    def test_load_converts_on_first_use(self, tmp_path):
+        legacy = str(tmp_path / "dance_poses.npy")
+        write_legacy(legacy, make_frames())
+
+        arrays = load_poses(legacy)
+        assert is_pose_store(str(tmp_path / "dance_poses"))
+        assert isinstance(arrays.landmarks, np.memmap)
+
+        # Later loads use the columnar copy (by either name)
+        os.remove(legacy)
+        assert len(load_poses(str(tmp_path / "dance_poses"))) == len(arrays)
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_poses(str(tmp_path / "missing_poses"))
+
+    def test_features_match_frame_path(self, tmp_path):
+        source = os.path.join(PROCESSED_POSES_DIR, "test_poses.npy")
+        if not os.path.exists(source):
+            pytest.skip("test_poses.npy not available")
+        legacy = str(tmp_path / "test_poses.npy")
+        shutil.copy(source, legacy)
+
+        frames = [frame for frame in np.load(legacy, allow_pickle=True) if frame['has_pose']]
+        expected = ReferenceFeatures.from_poses(frames)
+        features = ReferenceFeatures.from_arrays(load_poses(legacy))
+
+        assert len(features) == len(expected)
+        assert features.fps == pytest.approx(expected.fps)
+        np.testing.assert_allclose(features.landmarks, expected.landmarks, atol=1e-6)
+        np.testing.assert_allclose(features.timestamps, expected.timestamps)
+        assert features.reference_poses[0]['frame_number'] == frames[0]['frame_number']
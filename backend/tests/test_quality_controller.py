@@ -0,0 +1,84 @@
+"""
+Tests for adaptive inference quality.
+
+Run with:
+    pytest tests/test_quality_controller.py -v
+"""
+
+import pytest
+
+from app.services.quality_controller import QualityController, QUALITY_LEVELS
+
+
+def feed(controller, latency, count, queue_depth=0, start=0.0, step=0.5):
+    """Record count snapshots, step seconds apart; returns the time after the last one."""
+    now = start
+    for _ in range(count):
+        controller.record(latency, queue_depth, now=now)
+        now += step
+    return now
+
+
+# =============================================================================
+# Levels
+# =============================================================================
+
+class TestQualityController:
+    """The level follows load, with hysteresis."""
+
+    def test_starts_at_configured_complexity(self):
+        assert QualityController(max_complexity=1).level.name == 'medium'
+        assert QualityController(max_complexity=2).level.name == 'high'
+        assert QualityController(max_complexity=0).level.name == 'low'
+
+    def test_steps_down_when_over_budget(self):
+        controller = QualityController(max_complexity=2, latency_budget=0.5, degrade_after=3, cooldown=5.0)
+        feed(controller, 0.45, 3)
+
+        assert controller.level.name == 'medium'
+        transition = controller.get_statistics()['transitions'][-1]
+        assert (transition['from'], transition['to']) == ('high', 'medium')
+
+    def test_backlog_steps_down(self):
+        controller = QualityController(max_complexity=1, degrade_after=3)
+        feed(controller, 0.05, 3, queue_depth=4)
+        assert controller.level.name == 'low'
+
+    def test_cooldown_prevents_flapping(self):
+        controller = QualityController(max_complexity=2, degrade_after=3, cooldown=5.0)
+        now = feed(controller, 0.45, 3)
+        # Still over budget, but within the cooldown
+        now = feed(controller, 0.45, 6, start=now, step=0.5)
+        assert controller.level.name == 'medium'
+
+        feed(controller, 0.45, 3, start=now + 5.0)
+        assert controller.level.name == 'low'
+
+    def test_recovers_with_headroom_up_to_ceiling(self):
+        controller = QualityController(max_complexity=1, degrade_after=3, recover_after=10, cooldown=5.0)
+        now = feed(controller, 0.45, 3)
+        assert controller.level.name == 'low'
+
+        # A few fast frames are not enough
+        now = feed(controller, 0.05, 9, start=now + 5.0)
+        assert controller.level.name == 'low'
+
+        now = feed(controller, 0.05, 1, start=now)
+        assert controller.level.name == 'medium'
+
+        feed(controller, 0.05, 30, start=now + 5.0)
+        assert controller.level.name == 'medium'
+
+    def test_never_below_lowest_level(self):
+        controller = QualityController(max_complexity=0, degrade_after=1, cooldown=0.0)
+        feed(controller, 2.0, 20)
+        assert controller.level == QUALITY_LEVELS[-1]
+
+    def test_disabled_keeps_level(self):
+        controller = QualityController(max_complexity=1, enabled=False)
+        feed(controller, 2.0, 20, queue_depth=5)
+
+        statistics = controller.get_statistics()
+        assert statistics['level'] == 'medium'
+        assert statistics['transitions'] == []
+        assert statistics['average_latency'] == pytest.approx(2.0)
@@ -0,0 +1,117 @@
+"""
+Tests for the process-wide reference cache.
+
+Run with:
+    pytest tests/test_reference_cache.py -v
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.services.pose_store import PoseArrays, save_pose_arrays
+from app.services.reference_cache import ReferenceCache
+from tests.conftest import make_frames
+
+
+def write_store(path: str, num_frames: int = 60, seed: int = 0) -> str:
+    """Write a columnar pose directory and return its path."""
+    save_pose_arrays(PoseArrays.from_frames(make_frames(num_frames, seed=seed)), path)
+    return path
+
+
+# =============================================================================
+# Hits and misses
+# =============================================================================
+
+class TestReferenceCache:
+    """Lookups keyed by file identity."""
+
+    def test_reload_is_a_hit(self, tmp_path):
+        path = write_store(str(tmp_path / "dance_poses"))
+        cache = ReferenceCache()
+
+        first = cache.get(path)
+        second = cache.get(path)
+
+        assert second is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_hit_is_fast(self, tmp_path):
+        path = write_store(str(tmp_path / "dance_poses"), num_frames=2000)
+        cache = ReferenceCache()
+        cache.get(path)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get(path)
+        assert (time.perf_counter() - start) / 100 < 1e-3
+
+    def test_rewritten_file_is_reloaded(self, tmp_path):
+        path = write_store(str(tmp_path / "dance_poses"))
+        cache = ReferenceCache()
+        first = cache.get(path)
+
+        write_store(path, num_frames=80, seed=1)
+        second = cache.get(path)
+
+        assert second is not first
+        assert len(second) != len(first)
+        assert len(cache) == 1
+
+    def test_legacy_file_is_cached_after_conversion(self, tmp_path):
+        legacy = str(tmp_path / "dance_poses.npy")
+        np.save(legacy, make_frames())
+        cache = ReferenceCache()
+
+        first = cache.get(legacy)
+        assert cache.get(str(tmp_path / "dance_poses")) is first
+        assert cache.misses == 1
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            ReferenceCache().get(str(tmp_path / "missing_poses"))
+
+
+# =============================================================================
+# Memory budget
+# =============================================================================
+
+class TestEviction:
+    """Least recently used references are dropped over the budget."""
+
+    def test_lru_eviction(self, tmp_path):
+        paths = [write_store(str(tmp_path / f"dance{i}_poses"), seed=i) for i in range(3)]
+        entry_bytes = ReferenceCache().get(paths[0]).total_nbytes
+        cache = ReferenceCache(max_bytes=int(entry_bytes * 2.5))
+
+        first = cache.get(paths[0])
+        cache.get(paths[1])
+        cache.get(paths[0])  # paths[1] is now least recently used
+        cache.get(paths[2])
+
+        assert cache.evictions == 1
+        assert cache.get(paths[0]) is first
+        cache.get(paths[1])
+        assert cache.misses == 4
+
+    def test_newest_entry_kept_over_budget(self, tmp_path):
+        path = write_store(str(tmp_path / "dance_poses"))
+        cache = ReferenceCache(max_bytes=1)
+
+        features = cache.get(path)
+        assert len(cache) == 1
+        assert cache.get(path) is features
+
+    def test_indexes_count_towards_budget(self, tmp_path):
+        path = write_store(str(tmp_path / "dance_poses"), num_frames=500)
+        cache = ReferenceCache()
+        features = cache.get(path)
+        before = cache.nbytes
+
+        features.index(num_trees=4, leaf_size=16)
+        features.envelopes(radius=3)
+        assert cache.nbytes > before
+        assert cache.get_statistics()['bytes'] == cache.nbytes
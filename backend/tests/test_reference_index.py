@@ -0,0 +1,119 @@
+"""
+Tests for the approximate nearest-neighbour index over reference poses.
+
+Run with:
+    pytest tests/test_reference_index.py -v
+"""
+
+import numpy as np
+
+from app.services.reference_index import RandomProjectionForest
+from tests.conftest import make_reference
+
+
+def make_queries(reference: np.ndarray, count: int = 50, seed: int = 1) -> np.ndarray:
+    """Reference poses with a little noise, as a live dancer would produce."""
+    rng = np.random.default_rng(seed)
+    queries = reference[rng.integers(0, len(reference), count)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+# =============================================================================
+# Forest structure
+# =============================================================================
+
+class TestForestStructure:
+    """Flat-array layout of the random-projection forest."""
+
+    def test_every_tree_covers_every_point_once(self):
+        """Each tree's leaves partition the reference."""
+        reference = make_reference(500)
+        forest = RandomProjectionForest(num_trees=4, leaf_size=16).build(reference)
+
+        assert len(forest.roots) == 4
+        assert len(forest.leaf_items) == 4 * 500
+        for tree in range(4):
+            items = forest.leaf_items[tree * 500:(tree + 1) * 500]
+            assert np.array_equal(np.sort(items), np.arange(500))
+
+    def test_leaves_respect_leaf_size(self):
+        """No leaf holds more than leaf_size points."""
+        forest = RandomProjectionForest(num_trees=2, leaf_size=16).build(make_reference(500))
+
+        leaves = forest.children[:, 0] < 0
+        sizes = forest.leaf_ranges[leaves, 1] - forest.leaf_ranges[leaves, 0]
+        assert sizes.max() <= 16
+        assert sizes.min() > 0
+
+    def test_build_is_deterministic(self):
+        """The same seed gives the same forest."""
+        reference = make_reference(300)
+        first = RandomProjectionForest(seed=3).build(reference)
+        second = RandomProjectionForest(seed=3).build(reference)
+
+        assert np.array_equal(first.leaf_items, second.leaf_items)
+        assert np.array_equal(first.thresholds, second.thresholds)
+
+    def test_empty_reference(self):
+        """An empty reference gives an empty forest and no results."""
+        forest = RandomProjectionForest().build(np.zeros((0, 69)))
+
+        assert forest.num_nodes == 0
+        assert len(forest.query(np.ones(69) / np.sqrt(69), 5)) == 0
+
+
+# =============================================================================
+# Queries and recall
+# =============================================================================
+
+class TestForestQueries:
+    """Top-k search quality."""
+
+    def test_exact_reference_pose_ranks_first(self):
+        """A pose taken from the reference is its own nearest neighbour."""
+        reference = make_reference(2000)
+        forest = RandomProjectionForest().build(reference)
+
+        for idx in (0, 777, 1999):
+            assert forest.query(reference[idx], 5)[0] == idx
+
+    def test_results_sorted_by_similarity(self):
+        """Results come back best first."""
+        reference = make_reference(2000)
+        forest = RandomProjectionForest().build(reference)
+        query = make_queries(reference, 1)[0]
+
+        results = forest.query(query, 10)
+        scores = reference[results] @ query
+
+        assert len(results) == 10
+        assert np.all(np.diff(scores) <= 0)
+
+    def test_recall_against_exhaustive_search(self):
+        """Noisy reference poses find most of their exact top-10."""
+        reference = make_reference(2000)
+        forest = RandomProjectionForest().build(reference)
+
+        recall = forest.measure_recall(make_queries(reference), k=10, search_k=1000)
+
+        assert recall >= 0.9
+
+    def test_search_k_trades_speed_for_recall(self):
+        """Gathering more candidates never lowers recall."""
+        reference = make_reference(5000)
+        forest = RandomProjectionForest().build(reference)
+        queries = make_queries(reference)
+
+        low = forest.measure_recall(queries, k=10, search_k=100)
+        high = forest.measure_recall(queries, k=10, search_k=2000)
+
+        assert high >= low
+        assert high >= 0.9
+
+    def test_full_search_is_exact(self):
+        """A search_k covering every tree's leaves gives exhaustive results."""
+        reference = make_reference(400)
+        forest = RandomProjectionForest(num_trees=2).build(reference)
+
+        assert forest.measure_recall(make_queries(reference), k=10, search_k=10 ** 6) == 1.0
@@ -0,0 +1,98 @@
+"""
+Tests for looking up reference landmarks by video timestamp.
+
+Run with:
+    pytest tests/test_reference_landmarks.py -v
+"""
+
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.mediapipe_service import MediaPipeService
+from app.services.pose_detector_pool import PoseDetectorPool
+from app.services.pose_store import PoseArrays, save_pose_arrays, load_pose_arrays
+from app.services.reference_features import ReferenceFeatures
+from tests.conftest import make_frames
+
+FPS = 15.0
+
+
+@pytest.fixture(params=["frames", "store"])
+def reference(request, tmp_path):
+    """(frames, features) for the same video, built from frame dicts or a pose store."""
+    frames = make_frames(60, fps=FPS)
+    if request.param == "frames":
+        return frames, ReferenceFeatures.from_poses(frames)
+
+    path = str(tmp_path / "dance_poses")
+    save_pose_arrays(PoseArrays.from_frames(frames), path)
+    return frames, ReferenceFeatures.shared(path, load_pose_arrays(path))
+
+
+# =============================================================================
+# Timestamp lookup
+# =============================================================================
+
+class TestLandmarksAt:
+    """Precomputed landmarks are found and interpolated by timestamp."""
+
+    def test_exact_frame(self, reference):
+        frames, features = reference
+        np.testing.assert_allclose(features.landmarks_at(frames[12]['timestamp']),
+                                   frames[12]['landmarks'], atol=1e-6)
+
+    def test_interpolates_between_frames(self, reference):
+        frames, features = reference
+        first, second = frames[12], frames[13]
+        midpoint = (first['timestamp'] + second['timestamp']) / 2
+
+        expected = (first['landmarks'] + second['landmarks']) / 2
+        np.testing.assert_allclose(features.landmarks_at(midpoint), expected, atol=1e-5)
+
+    def test_skips_frames_without_pose(self, reference):
+        frames, features = reference
+        # Frame 3 has no pose: interpolate between frames 2 and 4
+        landmarks = features.landmarks_at(frames[3]['timestamp'])
+        expected = (frames[2]['landmarks'] + frames[4]['landmarks']) / 2
+        np.testing.assert_allclose(landmarks, expected, atol=1e-5)
+
+    def test_long_gap_uses_nearest_frame(self, reference):
+        frames, features = reference
+        landmarks = features.landmarks_at(frames[3]['timestamp'] - 0.01, max_gap=0.1)
+        np.testing.assert_allclose(landmarks, frames[2]['landmarks'], atol=1e-6)
+
+    def test_outside_video(self, reference):
+        frames, features = reference
+        assert features.landmarks_at(frames[-1]['timestamp'] + 5.0) is None
+        assert features.landmarks_at(-5.0) is None
+        np.testing.assert_allclose(features.landmarks_at(0.0), frames[0]['landmarks'], atol=1e-6)
+
+
+# =============================================================================
+# MediaPipe service
+# =============================================================================
+
+class TestFrameWithReference:
+    """Only the user frame is inferred."""
+
+    def test_reference_pose_from_landmarks(self):
+        frames = make_frames(20, fps=FPS)
+        features = ReferenceFeatures.from_poses(frames)
+        pool = PoseDetectorPool(num_workers=0)
+        service = MediaPipeService(detector_pool=pool)
+        image = base64.b64encode(cv2.imencode('.png', np.full((120, 160, 3), 180, np.uint8))[1].tobytes()).decode()
+
+        try:
+            result = service.process_frame_with_reference(image, features.landmarks_at(frames[5]['timestamp']))
+            missing = service.process_frame_with_reference(image, None)
+        finally:
+            pool.close()
+
+        assert result.success and result.reference_pose.has_pose
+        np.testing.assert_allclose(result.reference_pose.landmarks, frames[5]['landmarks'], atol=1e-6)
+        assert not result.user_pose.has_pose
+        assert pool.get_statistics()['frames_processed'] == 2
+        assert missing.success and not missing.reference_pose.has_pose
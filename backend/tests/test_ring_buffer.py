@@ -0,0 +1,113 @@
+"""
+Tests for the fixed-capacity numpy ring buffer used for session history.
+
+Run with:
+    pytest tests/test_ring_buffer.py -v
+"""
+
+import numpy as np
+import pytest
+
+from app.services.ring_buffer import RingBuffer
+
+
+def make_buffer(capacity: int = 4) -> RingBuffer:
+    return RingBuffer(capacity, {
+        'vector': ((3,), np.float32),
+        'timestamp': ((), np.float64),
+    })
+
+
+# =============================================================================
+# Appending and views
+# =============================================================================
+
+class TestRingBuffer:
+    """Appends, wrap-around and zero-copy views."""
+
+    def test_last_returns_newest_oldest_first(self):
+        """Views are in insertion order, across wrap-around."""
+        buffer = make_buffer(4)
+        for i in range(7):
+            buffer.append(vector=[i, i, i], timestamp=i * 0.5)
+
+        assert len(buffer) == 4
+        assert buffer.last('timestamp').tolist() == [1.5, 2.0, 2.5, 3.0]
+        assert buffer.last('vector', 2)[:, 0].tolist() == [5.0, 6.0]
+
+    def test_views_share_storage(self):
+        """last() hands out a read-only view, not a copy."""
+        buffer = make_buffer(4)
+        for i in range(6):
+            buffer.append(vector=[i, 0, 0], timestamp=i)
+
+        view = buffer.last('vector')
+        assert np.shares_memory(view, buffer._data['vector'])
+        assert not view.flags.writeable
+
+    def test_append_does_not_allocate(self):
+        """Storage is allocated once and reused for every append."""
+        buffer = make_buffer(4)
+        storage = buffer._data['vector']
+        for i in range(20):
+            buffer.append(vector=[i, i, i], timestamp=i)
+
+        assert buffer._data['vector'] is storage
+        assert buffer.nbytes == 2 * 4 * (3 * 4 + 8)
+
+    def test_latest_and_set_latest(self):
+        """The newest record can be read and updated in both copies."""
+        buffer = make_buffer(3)
+        for i in range(5):
+            buffer.append(vector=[i, 0, 0], timestamp=i)
+
+        buffer.set_latest('timestamp', 42.0)
+
+        assert buffer.latest('timestamp') == 42.0
+        assert buffer.last('timestamp')[-1] == 42.0
+        buffer.append(vector=[0, 0, 0], timestamp=5)
+        buffer.append(vector=[0, 0, 0], timestamp=6)
+        assert buffer.last('timestamp').tolist() == [42.0, 5.0, 6.0]
+
+    def test_empty_buffer(self):
+        """An empty buffer has no records and an empty view."""
+        buffer = make_buffer(3)
+
+        assert len(buffer) == 0
+        assert buffer.last('vector').shape == (0, 3)
+        with pytest.raises(IndexError):
+            buffer.latest('timestamp')
+
+
+# =============================================================================
+# Resizing
+# =============================================================================
+
+class TestRingBufferResize:
+    """Changing the capacity in place."""
+
+    @pytest.mark.parametrize("new_capacity", [2, 4, 5, 8])
+    def test_resize_keeps_newest_records(self, new_capacity):
+        """The newest records that fit survive a resize, and appends continue normally."""
+        buffer = make_buffer(5)
+        for i in range(9):
+            buffer.append(vector=[i, 0, 0], timestamp=i)
+
+        buffer.resize(new_capacity)
+        kept = min(5, new_capacity)
+        assert buffer.capacity == new_capacity
+        assert buffer.last('timestamp').tolist() == list(range(9 - kept, 9))
+
+        for i in range(9, 12):
+            buffer.append(vector=[i, 0, 0], timestamp=i)
+        expected = list(range(9 - kept, 12))[-new_capacity:]
+        assert buffer.last('timestamp').tolist() == expected
+
+    def test_resize_to_same_capacity_keeps_storage(self):
+        """Resizing to the current capacity is a no-op."""
+        buffer = make_buffer(4)
+        storage = buffer._data['vector']
+
+        buffer.resize(4)
+
+        assert buffer._data['vector'] is storage
@@ -0,0 +1,267 @@
+"""
+Tests for cropping frames to the dancer before pose inference.
+
+Run with:
+    pytest tests/test_roi_tracker.py -v
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.pose_detector_pool import PoseDetection
+from app.services.quality_controller import QUALITY_LEVELS
+from app.services.roi_tracker import CropRegion, RoiTracker, LEFT_WRIST, RIGHT_WRIST
+
+FRAME_HEIGHT, FRAME_WIDTH = 480, 640
+
+
+def coordinate_frame() -> np.ndarray:
+    """Frame whose pixels encode their own (x, y), so a crop reveals where it came from."""
+    y, x = np.mgrid[0:FRAME_HEIGHT, 0:FRAME_WIDTH]
+    return np.stack([x % 256, y % 256, (x // 256) * 16 + y // 256], axis=-1).astype(np.uint8)
+
+
+def crop_origin(image: np.ndarray):
+    """(x, y) of a crop's top-left pixel in the coordinate frame."""
+    r, g, b = (int(value) for value in image[0, 0])
+    return (b // 16) * 256 + r, (b % 16) * 256 + g
+
+
+def dancer_landmarks() -> np.ndarray:
+    """(33, 4) full-frame landmarks of a dancer in the middle of the frame."""
+    rng = np.random.default_rng(0)
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 0] = rng.uniform(0.4, 0.6, 33)
+    landmarks[:, 1] = rng.uniform(0.3, 0.8, 33)
+    landmarks[:, 2] = rng.uniform(-0.2, 0.2, 33)
+    landmarks[:, 3] = 0.9
+    return landmarks
+
+
+class FakePool:
+    """Detector pool stand-in that 'detects' known full-frame landmarks inside whatever crop it gets."""
+
+    def __init__(self, landmarks: np.ndarray, find_pose_in_crops: bool = True):
+        self.landmarks = landmarks
+        self.find_pose_in_crops = find_pose_in_crops
+        self.calls = []
+
+    async def detect_async(self, image, stream_id=None, detect_hands=True, detect_pose=True,
+                           model_complexity=None):
+        self.calls.append({'shape': image.shape, 'stream_id': stream_id, 'detect_hands': detect_hands,
+                           'detect_pose': detect_pose, 'model_complexity': model_complexity})
+        x0, y0 = crop_origin(image)
+        region = CropRegion(x0, y0, image.shape[1], image.shape[0], FRAME_WIDTH, FRAME_HEIGHT)
+
+        pose = None
+        if detect_pose and (region.is_full_frame or self.find_pose_in_crops):
+            pose = self.landmarks.copy()
+            pose[:, 0] = (pose[:, 0] * FRAME_WIDTH - region.x) / region.width
+            pose[:, 1] = (pose[:, 1] * FRAME_HEIGHT - region.y) / region.height
+            pose[:, 2] *= FRAME_WIDTH / region.width
+
+        hands, classifications = [], []
+        if detect_hands and not detect_pose:
+            # One hand in the middle of the crop
+            hands = [np.full((21, 3), 0.5, dtype=np.float32)]
+            classifications = [{'label': 'Left', 'confidence': 0.9}]
+        elif detect_hands and pose is not None:
+            # Whole-frame call: one hand at the left wrist
+            hands = [np.tile(np.append(pose[LEFT_WRIST, :2], 0.0), (21, 1)).astype(np.float32)]
+            classifications = [{'label': 'Left', 'confidence': 0.9}]
+        return PoseDetection(pose, hands, classifications, inference_time=0.01, worker_id=0)
+
+
+def detect(tracker, pool, frame, **kwargs):
+    return asyncio.run(tracker.detect(pool, frame, stream_id="session_a", **kwargs))
+
+
+# =============================================================================
+# Crop geometry
+# =============================================================================
+
+class TestCropRegion:
+    """Regions crop, downscale and map landmarks back."""
+
+    def test_around_is_clipped_to_frame(self):
+        region = CropRegion.around(20, 400, 200, (FRAME_HEIGHT, FRAME_WIDTH))
+        assert (region.x, region.y) == (0, 300)
+        assert (region.width, region.height) == (120, 180)
+
+    def test_crop_downscales_to_max_side(self):
+        region = CropRegion(100, 50, 400, 300, FRAME_WIDTH, FRAME_HEIGHT)
+        assert region.crop(coordinate_frame(), max_side=200).shape == (150, 200, 3)
+        assert crop_origin(region.crop(coordinate_frame())) == (100, 50)
+
+    def test_to_frame(self):
+        region = CropRegion(160, 120, 320, 240, FRAME_WIDTH, FRAME_HEIGHT)
+        mapped = region.to_frame(np.array([[0.0, 0.0, 0.2, 0.8], [1.0, 1.0, 0.0, 0.5]]))
+        np.testing.assert_allclose(mapped[:, :2], [[0.25, 0.25], [0.75, 0.75]])
+        assert mapped[0, 2] == pytest.approx(0.1)
+        assert mapped[0, 3] == pytest.approx(0.8)
+
+
+# =============================================================================
+# Tracking
+# =============================================================================
+
+class TestRoiTracker:
+    """Only the dancer's region is inferred while tracking holds."""
+
+    def test_crops_after_first_frame(self):
+        tracker = RoiTracker(crop_size=1024)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks)
+        frame = coordinate_frame()
+
+        first = detect(tracker, pool, frame, detect_hands=False)
+        second = detect(tracker, pool, frame, detect_hands=False)
+
+        assert pool.calls[0]['shape'] == frame.shape
+        assert pool.calls[1]['shape'][0] * pool.calls[1]['shape'][1] < frame.shape[0] * frame.shape[1]
+        np.testing.assert_allclose(first.pose_landmarks, landmarks, atol=1e-5)
+        np.testing.assert_allclose(second.pose_landmarks, landmarks, atol=1e-4)
+        assert tracker.tracking
+        assert tracker.get_statistics()['inferred_pixel_ratio'] < 1.0
+
+    def test_crop_is_downscaled_to_crop_size(self):
+        tracker = RoiTracker(crop_size=64)
+        pool = FakePool(dancer_landmarks())
+        detect(tracker, pool, coordinate_frame(), detect_hands=False)
+        tracker.box = (0.3, 0.2, 0.7, 0.9)
+        region = tracker.pose_region((FRAME_HEIGHT, FRAME_WIDTH))
+        assert max(region.crop(coordinate_frame(), tracker.crop_size).shape[:2]) == 64
+
+    def test_lost_tracking_falls_back_to_full_frame(self):
+        tracker = RoiTracker(crop_size=1024)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks, find_pose_in_crops=False)
+        frame = coordinate_frame()
+
+        detect(tracker, pool, frame, detect_hands=False)
+        detection = detect(tracker, pool, frame, detect_hands=False)
+
+        # Crop found nothing, so the same frame was re-run whole
+        assert [call['shape'] == frame.shape for call in pool.calls] == [True, False, True]
+        np.testing.assert_allclose(detection.pose_landmarks, landmarks, atol=1e-5)
+        assert tracker.tracking_lost == 1
+
+    def test_dancer_at_crop_border_resets(self):
+        tracker = RoiTracker()
+        region = CropRegion(100, 100, 200, 200, FRAME_WIDTH, FRAME_HEIGHT)
+        landmarks = dancer_landmarks()
+        landmarks[0, :2] = (101 / FRAME_WIDTH, 200 / FRAME_HEIGHT)
+        tracker.update(landmarks, region)
+        assert not tracker.tracking
+
+    def test_few_visible_landmarks_resets(self):
+        tracker = RoiTracker()
+        landmarks = dancer_landmarks()
+        landmarks[5:, 3] = 0.1
+        tracker.update(landmarks, CropRegion.full((FRAME_HEIGHT, FRAME_WIDTH)))
+        assert not tracker.tracking
+
+    def test_quality_level(self):
+        tracker = RoiTracker()
+        pool = FakePool(dancer_landmarks())
+        frame = coordinate_frame()
+        level = QUALITY_LEVELS[-1]
+
+        detect(tracker, pool, frame, detect_hands=False, level=level)
+        detect(tracker, pool, frame, detect_hands=False, level=level)
+
+        assert max(pool.calls[0]['shape'][:2]) == level.frame_size
+        assert max(pool.calls[1]['shape'][:2]) <= level.crop_size
+        assert {call['model_complexity'] for call in pool.calls} == {level.model_complexity}
+
+    def test_disabled_sends_full_frame_with_hands(self):
+        tracker = RoiTracker(enabled=False, hand_interval=1)
+        pool = FakePool(dancer_landmarks())
+        frame = coordinate_frame()
+        detect(tracker, pool, frame)
+        detect(tracker, pool, frame)
+        assert all(call['shape'] == frame.shape and call['detect_hands'] for call in pool.calls)
+
+    def test_disabled_keeps_hand_interval(self):
+        tracker = RoiTracker(enabled=False, hand_interval=3)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks)
+        frame = coordinate_frame()
+        first = detect(tracker, pool, frame)
+
+        pool.landmarks = landmarks.copy()
+        pool.landmarks[LEFT_WRIST, :2] += (0.02, -0.01)
+        detections = [first] + [detect(tracker, pool, frame) for _ in range(5)]
+
+        assert [call['detect_hands'] for call in pool.calls] == [True, False, False, True, False, False]
+        assert all(len(detection.hand_landmarks) == 1 for detection in detections)
+        np.testing.assert_allclose(detections[1].hand_landmarks[0][:, :2] - first.hand_landmarks[0][:, :2],
+                                   np.broadcast_to((0.02, -0.01), (21, 2)), atol=1e-4)
+        assert detections[1].hand_classifications == first.hand_classifications
+        assert tracker.get_statistics()['hand_inferences'] == 2
+
+
+# =============================================================================
+# Hand crops
+# =============================================================================
+
+class TestHandCrops:
+    """Hands are detected on crops around the visible wrists."""
+
+    def test_hands_mapped_to_frame(self):
+        tracker = RoiTracker(crop_size=1024, hand_crop_size=1024)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks)
+
+        detection = detect(tracker, pool, coordinate_frame())
+
+        hand_calls = [call for call in pool.calls if not call['detect_pose']]
+        assert [call['stream_id'] for call in hand_calls] == ["session_a:hand_left", "session_a:hand_right"]
+        assert len(detection.hand_landmarks) == 2
+        for hand, (_, region) in zip(detection.hand_landmarks,
+                                     tracker.hand_regions(landmarks, (FRAME_HEIGHT, FRAME_WIDTH))):
+            center = ((region.x + region.width / 2) / FRAME_WIDTH, (region.y + region.height / 2) / FRAME_HEIGHT)
+            np.testing.assert_allclose(hand[0, :2], center, atol=1e-3)
+
+    def test_invisible_wrists_skip_hands(self):
+        tracker = RoiTracker(crop_size=1024)
+        landmarks = dancer_landmarks()
+        landmarks[[LEFT_WRIST, RIGHT_WRIST], 3] = 0.1
+        pool = FakePool(landmarks)
+
+        detection = detect(tracker, pool, coordinate_frame())
+
+        assert all(call['detect_pose'] for call in pool.calls)
+        assert detection.hand_landmarks == []
+
+    def test_hands_inferred_every_interval(self):
+        tracker = RoiTracker(crop_size=1024, hand_interval=3)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks)
+        frame = coordinate_frame()
+
+        detections = [detect(tracker, pool, frame) for _ in range(6)]
+
+        hand_calls = [call for call in pool.calls if not call['detect_pose']]
+        assert len(hand_calls) == 4  # Frames 1 and 4, both wrists
+        assert all(len(detection.hand_landmarks) == 2 for detection in detections)
+        assert tracker.get_statistics()['hands_reused'] == 4
+
+    def test_reused_hands_follow_wrist(self):
+        tracker = RoiTracker(crop_size=1024, hand_interval=3)
+        landmarks = dancer_landmarks()
+        pool = FakePool(landmarks)
+        frame = coordinate_frame()
+        first = detect(tracker, pool, frame)
+
+        pool.landmarks = landmarks.copy()
+        pool.landmarks[LEFT_WRIST, :2] += (0.02, -0.01)
+        pool.landmarks[RIGHT_WRIST, 3] = 0.1
+        second = detect(tracker, pool, frame)
+
+        assert len(second.hand_landmarks) == 1
+        np.testing.assert_allclose(second.hand_landmarks[0][:, :2] - first.hand_landmarks[0][:, :2],
+                                   np.broadcast_to((0.02, -0.01), (21, 2)), atol=1e-4)
+        assert second.hand_classifications == first.hand_classifications[:1]
@@ -0,0 +1,149 @@
+"""
+Tests for the multi-session registry.
+
+Run with:
+    pytest tests/test_session_registry.py -v
+"""
+
+import numpy as np
+import pytest
+
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.session_registry import SessionRegistry, MAX_SEQUENCE_LENGTH
+from tests.conftest import make_reference_poses
+
+
+@pytest.fixture
+def registry():
+    """Registry with a loaded reference and a placeholder OpenAI client."""
+    registry = SessionRegistry(max_session_duration=60, feedback_client=object())
+    registry.set_reference("test_dance", make_reference_poses())
+    return registry
+
+
+# =============================================================================
+# Sessions
+# =============================================================================
+
+class TestSessions:
+    """Creating, looking up and ending sessions."""
+
+    def test_sessions_have_unique_ids(self, registry):
+        ids = {registry.create_session().session_id for _ in range(20)}
+        assert len(ids) == 20
+        assert len(registry) == 20
+
+    def test_sessions_keep_separate_state(self, registry):
+        reference = make_reference_poses()
+        first = registry.create_session()
+        second = registry.create_session()
+
+        for pose in reference[:10]:
+            first.comparison_service.update_user_pose(pose['landmarks'])
+            first.pose_sequence.append(pose['landmarks'])
+        first.scoring_service.add_score(timestamp=0.0, combined_score=0.9,
+                                        pose_score=0.9, motion_score=0.9)
+
+        assert len(first.comparison_service.user_pose_history) == 10
+        assert len(second.comparison_service.user_pose_history) == 0
+        assert len(second.pose_sequence) == 0
+        assert len(second.scoring_service.get_timeline()) == 0
+        assert first.live_feedback_service is not second.live_feedback_service
+        assert first.pose_sequence.maxlen == MAX_SEQUENCE_LENGTH
+
+    def test_unknown_session(self, registry):
+        assert registry.get_session("session_missing") is None
+        assert registry.end_session("session_missing") is None
+
+    def test_end_session(self, registry):
+        session = registry.create_session()
+        assert registry.end_session(session.session_id) is session
+        assert registry.get_session(session.session_id) is None
+
+
+# =============================================================================
+# Shared reference
+# =============================================================================
+
+class TestSharedReference:
+    """Sessions share one read-only copy of the reference."""
+
+    def test_reference_arrays_are_shared(self, registry):
+        first = registry.create_session().comparison_service
+        second = registry.create_session().comparison_service
+
+        assert first.reference_features is second.reference_features
+        assert first.reference_landmarks is second.reference_landmarks
+        assert np.shares_memory(first.reference_upper, second.reference_upper)
+
+    def test_reference_arrays_are_read_only(self, registry):
+        service = registry.create_session().comparison_service
+        with pytest.raises(ValueError):
+            service.reference_landmarks[0, 0] = 1.0
+
+    def test_new_reference_reaches_existing_sessions(self, registry):
+        session = registry.create_session()
+        registry.set_reference("other_dance", make_reference_poses(num_frames=80, seed=1))
+
+        assert session.reference_video == "other_dance"
+        assert len(session.comparison_service.reference_landmarks) == 120  # Until the next frame
+        session.compare_pose(make_reference_poses(num_frames=1)[0]['landmarks'])
+        assert len(session.comparison_service.reference_landmarks) == 80
+        assert session.comparison_service.reference_features is registry.reference_features
+
+    def test_session_before_reference(self):
+        registry = SessionRegistry(feedback_client=object())
+        session = registry.create_session()
+        assert session.comparison_service is None and not session.has_reference
+        assert registry.create_comparison_service() is None
+        assert session.compare_pose(make_reference_poses(num_frames=1)[0]['landmarks']) is None
+
+        registry.set_reference("test_dance", make_reference_poses())
+        assert session.has_reference
+        assert session.apply_pending_changes() is not None
+
+    def test_update_config_reaches_sessions(self, registry):
+        session = registry.create_session()
+        service = session.comparison_service
+        registry.update_config(PoseComparisonConfig(pose_weight=0.3, motion_weight=0.7, smoothing_window=3))
+
+        # A frame in flight keeps its buffers; the config applies before the next one
+        assert service.config.motion_weight != 0.7
+        assert service.user_pose_history.capacity == 10
+        session.compare_pose(make_reference_poses(num_frames=1)[0]['landmarks'])
+        assert session.comparison_service is service
+        assert service.config.motion_weight == 0.7
+        assert service.user_pose_history.capacity == 6
+
+    def test_config_staged_before_reference_uses_new_config(self, registry):
+        session = registry.create_session()
+        registry.update_config(PoseComparisonConfig(pose_weight=0.3, motion_weight=0.7))
+        registry.set_reference("other_dance", make_reference_poses(num_frames=80, seed=1))
+
+        assert session.apply_pending_changes().config.motion_weight == 0.7
+
+
+# =============================================================================
+# Eviction
+# =============================================================================
+
+class TestEviction:
+    """Idle sessions are dropped after max_session_duration."""
+
+    def test_idle_sessions_are_evicted(self, registry):
+        idle = registry.create_session()
+        active = registry.create_session()
+        idle.last_active -= 120
+        active.last_active -= 30
+
+        assert registry.evict_idle() == [idle.session_id]
+        assert registry.get_session(idle.session_id) is None
+        assert registry.get_session(active.session_id) is active
+        assert registry.get_statistics()['sessions_evicted'] == 1
+
+    def test_lookup_marks_session_active(self, registry):
+        session = registry.create_session()
+        session.last_active -= 50
+        registry.get_session(session.session_id)
+
+        assert registry.evict_idle(now=session.last_active + 30) == []
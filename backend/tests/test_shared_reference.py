@@ -0,0 +1,131 @@
+"""
+Tests for sharing reference features between worker processes.
+
+Run with:
+    pytest tests/test_shared_reference.py -v
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from app.services.pose_store import PoseArrays, save_pose_arrays, load_pose_arrays
+from app.services.reference_features import ReferenceFeatures, FEATURES_DIR
+from app.services.reference_index import RandomProjectionForest
+from app.services.shared_reference import ReferencePointer
+from tests.conftest import make_frames
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Columnar pose store with a few hundred frames."""
+    path = str(tmp_path / "dance_poses")
+    save_pose_arrays(PoseArrays.from_frames(make_frames(300)), path)
+    return path
+
+
+def attach_in_child(store_path, queue):
+    """Worker process: attach to the published features and report what it mapped."""
+    features = ReferenceFeatures.shared(store_path, load_pose_arrays(store_path))
+    upper, _ = features.envelopes(3)
+    queue.put((len(features), features.landmarks.base.filename, float(upper.sum())))
+
+
+# =============================================================================
+# Published features
+# =============================================================================
+
+class TestSharedFeatures:
+    """Features are published once and memory-mapped by every loader."""
+
+    def test_matches_in_memory_features(self, store):
+        arrays = load_pose_arrays(store)
+        shared = ReferenceFeatures.shared(store, arrays)
+        expected = ReferenceFeatures.from_arrays(arrays)
+
+        assert os.path.isdir(os.path.join(store, FEATURES_DIR))
+        assert shared.fps == pytest.approx(expected.fps)
+        np.testing.assert_array_equal(shared.landmarks, expected.landmarks)
+        np.testing.assert_array_equal(shared.motion_unit, expected.motion_unit)
+        assert len(shared.reference_poses) == len(expected.reference_poses)
+
+    def test_arrays_are_read_only_memory_maps(self, store):
+        features = ReferenceFeatures.shared(store, load_pose_arrays(store))
+        assert isinstance(features.unit.base, np.memmap)
+        with pytest.raises(ValueError):
+            features.landmarks[0, 0] = 1.0
+
+    def test_index_built_once_for_all_loaders(self, store, monkeypatch):
+        first = ReferenceFeatures.shared(store, load_pose_arrays(store))
+        built = first.index(num_trees=4, leaf_size=16)
+
+        def fail_build(self, data):
+            raise AssertionError("index rebuilt instead of attached")
+
+        monkeypatch.setattr(RandomProjectionForest, "build", fail_build)
+        second = ReferenceFeatures.shared(store, load_pose_arrays(store))
+        attached = second.index(num_trees=4, leaf_size=16)
+
+        np.testing.assert_array_equal(attached.leaf_items, built.leaf_items)
+        query = second.unit[10]
+        assert list(attached.query(query, 5)) == list(built.query(query, 5))
+
+    def test_rewritten_store_drops_features(self, store):
+        ReferenceFeatures.shared(store, load_pose_arrays(store))
+        save_pose_arrays(PoseArrays.from_frames(make_frames(120, seed=1)), store)
+
+        assert not os.path.isdir(os.path.join(store, FEATURES_DIR))
+        features = ReferenceFeatures.shared(store, load_pose_arrays(store))
+        assert len(features) == sum(frame['has_pose'] for frame in make_frames(120, seed=1))
+
+    def test_other_process_attaches(self, store):
+        features = ReferenceFeatures.shared(store, load_pose_arrays(store))
+        upper, _ = features.envelopes(3)
+
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        worker = context.Process(target=attach_in_child, args=(store, queue))
+        worker.start()
+        frames, filename, upper_sum = queue.get(timeout=60)
+        worker.join(timeout=60)
+
+        assert frames == len(features)
+        assert filename == features.landmarks.base.filename
+        assert upper_sum == pytest.approx(float(upper.sum()))
+
+
+# =============================================================================
+# Current reference pointer
+# =============================================================================
+
+class TestReferencePointer:
+    """A load in one worker becomes visible to the others."""
+
+    def test_other_workers_see_publish_once(self, tmp_path):
+        path = str(tmp_path / "current_reference.json")
+        loading_worker = ReferencePointer(path)
+        other_worker = ReferencePointer(path)
+
+        assert other_worker.poll() is None
+        loading_worker.publish("magnetic")
+
+        assert loading_worker.poll() is None
+        assert other_worker.poll() == "magnetic"
+        assert other_worker.poll() is None
+
+    def test_new_worker_sees_current_reference(self, tmp_path):
+        path = str(tmp_path / "current_reference.json")
+        ReferencePointer(path).publish("magnetic")
+        assert ReferencePointer(path).poll() == "magnetic"
+
+    def test_republish_is_seen(self, tmp_path):
+        path = str(tmp_path / "current_reference.json")
+        loading_worker = ReferencePointer(path)
+        other_worker = ReferencePointer(path)
+
+        loading_worker.publish("magnetic")
+        assert other_worker.poll() == "magnetic"
+        loading_worker.publish("test")
+        assert other_worker.poll() == "test"